@@ -2,45 +2,63 @@
 from django.db.models import Sum, Count, Avg
 from django.utils import timezone
 from datetime import timedelta
-from orders.models import Order
-from products.models import Product
+from orders import customers
+from orders.models import CustomerSummary, Order, DailySales, HourlySales, ProductDailySales
 from users.models import User
 
 class AnalyticsService:
     @staticmethod
     def get_revenue_stats(days=30):
-        """Статистика выручки за последние N дней"""
-        start_date = timezone.now() - timedelta(days=days)
+        """Статистика выручки за последние N дней (из дневной сводки)"""
+        start_date = timezone.localdate() - timedelta(days=days)
 
-        daily_revenue = Order.objects.filter(
-            created_at__gte=start_date
-        ).extra(
-            select={'date': 'date(created_at)'}
-        ).values('date').annotate(
-            revenue=Sum('total_price'),
-            orders_count=Count('id')
-        ).order_by('date')
+        return list(
+            DailySales.objects.filter(
+                date__gte=start_date
+            ).values('date', 'revenue', 'orders_count')
+        )
 
-        return list(daily_revenue)
+    @staticmethod
+    def get_hourly_revenue(hours=24):
+        """Почасовая выручка за последние N часов (из почасовой сводки)"""
+        start_hour = timezone.localtime().replace(
+            minute=0, second=0, microsecond=0
+        ) - timedelta(hours=hours)
+
+        return list(
+            HourlySales.objects.filter(
+                hour__gte=start_hour
+            ).values('hour', 'revenue', 'orders_count')
+        )
 
     @staticmethod
-    def get_top_products(limit=10):
-        """Топ продаваемых продуктов"""
-        top_products = Product.objects.annotate(
-            total_sold=Sum('orderitem__quantity')
+    def get_top_products(limit=10, start_date=None, end_date=None, by='sold'):
+        """
+        Топ продаваемых продуктов за период (из сводки продаж по товарам).
+        by: 'sold' — по штукам, 'revenue' — по выручке, 'orders' — по заказам.
+        """
+        sales = ProductDailySales.objects.all()
+        if start_date:
+            sales = sales.filter(date__gte=start_date)
+        if end_date:
+            sales = sales.filter(date__lte=end_date)
+
+        top_products = sales.values('product_id', 'product__name').annotate(
+            sold=Sum('units'),
+            revenue=Sum('revenue'),
+            orders=Sum('orders_count')
         ).filter(
-            total_sold__gt=0
-        ).order_by('-total_sold')[:limit]
+            sold__gt=0
+        ).order_by(f'-{by}', 'product_id')[:limit]
 
         return [
             {
-                'name': product.name,
-                'sold': product.total_sold or 0,
-                'revenue': float(
-                    (product.total_sold or 0) * product.base_price
-                )
+                'name': row['product__name'],
+                'sold': row['sold'],
+                'revenue': float(row['revenue']),
+                'orders': row['orders']
             }
-            for product in top_products
+            for row in top_products
         ]
 
     @staticmethod
@@ -55,12 +73,12 @@ class AnalyticsService:
             date_joined__gte=thirty_days_ago
         ).count()
 
-        # Активные клиенты (с заказами за последние 90 дней)
+        # Активные клиенты (с заказами за последние 90 дней, из сводки клиентов)
         ninety_days_ago = timezone.now() - timedelta(days=90)
-        active_customers = User.objects.filter(
-            role='customer',
-            order__created_at__gte=ninety_days_ago
-        ).distinct().count()
+        active_customers = CustomerSummary.objects.filter(
+            user__role='customer',
+            last_order_at__gte=ninety_days_ago
+        ).count()
 
         return {
             'total': total_customers,
@@ -68,6 +86,14 @@ class AnalyticsService:
             'active_last_90_days': active_customers
         }
 
+    @staticmethod
+    def get_customer_segments():
+        """RFM-сегменты клиентов (из сводки клиентов)"""
+        return {
+            'thresholds': customers.rfm_thresholds(),
+            'segments': customers.segment_stats()
+        }
+
     @staticmethod
     def get_order_status_stats():
         """Статистика по статусам заказов"""
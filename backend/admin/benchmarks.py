@@ -0,0 +1,404 @@
+# admin/benchmarks.py
+"""
+Набор бенчмарков горячих путей бэкенда.
+
+Каждый бенчмарк — функция без аргументов, выполняющая один вызов
+(представление через APIRequestFactory, метод AnalyticsService, прогон
+обработчика бота). Раннер выполняет её repeat раз после прогрева и
+записывает время (медиана, минимум, p95) и число SQL-запросов; для
+бенчмарков с units (несколько операций за вызов) — ещё и операций в секунду,
+для бенчмарков с memory — пик выделенной памяти (tracemalloc, отдельный
+прогон вне замера времени). Результаты
+сохраняются в JSON; при сравнении с базовым файлом рост медианы больше
+порога, рост пика памяти больше порога или рост числа запросов считается
+регрессией.
+
+Данные готовит команда seed_data, запуск — run_benchmarks.
+"""
+import platform
+import statistics
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from orders.models import Order
+from products.cache import bump_catalog_version
+from users.models import User
+from .analytics import AnalyticsService
+from .cache import dashboard_cache
+
+BENCH_ADMIN = 'bench_admin'
+# Разница меньше этой считается шумом и не регрессией
+NOISE_FLOOR_MS = 1.0
+
+BENCHMARKS = {}
+factory = APIRequestFactory()
+
+
+class Benchmark:
+    def __init__(self, name, func, repeat=5, setup=None, count_queries=True, units=None,
+                 memory=False):
+        self.name = name
+        self.func = func
+        self.repeat = repeat
+        self.setup = setup
+        self.count_queries = count_queries
+        self.units = units
+        self.memory = memory
+
+    def run(self, repeat=None):
+        repeat = repeat or self.repeat
+        if self.setup:
+            self.setup()
+        self.func()  # прогрев
+
+        timings = []
+        queries = None
+        for _ in range(repeat):
+            if self.setup:
+                self.setup()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self.func()
+                timings.append((time.perf_counter() - started) * 1000)
+            if self.count_queries:
+                queries = len(captured)
+
+        timings.sort()
+        median = statistics.median(timings)
+        result = {
+            'repeat': repeat,
+            'median_ms': round(median, 3),
+            'min_ms': round(timings[0], 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'queries': queries,
+        }
+        if self.units:
+            result['per_second'] = round(self.units / (median / 1000), 1)
+        if self.memory:
+            result['peak_kib'] = self.peak_memory()
+        return result
+
+    def peak_memory(self):
+        if self.setup:
+            self.setup()
+        tracemalloc.start()
+        try:
+            self.func()
+            return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+
+
+def benchmark(name, **options):
+    """Декоратор регистрации бенчмарка"""
+    def decorator(func):
+        BENCHMARKS[name] = Benchmark(name, func, **options)
+        return func
+    return decorator
+
+
+def _admin():
+    user, created = User.objects.get_or_create(
+        username=BENCH_ADMIN, defaults={'is_staff': True, 'role': 'admin'}
+    )
+    return user
+
+
+def bench_host():
+    """Хост запросов: первый из ALLOWED_HOSTS (testserver туда не входит)"""
+    host = next(iter(settings.ALLOWED_HOSTS), '*').lstrip('.')
+    return 'localhost' if host in ('', '*') else host
+
+
+def make_request(path='/', params=None):
+    host = bench_host()
+    request = factory.get(path, params or {}, SERVER_NAME=host, HTTP_HOST=host)
+    force_authenticate(request, _admin())
+    return request
+
+
+def call_view(view, path='/', params=None, **kwargs):
+    request = make_request(path, params)
+    response = view(request, **kwargs)
+    response.render()
+    if response.status_code >= 400:
+        raise RuntimeError(f'{path}: HTTP {response.status_code}')
+    return response
+
+
+# --- Админ-панель ---
+
+def _dashboard_view():
+    from .views import dashboard_stats
+    return call_view(dashboard_stats)
+
+
+benchmark('dashboard_stats_cold', setup=dashboard_cache.bump)(_dashboard_view)
+benchmark('dashboard_stats_warm')(_dashboard_view)
+
+
+@benchmark('order_list_page')
+def order_list_page():
+    from .views import order_list
+    call_view(order_list, params={'page': 1})
+
+
+@benchmark('order_list_page_deep')
+def order_list_page_deep():
+    from .views import order_list
+    call_view(order_list, params={'page': 200})
+
+
+@benchmark('order_list_cursor')
+def order_list_cursor():
+    from .views import order_list
+    call_view(order_list, params={'pagination': 'cursor'})
+
+
+# Выгрузка: пик памяти на выборке из нескольких пачек и на всей базе
+# должен быть одинаковым (не больше одной пачки в памяти)
+EXPORT_SAMPLE = 5000
+
+
+def _consume(chunks):
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+    return size
+
+
+@benchmark('orders_export_csv_sample', repeat=3, units=EXPORT_SAMPLE, memory=True)
+def orders_export_csv_sample():
+    from . import export
+    bound = Order.objects.order_by('created_at', 'id').values_list('created_at', flat=True)[
+        EXPORT_SAMPLE - 1:EXPORT_SAMPLE
+    ].first()
+    orders = Order.objects.filter(created_at__lte=bound) if bound else Order.objects.all()
+    _consume(export.stream(orders, 'csv'))
+
+
+def _export_view(export_format):
+    from .views import export_orders
+
+    def run():
+        request = make_request(params={'output': export_format})
+        response = export_orders(request)
+        if response.status_code >= 400:
+            raise RuntimeError(f'export: HTTP {response.status_code}')
+        _consume(response.streaming_content)
+    return run
+
+
+benchmark('orders_export_csv', repeat=3, memory=True)(_export_view('csv'))
+benchmark('orders_export_ndjson', repeat=3, memory=True)(_export_view('ndjson'))
+
+
+def _register_analytics():
+    for name in sorted(vars(AnalyticsService)):
+        if name.startswith('get_'):
+            method = getattr(AnalyticsService, name)
+            benchmark(f'analytics_{name[4:]}')(method)
+
+
+_register_analytics()
+
+
+# --- Каталог ---
+
+def _product_list(params=None):
+    from products.views import ProductViewSet
+    return call_view(ProductViewSet.as_view({'get': 'list'}), params=params)
+
+
+benchmark('products_list_cold', setup=bump_catalog_version)(_product_list)
+benchmark('products_list_warm')(_product_list)
+
+
+@benchmark('products_search')
+def products_search():
+    _product_list({'search': 'медовик крем'})
+
+
+@benchmark('products_search_typo')
+def products_search_typo():
+    _product_list({'search': 'медовек'})
+
+
+# --- Клиентский бот (запросы идут в пуле потоков, поэтому не считаются) ---
+
+def _bot(text):
+    def run():
+        from telegram.benchmark import cleanup_chats, run_bot_benchmark
+        try:
+            run_bot_benchmark(chats=20, updates_per_chat=2, text=text)
+        finally:
+            cleanup_chats()
+    return run
+
+
+benchmark('bot_my_order', repeat=3, count_queries=False)(_bot('📦 Мой заказ'))
+benchmark('bot_catalog', repeat=3, count_queries=False)(_bot('🍰 Каталог'))
+benchmark('bot_profile', repeat=3, count_queries=False)(_bot('👤 Профиль'))
+
+
+# --- Создание заказа ---
+
+PLACE_ORDERS = 200
+PLACE_THREADS = 8
+
+
+def _placement_payloads(count):
+    from orders.pricing import get_price_table
+    table = get_price_table()
+    variants = {}
+    for variant_id, variant in table['variants'].items():
+        variants.setdefault(variant['product_id'], []).append(variant_id)
+    products = sorted(product_id for product_id in table['products'] if product_id in variants)
+    if not products:
+        raise RuntimeError('В каталоге нет товаров с вариантами: запустите seed_data')
+
+    delivery_date = timezone.now() + timedelta(days=2)
+    payloads = []
+    for n in range(count):
+        items = []
+        for product_id in products[n % len(products):][:3]:
+            fillings = sorted(table['allowed_fillings'].get(product_id, ()))[:2]
+            items.append({
+                'product_id': product_id,
+                'variant_id': variants[product_id][n % len(variants[product_id])],
+                'filling_ids': fillings,
+                'quantity': 1 + n % 2,
+            })
+        payloads.append({
+            'items': items,
+            'delivery_address': 'benchmark',
+            'delivery_date': delivery_date,
+            'comment': '',
+            'source': 'website',
+        })
+    return payloads
+
+
+@benchmark('orders_place')
+def orders_place():
+    from orders.placement import place_order
+    place_order(_admin(), _placement_payloads(1)[0])
+
+
+@benchmark('orders_place_concurrent', repeat=3, count_queries=False, units=PLACE_ORDERS)
+def orders_place_concurrent():
+    """
+    PLACE_ORDERS отправок из PLACE_THREADS потоков; каждый ключ
+    идемпотентности отправляется дважды, заказов должно получиться вдвое меньше.
+    """
+    from orders.placement import place_order
+    user = _admin()
+    payloads = _placement_payloads(PLACE_ORDERS // 2)
+    prefix = uuid.uuid4().hex
+
+    def submit(n):
+        try:
+            order, replayed = place_order(user, payloads[n // 2], f'{prefix}-{n // 2}')
+            return order.pk
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(PLACE_THREADS) as pool:
+        order_ids = list(pool.map(submit, range(PLACE_ORDERS)))
+    if len(set(order_ids)) != PLACE_ORDERS // 2:
+        raise RuntimeError(f'{len(set(order_ids))} заказов вместо {PLACE_ORDERS // 2}')
+
+
+# --- Конструктор: расчёт цены по матрице (builder/pricing.py) ---
+
+QUOTE_BATCH = 1000
+_quote_items = []
+
+
+def _prepare_quotes():
+    items = [item for payload in _placement_payloads(QUOTE_BATCH) for item in payload['items']]
+    _quote_items[:] = items[:QUOTE_BATCH]
+
+
+@benchmark('builder_quote', setup=_prepare_quotes, units=1)
+def builder_quote():
+    from builder.pricing import engine
+    engine.quote(_quote_items[:1])
+
+
+@benchmark('builder_quote_batch', setup=_prepare_quotes, units=QUOTE_BATCH)
+def builder_quote_batch():
+    from builder.pricing import engine
+    engine.quote(_quote_items)
+
+
+@benchmark('builder_matrix_build')
+def builder_matrix_build():
+    from builder.pricing import PriceMatrix
+    from orders.pricing import build_price_table
+    PriceMatrix.from_table(build_price_table(0))
+
+
+def environment():
+    return {
+        'started_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'orders': Order.objects.count(),
+    }
+
+
+def run_suite(names=None, repeat=None, progress=None):
+    """Запускает выбранные (по умолчанию все) бенчмарки"""
+    results = {}
+    errors = {}
+    try:
+        for name, bench in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            try:
+                results[name] = bench.run(repeat)
+            except Exception as e:
+                errors[name] = f'{type(e).__name__}: {e}'
+            if progress:
+                progress(name, results.get(name), errors.get(name))
+    finally:
+        User.objects.filter(username=BENCH_ADMIN).delete()
+    return {'environment': environment(), 'results': results, 'errors': errors}
+
+
+def compare(report, baseline, threshold=0.2):
+    """Список регрессий относительно базового отчёта"""
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        limit = base['median_ms'] * (1 + threshold)
+        if result['median_ms'] > limit and result['median_ms'] - base['median_ms'] > NOISE_FLOOR_MS:
+            regressions.append(
+                f"{name}: {result['median_ms']} мс против {base['median_ms']} мс "
+                f"(порог +{threshold:.0%})"
+            )
+        if (result.get('peak_kib') and base.get('peak_kib')
+                and result['peak_kib'] > base['peak_kib'] * (1 + threshold)):
+            regressions.append(
+                f"{name}: пик памяти {result['peak_kib']} КиБ против {base['peak_kib']} КиБ"
+            )
+        if (result['queries'] is not None and base.get('queries') is not None
+                and result['queries'] > base['queries']):
+            regressions.append(
+                f"{name}: {result['queries']} SQL-запросов против {base['queries']}"
+            )
+    return regressions
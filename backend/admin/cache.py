@@ -0,0 +1,90 @@
+# admin/cache.py
+"""
+Версионируемый кэш для данных админ-панели.
+
+Ключ данных содержит номер версии. Любая запись в Order, OrderItem,
+Product или User увеличивает версию (см. orders/signals.py), поэтому
+старые записи кэша просто перестают читаться и истекают по таймауту.
+Версия и счётчики попаданий хранятся в том же кэше — при общем бэкенде
+(Redis) они общие для всех процессов.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+
+class DashboardCache:
+    VERSION_KEY = 'dashboard:version'
+    HITS_KEY = 'dashboard:hits'
+    MISSES_KEY = 'dashboard:misses'
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        alias = self.alias or getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')
+        return caches[alias]
+
+    def _timeout(self):
+        if self.timeout is not None:
+            return self.timeout
+        return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+    def _incr(self, key):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Ключа ещё нет (или он вытеснен) — создаём счётчик
+            self.cache.add(key, 0, timeout=None)
+            return self.cache.incr(key)
+
+    def get_version(self):
+        version = self.cache.get(self.VERSION_KEY)
+        if version is None:
+            self.cache.add(self.VERSION_KEY, 1, timeout=None)
+            version = self.cache.get(self.VERSION_KEY, 1)
+        return version
+
+    def bump(self):
+        """Инвалидирует все закэшированные данные дашборда"""
+        return self._incr(self.VERSION_KEY)
+
+    def make_key(self, name, version=None):
+        if version is None:
+            version = self.get_version()
+        # Дата в ключе: окна «последние 30 дней» сдвигаются в полночь
+        return f'dashboard:{name}:v{version}:{timezone.localdate().isoformat()}'
+
+    def get_or_build(self, name, builder):
+        """Возвращает данные из кэша или строит их через builder()"""
+        key = self.make_key(name)
+        data = self.cache.get(key)
+        if data is not None:
+            self._incr(self.HITS_KEY)
+            return data
+
+        self._incr(self.MISSES_KEY)
+        data = builder()
+        self.cache.set(key, data, timeout=self._timeout())
+        return data
+
+    def stats(self):
+        counters = self.cache.get_many([self.HITS_KEY, self.MISSES_KEY])
+        hits = counters.get(self.HITS_KEY, 0)
+        misses = counters.get(self.MISSES_KEY, 0)
+        total = hits + misses
+        return {
+            'version': self.get_version(),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0
+        }
+
+    def reset_stats(self):
+        self.cache.delete_many([self.HITS_KEY, self.MISSES_KEY])
+
+
+# Глобальный экземпляр
+dashboard_cache = DashboardCache()
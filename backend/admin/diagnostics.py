@@ -0,0 +1,208 @@
+# admin/diagnostics.py
+"""
+Диагностика горячих запросов (check_db --explain).
+
+Для каждого известного горячего запроса — списки заказов, «Мой заказ» в
+боте, доска кондитеров, каталог, сводки — строится план выполнения и
+измеряется задержка. На PostgreSQL используется EXPLAIN (FORMAT JSON):
+в отчёт попадают последовательные сканирования (Seq Scan), оценка
+стоимости и числа строк. На SQLite — EXPLAIN QUERY PLAN (SCAN без индекса
+считается последовательным сканированием, USE TEMP B-TREE — сортировкой
+без индекса). Для каждого запроса указан индекс, рассчитанный на него,
+и есть ли он в базе.
+
+На маленьких таблицах планировщик PostgreSQL выбирает Seq Scan даже при
+наличии индекса — отчёт имеет смысл на данных, близких к боевым
+(seed_data). SQLite не применяет частичный индекс, если условие запроса
+передано параметрами (order_active_delivery_idx), — на PostgreSQL psycopg2
+подставляет значения в текст запроса, и индекс используется.
+"""
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from chef.events import ACTIVE_EXCLUDED_STATUSES
+from orders.models import CustomerSummary, Order, OrderItem, ProductDailySales
+from products.models import Product
+
+
+class HotQuery:
+    def __init__(self, name, description, build, table, index=None):
+        self.name = name
+        self.description = description
+        self.build = build
+        self.table = table
+        self.index = index
+
+
+def _sample(model, field):
+    return model.objects.order_by('-pk').values_list(field, flat=True).first() or 0
+
+
+HOT_QUERIES = [
+    HotQuery(
+        'order_list_status', 'Админка: заказы со статусом, новые первыми',
+        lambda: Order.objects.filter(status='new').order_by('-created_at', '-id')[:20],
+        Order._meta.db_table, 'order_status_created_idx',
+    ),
+    HotQuery(
+        'order_list_recent', 'Админка: курсорная страница по дате',
+        lambda: Order.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=30)
+        ).order_by('-created_at', '-id')[:20],
+        Order._meta.db_table, 'order_created_idx',
+    ),
+    HotQuery(
+        'bot_my_order', 'Бот: последние заказы клиента',
+        lambda: Order.objects.filter(user_id=_sample(Order, 'user_id')).order_by('-created_at').values(
+            'id', 'status', 'total_price', 'created_at'
+        )[:5],
+        Order._meta.db_table, 'order_user_created_idx',
+    ),
+    HotQuery(
+        'chef_board', 'Кондитеры: активные заказы по дате доставки',
+        lambda: Order.objects.exclude(status__in=ACTIVE_EXCLUDED_STATUSES).order_by('delivery_date', 'pk'),
+        Order._meta.db_table, 'order_active_delivery_idx',
+    ),
+    HotQuery(
+        'order_items_by_product', 'Позиции заказов с товаром',
+        lambda: OrderItem.objects.filter(product_id=_sample(OrderItem, 'product_id'))[:100],
+        OrderItem._meta.db_table, None,
+    ),
+    HotQuery(
+        'catalog', 'Каталог: доступные товары, новые первыми',
+        lambda: Product.objects.filter(is_available=True).order_by('-created_at', '-id'),
+        Product._meta.db_table, 'product_available_created_idx',
+    ),
+    HotQuery(
+        'top_products_30d', 'Топ товаров за 30 дней (сводка по товарам)',
+        lambda: ProductDailySales.objects.filter(
+            date__gte=timezone.localdate() - timedelta(days=30)
+        ).values('product_id'),
+        ProductDailySales._meta.db_table, None,
+    ),
+    HotQuery(
+        'active_customers', 'Активные клиенты за 90 дней (сводка клиентов)',
+        lambda: CustomerSummary.objects.filter(last_order_at__gte=timezone.now() - timedelta(days=90)),
+        CustomerSummary._meta.db_table, None,
+    ),
+]
+
+
+def _walk(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _walk(child)
+
+
+def explain_postgresql(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]['Plan']
+    nodes = list(_walk(root))
+    return {
+        'seq_scans': sorted({node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan'}),
+        'sorts': sum(1 for node in nodes if node['Node Type'] in ('Sort', 'Incremental Sort')),
+        'indexes': sorted({node['Index Name'] for node in nodes if 'Index Name' in node}),
+        'cost': root['Total Cost'],
+        'rows': root['Plan Rows'],
+        'plan': [
+            f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip()
+            for node in nodes
+        ],
+    }
+
+
+def explain_sqlite(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        details = [row[-1] for row in cursor.fetchall()]
+    seq_scans = set()
+    indexes = set()
+    for detail in details:
+        words = detail.split()
+        if words[0] in ('SCAN', 'SEARCH') and len(words) > 1:
+            if 'INDEX' in words:
+                indexes.add(words[words.index('INDEX') + 1])
+            elif words[0] == 'SCAN':
+                seq_scans.add(words[1])
+    return {
+        'seq_scans': sorted(seq_scans),
+        'sorts': sum(1 for detail in details if 'TEMP B-TREE' in detail),
+        'indexes': sorted(indexes),
+        'cost': None,
+        'rows': None,
+        'plan': details,
+    }
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    if connection.vendor == 'postgresql':
+        return explain_postgresql(sql, params)
+    if connection.vendor == 'sqlite':
+        return explain_sqlite(sql, params)
+    return {'seq_scans': [], 'sorts': 0, 'indexes': [], 'cost': None, 'rows': None,
+            'plan': queryset.explain().splitlines()}
+
+
+def measure(queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+
+def existing_indexes():
+    """{таблица: множество имён индексов}"""
+    tables = {query.table for query in HOT_QUERIES}
+    with connection.cursor() as cursor:
+        return {
+            table: set(connection.introspection.get_constraints(cursor, table))
+            for table in tables
+        }
+
+
+def run(names=None, repeat=5):
+    """Отчёт по горячим запросам: план, индексы и задержка"""
+    indexes = existing_indexes()
+    report = []
+    for query in HOT_QUERIES:
+        if names and query.name not in names:
+            continue
+        queryset = query.build()
+        result = {
+            'name': query.name,
+            'description': query.description,
+            **explain(queryset),
+            **measure(queryset, repeat),
+            'index': query.index,
+            'index_exists': query.index in indexes[query.table] if query.index else None,
+        }
+        result['warnings'] = warnings(result, query)
+        report.append(result)
+    return report
+
+
+def warnings(result, query):
+    found = []
+    if query.table in result['seq_scans']:
+        found.append(f'последовательное сканирование {query.table}')
+    if result['index_exists'] is False:
+        found.append(f'нет индекса {query.index} — примените миграции')
+    elif query.index and result['index_exists'] and query.index not in result['indexes']:
+        found.append(f'индекс {query.index} не используется планом')
+    return found
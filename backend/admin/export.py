@@ -0,0 +1,173 @@
+# admin/export.py
+"""
+Потоковая выгрузка заказов и позиций (CSV или NDJSON).
+
+Заказы читаются курсором (iterator(chunk_size=...); на PostgreSQL —
+серверный курсор) в виде словарей, без создания моделей. На каждую пачку
+из EXPORT_CHUNK_SIZE заказов позиции загружаются одним запросом по
+order_id, пачка сразу превращается в текст и отдаётся клиенту. В памяти
+одновременно находится не больше одной пачки, поэтому потребление памяти
+не зависит от размера выгрузки.
+
+CSV — одна строка на позицию (поля заказа повторяются; заказ без позиций —
+одна строка с пустыми полями позиции). NDJSON — одна строка на заказ,
+позиции вложены списком. Денежные суммы выгружаются строками без
+округления.
+"""
+import csv
+from datetime import date, datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from orders.models import OrderItem
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+ORDER_FIELDS = [
+    'id', 'created_at', 'status', 'user_id', 'user__username', 'user__first_name',
+    'user__last_name', 'user__phone', 'total_price', 'delivery_address', 'delivery_date',
+]
+ITEM_FIELDS = ['id', 'product_id', 'product__name', 'variant_id', 'quantity', 'price']
+
+CSV_HEADER = [
+    'order_id', 'created_at', 'status', 'user_id', 'username', 'first_name',
+    'last_name', 'phone', 'total_price', 'delivery_address', 'delivery_date',
+    'item_id', 'product_id', 'product_name', 'variant_id', 'quantity', 'price',
+]
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def filter_orders(queryset, params):
+    """
+    Общие фильтры списка и выгрузки заказов:
+    ?status=...&since=ГГГГ-ММ-ДД&until=ГГГГ-ММ-ДД (дата создания, включительно)
+    """
+    status = params.get('status')
+    if status:
+        queryset = queryset.filter(status=status)
+    try:
+        since = date.fromisoformat(params['since']) if params.get('since') else None
+        until = date.fromisoformat(params['until']) if params.get('until') else None
+    except ValueError:
+        raise InvalidFilter('Неверный период: since и until в формате ГГГГ-ММ-ДД')
+    # Границы дня, а не created_at__date — так используется индекс по created_at
+    if since:
+        queryset = queryset.filter(created_at__gte=_day_start(since))
+    if until:
+        queryset = queryset.filter(created_at__lt=_day_start(until + timedelta(days=1)))
+    return queryset
+
+
+def order_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Пачки заказов (словари с ключом items) в порядке created_at, id"""
+    rows = queryset.order_by('created_at', 'id').values(*ORDER_FIELDS).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield _with_items(chunk)
+            chunk = []
+    if chunk:
+        yield _with_items(chunk)
+
+
+def _with_items(orders):
+    by_order = {order['id']: order for order in orders}
+    for order in orders:
+        order['items'] = []
+    for item in OrderItem.objects.filter(order_id__in=list(by_order)).order_by('order_id', 'id').values(
+        'order_id', *ITEM_FIELDS
+    ):
+        by_order[item.pop('order_id')]['items'].append(item)
+    return orders
+
+
+def _order_row(order):
+    return [
+        order['id'], order['created_at'].isoformat(), order['status'], order['user_id'],
+        order['user__username'], order['user__first_name'], order['user__last_name'],
+        order['user__phone'], order['total_price'], order['delivery_address'],
+        order['delivery_date'].isoformat(),
+    ]
+
+
+class _Buffer:
+    """Файлоподобный объект для csv.writer: накапливает строки пачки"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+    def pop(self):
+        text = ''.join(self.parts)
+        self.parts = []
+        return text
+
+
+def stream_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    # BOM — чтобы Excel открыл кириллицу в UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(CSV_HEADER)
+    yield buffer.pop().encode()
+    empty_item = [''] * len(ITEM_FIELDS)
+    for chunk in order_chunks(queryset, chunk_size):
+        for order in chunk:
+            head = _order_row(order)
+            if not order['items']:
+                writer.writerow(head + empty_item)
+            for item in order['items']:
+                writer.writerow(head + [item[field] for field in ITEM_FIELDS])
+        yield buffer.pop().encode()
+
+
+def stream_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in order_chunks(queryset, chunk_size):
+        yield ''.join(
+            encoder.encode({
+                'id': order['id'],
+                'created_at': order['created_at'],
+                'status': order['status'],
+                'user': {
+                    'id': order['user_id'],
+                    'username': order['user__username'],
+                    'first_name': order['user__first_name'],
+                    'last_name': order['user__last_name'],
+                    'phone': order['user__phone'],
+                },
+                'total_price': order['total_price'],
+                'delivery_address': order['delivery_address'],
+                'delivery_date': order['delivery_date'],
+                'items': [
+                    {
+                        'id': item['id'],
+                        'product': {'id': item['product_id'], 'name': item['product__name']},
+                        'variant_id': item['variant_id'],
+                        'quantity': item['quantity'],
+                        'price': item['price'],
+                    }
+                    for item in order['items']
+                ],
+            }) + '\n'
+            for order in chunk
+        ).encode()
+
+
+def stream(queryset, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Генератор байтов выгрузки в формате csv или ndjson"""
+    if export_format == 'csv':
+        return stream_csv(queryset, chunk_size)
+    return stream_ndjson(queryset, chunk_size)
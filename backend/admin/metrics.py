@@ -0,0 +1,122 @@
+# admin/metrics.py
+"""
+Метрики в формате Prometheus.
+
+- http_request_duration_seconds{method, route} и http_requests_total{..., status}
+  — по шаблону маршрута, а не по пути, чтобы число рядов не росло с id;
+- http_request_db_seconds{route} — время в базе за запрос;
+- chef_ws_connections, chef_ws_messages_sent_total — веб-сокет кондитеров;
+- telegram_handler_duration_seconds{handler} — обработчики клиентского бота;
+- telegram_notifications_total{result} — итоги отправки уведомлений.
+
+При нескольких воркерах (gunicorn, daphne) задайте переменную окружения
+PROMETHEUS_MULTIPROC_DIR: каждый процесс пишет значения в свои mmap-файлы,
+а /metrics собирает их через MultiProcessCollector. Гистограммы используют
+короткий общий набор корзин, чтобы память не росла.
+"""
+import functools
+import hmac
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+
+from .middleware import collect_queries, install_all
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP-запроса',
+    ['method', 'route'], buckets=BUCKETS
+)
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP-запросы по статусу ответа',
+    ['method', 'route', 'status']
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', 'Время SQL-запросов за один HTTP-запрос',
+    ['route'], buckets=BUCKETS
+)
+WS_CONNECTIONS = Gauge(
+    'chef_ws_connections', 'Открытые веб-сокеты кондитеров',
+    multiprocess_mode='livesum'
+)
+WS_MESSAGES = Counter('chef_ws_messages_sent_total', 'Кадры, отправленные кондитерам')
+BOT_HANDLER_DURATION = Histogram(
+    'telegram_handler_duration_seconds', 'Время обработчика клиентского бота',
+    ['handler'], buckets=BUCKETS
+)
+NOTIFICATIONS = Counter(
+    'telegram_notifications_total', 'Уведомления Telegram по результату',
+    ['result']
+)
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.route or match.view_name or 'unknown'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_all()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with collect_queries(fingerprints=False) as queries:
+            response = self.get_response(request)
+        route = route_label(request)
+        REQUEST_DURATION.labels(request.method, route).observe(time.perf_counter() - started)
+        REQUESTS.labels(request.method, route, response.status_code).inc()
+        REQUEST_DB_TIME.labels(route).observe(queries.duration)
+        return response
+
+
+def timed_handler(name, callback):
+    """Обёртка обработчика бота: время выполнения в telegram_handler_duration_seconds"""
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        finally:
+            BOT_HANDLER_DURATION.labels(name).observe(time.perf_counter() - started)
+    return wrapper
+
+
+def render():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+def metrics_view(request):
+    """
+    Метрики для Prometheus, нужен Bearer-токен METRICS_TOKEN. Без токена
+    метрики (маршруты, время запросов к БД) открыты только при DEBUG.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE_LATEST)
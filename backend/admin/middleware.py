@@ -0,0 +1,164 @@
+# admin/middleware.py
+"""
+Учёт SQL-запросов на запрос (включается QUERY_INSTRUMENTATION = True).
+
+На каждое соединение с базой ставится execute_wrapper, который пишет
+запросы в сборщик текущего запроса. Сборщик хранится в ContextVar, а
+asgiref копирует контекст в потоки sync_to_async, поэтому учитываются и
+запросы из database_sync_to_async (консьюмеры, ASGI).
+
+Для каждого запроса считаются число запросов, время в базе и «отпечатки»
+(SQL без конкретных значений). Отпечаток SELECT, повторённый не меньше
+QUERY_N1_THRESHOLD раз, помечается как вероятный N+1. Итог отдаётся в
+заголовке Server-Timing; запросы сверх QUERY_BUDGET и с N+1 пишутся в лог.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_collector = ContextVar('query_collector', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL без значений: одинаковые запросы с разными параметрами совпадают"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql.replace('%s', '?'))
+    return _SPACES.sub(' ', sql).strip()
+
+
+def enabled():
+    return getattr(settings, 'QUERY_INSTRUMENTATION', False)
+
+
+class QueryCollector:
+    def __init__(self, parent=None, fingerprints=True):
+        self.parent = parent
+        self.track_fingerprints = fingerprints
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        if self.track_fingerprints:
+            self.fingerprints[fingerprint(sql)] += 1
+        if self.parent is not None:
+            # Вложенные сборщики (метрики + инструментирование) видят одни запросы
+            self.parent.record(sql, duration)
+
+    def repeated(self, threshold=None):
+        """[(отпечаток, сколько раз)] для вероятных N+1"""
+        if threshold is None:
+            threshold = getattr(settings, 'QUERY_N1_THRESHOLD', 5)
+        return [
+            (sql, count) for sql, count in self.fingerprints.most_common()
+            if count >= threshold and sql.upper().startswith('SELECT')
+        ]
+
+    def server_timing(self, total=None):
+        parts = [f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"']
+        repeated = self.repeated()
+        if repeated:
+            parts.append(f'n1;desc="{repeated[0][1]}x repeated query"')
+        if total is not None:
+            parts.append(f'app;dur={total * 1000:.2f}')
+        return ', '.join(parts)
+
+    def report(self, label):
+        """Пишет в лог превышение бюджета запросов и вероятные N+1"""
+        budget = getattr(settings, 'QUERY_BUDGET', 50)
+        if self.count > budget:
+            logger.warning(
+                '%s: %d SQL-запросов (бюджет %d), %.1f мс в БД',
+                label, self.count, budget, self.duration * 1000
+            )
+        for sql, count in self.repeated():
+            logger.warning('%s: вероятный N+1, %d раз: %s', label, count, sql[:300])
+
+
+def _record_query(execute, sql, params, many, context):
+    collector = _collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        collector.record(sql, time.perf_counter() - started)
+
+
+def install(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install_all():
+    """Ставит обёртку на текущие и все будущие соединения"""
+    connection_created.connect(install, dispatch_uid='admin.middleware.install')
+    for connection in connections.all():
+        install(connection)
+
+
+@contextmanager
+def collect_queries(fingerprints=True):
+    """Учитывать запросы внутри блока (в том числе из потоков sync_to_async)"""
+    collector = QueryCollector(parent=_collector.get(), fingerprints=fingerprints)
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_all()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with collect_queries() as collector:
+            response = self.get_response(request)
+        response['Server-Timing'] = collector.server_timing(time.perf_counter() - started)
+        collector.report(f'{request.method} {request.path}')
+        return response
+
+
+def instrument_consumer(consumer_class):
+    """
+    Подкласс консьюмера Channels, который учитывает запросы для каждого
+    обрабатываемого сообщения (подключение, входящий кадр, событие группы).
+    Без QUERY_INSTRUMENTATION возвращает исходный класс.
+    """
+    if not enabled():
+        return consumer_class
+    install_all()
+
+    class InstrumentedConsumer(consumer_class):
+        async def dispatch(self, message):
+            with collect_queries() as collector:
+                await super().dispatch(message)
+            collector.report(f"{consumer_class.__name__} {message.get('type')}")
+
+    InstrumentedConsumer.__name__ = f'Instrumented{consumer_class.__name__}'
+    InstrumentedConsumer.__qualname__ = InstrumentedConsumer.__name__
+    return InstrumentedConsumer
@@ -0,0 +1,100 @@
+# admin/pagination.py
+"""
+Курсорная (keyset) пагинация и быстрая оценка количества строк.
+
+Курсор содержит значение колонки сортировки и id последней строки страницы,
+поэтому следующая страница выбирается условием
+(col, id) < (v, last_id) по индексу — без OFFSET, и страница N стоит
+столько же, сколько первая.
+"""
+import base64
+import json
+
+from django.db import connections
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, sort_fields, sort, default_sort):
+        if sort not in sort_fields:
+            sort = default_sort
+        self.sort = sort
+        self.descending = sort.startswith('-')
+        self.field = sort.lstrip('-')
+        self.queryset = queryset
+        self.model_field = queryset.model._meta.get_field(self.field)
+
+    @property
+    def ordering(self):
+        prefix = '-' if self.descending else ''
+        if self.field == 'id':
+            return [f'{prefix}id']
+        return [f'{prefix}{self.field}', f'{prefix}id']
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.field)
+        payload = {'v': self.model_field.value_to_string(obj), 'id': obj.pk, 's': self.sort}
+        if value is None:
+            payload['v'] = None
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if payload.get('s') != self.sort:
+                raise InvalidCursor('Курсор получен для другой сортировки')
+            value = payload['v']
+            if value is not None:
+                value = self.model_field.to_python(value)
+            return value, int(payload['id'])
+        except InvalidCursor:
+            raise
+        except Exception:
+            raise InvalidCursor('Некорректный курсор')
+
+    def page(self, cursor=None, per_page=20):
+        """Возвращает (объекты страницы, курсор следующей страницы или None)"""
+        per_page = max(per_page, 1)
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            value, last_id = self.decode_cursor(cursor)
+            op = 'lt' if self.descending else 'gt'
+            if self.field == 'id':
+                condition = Q(**{f'id__{op}': last_id})
+            else:
+                condition = Q(**{f'{self.field}__{op}': value}) | Q(
+                    **{self.field: value, f'id__{op}': last_id}
+                )
+            queryset = queryset.filter(condition)
+
+        rows = list(queryset[:per_page + 1])
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            next_cursor = self.encode_cursor(rows[-1])
+        return rows, next_cursor
+
+
+def estimate_count(queryset):
+    """
+    Приблизительное количество строк запроса.
+    На PostgreSQL берётся оценка планировщика (EXPLAIN), без сканирования
+    таблицы; на остальных СУБД выполняется обычный COUNT.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
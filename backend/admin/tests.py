@@ -0,0 +1,129 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from orders.models import Order, OrderItem
+from products.models import Product
+from users.models import User
+from .cache import DashboardCache, dashboard_cache
+from .views import dashboard_stats, order_list
+
+
+class OrderListPaginationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', is_staff=True)
+        self.customer = User.objects.create(username='customer')
+        self.product = Product.objects.create(
+            name='Торт', description='d', type='bento', base_price=Decimal('100'), image='x'
+        )
+        self.factory = APIRequestFactory()
+
+    def create_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(
+                user=self.customer, total_price=Decimal('100'), delivery_address='a',
+                delivery_date=timezone.now()
+            )
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('100'))
+
+    def get(self, **params):
+        request = self.factory.get('/api/admin/orders/', params)
+        force_authenticate(request, user=self.admin)
+        return order_list(request)
+
+    def test_page_bounds_are_clamped(self):
+        self.create_orders(3)
+
+        response = self.get(per_page=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['per_page'], 1)
+        self.assertEqual(len(response.data['orders']), 1)
+
+        response = self.get(per_page=-5, page=-2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['page'], response.data['per_page']), (1, 1))
+
+        response = self.get(per_page=1000)
+        self.assertEqual(response.data['per_page'], 100)
+        self.assertEqual(len(response.data['orders']), 3)
+
+        response = self.get(pagination='cursor', per_page=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['orders']), 1)
+        self.assertIsNotNone(response.data['next_cursor'])
+
+    def test_non_integer_page_is_rejected(self):
+        self.assertEqual(self.get(per_page='x').status_code, 400)
+        self.assertEqual(self.get(page='1.5').status_code, 400)
+
+    def test_query_count_does_not_grow(self):
+        for params in ({}, {'pagination': 'cursor'}):
+            self.create_orders(1)
+            with CaptureQueriesContext(connection) as single:
+                self.assertEqual(self.get(**params).status_code, 200)
+            self.create_orders(9)
+            with CaptureQueriesContext(connection) as many:
+                response = self.get(**params)
+            self.assertEqual(len(response.data['orders']), 10)
+            self.assertEqual(len(many), len(single), params)
+            Order.objects.all().delete()
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+        'dashboard': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'dashboard'},
+    },
+    DASHBOARD_CACHE_ALIAS='dashboard',
+)
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', is_staff=True)
+        self.customer = User.objects.create(username='customer')
+        self.factory = APIRequestFactory()
+
+    def tearDown(self):
+        dashboard_cache.cache.clear()
+
+    def test_read_through_and_bump(self):
+        cache = DashboardCache(alias='dashboard')
+        builds = []
+
+        def build():
+            builds.append(len(builds) + 1)
+            return {'build': len(builds)}
+
+        self.assertEqual(cache.get_or_build('stats', build), {'build': 1})
+        self.assertEqual(cache.get_or_build('stats', build), {'build': 1})
+        self.assertEqual(len(builds), 1)
+
+        version = cache.get_version()
+        self.assertEqual(cache.bump(), version + 1)
+        self.assertEqual(cache.get_or_build('stats', build), {'build': 2})
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['version']), (1, 2, version + 1))
+
+    def get_stats(self):
+        request = self.factory.get('/api/admin/dashboard/')
+        force_authenticate(request, user=self.admin)
+        return dashboard_stats(request).data['stats']
+
+    def test_order_write_invalidates_dashboard(self):
+        self.assertEqual(self.get_stats()['total_orders'], 0)
+        # Повторная загрузка — из кэша, без обращения к базе
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_stats()['total_orders'], 0)
+
+        version = dashboard_cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(
+                user=self.customer, total_price=Decimal('100'), delivery_address='a',
+                delivery_date=timezone.now()
+            )
+        self.assertGreater(dashboard_cache.get_version(), version)
+        self.assertEqual(self.get_stats()['total_orders'], 1)
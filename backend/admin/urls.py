@@ -17,7 +17,14 @@ urlpatterns = [
     path('api/admin/', include('admin_panel.urls')),
     path('api/health/', health_check, name='health_check'),
     path('dashboard/', views.dashboard, name='admin_dashboard'),
+    path('dashboard/cache-stats/', views.dashboard_cache_stats, name='admin_dashboard_cache_stats'),
+    path('notifications/stats/', views.notification_stats, name='admin_notification_stats'),
     path('analytics/', views.analytics, name='admin_analytics'),
+    path('analytics/top-products/', views.top_products, name='admin_top_products'),
+    path('analytics/customers/', views.customer_list, name='admin_customer_list'),
+    path('analytics/customers/segments/', views.customer_segments, name='admin_customer_segments'),
     path('products/', views.products_list, name='admin_products'),
     path('orders/', views.orders_list, name='admin_orders'),
+    path('orders/export/', views.export_orders, name='admin_orders_export'),
+    path('orders/bulk-status/', views.bulk_update_order_status, name='admin_orders_bulk_status'),
 ]
@@ -2,124 +2,216 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from orders.models import Order
+from orders import customers
+from orders.models import CustomerSummary, Order, DailySales
 from users.models import User
 from products.models import Product
 from django.db.models import Sum, Count
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
+from .analytics import AnalyticsService
+from .cache import dashboard_cache
+from orders.transitions import InvalidTransition, bulk_transition
+from .pagination import InvalidCursor, KeysetPaginator, estimate_count
+from . import export
+from django.http import StreamingHttpResponse
 
-@api_view(['GET'])
-@permission_classes([IsAdminUser])
-def dashboard_stats(request):
-    """Статистика для админ-панели"""
+def build_dashboard_stats():
+    """Собирает данные дашборда (результат кэшируется в dashboard_stats)"""
 
-    # Общая статистика
-    total_orders = Order.objects.count()
-    total_revenue = Order.objects.aggregate(
-        total=Sum('total_price')
-    )['total'] or 0
+    # Общая статистика (из дневной сводки продаж)
+    totals = DailySales.objects.aggregate(
+        orders=Sum('orders_count'),
+        cancelled=Sum('cancelled_count'),
+        revenue=Sum('revenue')
+    )
+    # Число заказов — все заказы, включая отменённые (как до сводок);
+    # выручка — без отменённых заказов: отменённый заказ не оплачивается
+    total_orders = (totals['orders'] or 0) + (totals['cancelled'] or 0)
+    total_revenue = totals['revenue'] or 0
 
     total_customers = User.objects.filter(role='customer').count()
     total_products = Product.objects.filter(is_available=True).count()
 
     # Заказы за последние 30 дней
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_orders = Order.objects.filter(
-        created_at__gte=thirty_days_ago
-    ).extra(
-        select={'date': 'date(created_at)'}
-    ).values('date').annotate(
-        count=Count('id'),
-        revenue=Sum('total_price')
-    ).order_by('date')
-
-    # Топ товаров
-    top_products = Product.objects.annotate(
-        order_count=Count('orderitem')
-    ).filter(order_count__gt=0).order_by('-order_count')[:10]
+    thirty_days_ago = timezone.localdate() - timedelta(days=30)
+    recent_orders = [
+        {
+            'date': row.date,
+            'count': row.orders_count + row.cancelled_count,
+            'revenue': row.revenue
+        }
+        for row in DailySales.objects.filter(date__gte=thirty_days_ago)
+    ]
+
+    # Топ товаров по числу заказов (из сводки продаж по товарам)
+    top_products = AnalyticsService.get_top_products(limit=10, by='orders')
 
     # Статусы заказов
     order_statuses = Order.objects.values('status').annotate(
         count=Count('id')
     )
 
-    return Response({
+    return {
         'stats': {
             'total_orders': total_orders,
             'total_revenue': float(total_revenue),
             'total_customers': total_customers,
             'total_products': total_products
         },
-        'recent_orders': list(recent_orders),
+        'recent_orders': recent_orders,
         'top_products': [
             {
-                'name': product.name,
-                'count': product.order_count
+                'name': product['name'],
+                'count': product['orders']
             }
             for product in top_products
         ],
         'order_statuses': list(order_statuses)
-    })
+    }
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def dashboard_stats(request):
+    """Статистика для админ-панели"""
+    return Response(dashboard_cache.get_or_build('stats', build_dashboard_stats))
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def notification_stats(request):
+    """Глубина очереди и задержка отправки уведомлений Telegram"""
+    from telegram.dispatcher import dispatcher
+    return Response(dispatcher.stats())
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def dashboard_cache_stats(request):
+    """Счётчики попаданий и промахов кэша дашборда"""
+    return Response(dashboard_cache.stats())
+
+# Колонки, по которым разрешена сортировка списка заказов
+ORDER_SORT_FIELDS = (
+    'created_at', '-created_at',
+    'total_price', '-total_price',
+    'delivery_date', '-delivery_date',
+    'id', '-id',
+)
+
+def serialize_order(order):
+    return {
+        'id': order.id,
+        'user': {
+            'id': order.user.id,
+            'username': order.user.username,
+            'first_name': order.user.first_name,
+            'last_name': order.user.last_name
+        },
+        'status': order.status,
+        'total_price': float(order.total_price),
+        'delivery_address': order.delivery_address,
+        'delivery_date': order.delivery_date,
+        'created_at': order.created_at,
+        'items': [
+            {
+                'id': item.id,
+                'product': {
+                    'id': item.product.id,
+                    'name': item.product.name
+                },
+                'quantity': item.quantity,
+                'price': float(item.price)
+            }
+            for item in order.items.all()
+        ]
+    }
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def order_list(request):
-    """Список заказов для админ-панели"""
+    """
+    Список заказов для админ-панели.
+
+    По умолчанию — постраничный режим (?page=N). С ?pagination=cursor или
+    ?cursor=... включается курсорный режим: ответ содержит next_cursor,
+    и любая страница стоит столько же, сколько первая.
+    Параметр ?total=exact|estimate|none управляет подсчётом общего числа
+    (по умолчанию exact для страниц и none для курсора).
+    Фильтры (общие с выгрузкой): ?status=...&since=ГГГГ-ММ-ДД&until=ГГГГ-ММ-ДД
+    """
     orders = Order.objects.select_related('user').prefetch_related('items__product').all()
 
     # Фильтрация
-    status = request.GET.get('status')
-    if status:
-        orders = orders.filter(status=status)
+    try:
+        orders = export.filter_orders(orders, request.GET)
+    except export.InvalidFilter as e:
+        return Response({'error': str(e)}, status=400)
 
-    # Сортировка
-    sort = request.GET.get('sort', '-created_at')
-    orders = orders.order_by(sort)
+    # Сортировка — только по разрешённым колонкам, id как второй ключ
+    paginator = KeysetPaginator(
+        orders, ORDER_SORT_FIELDS, request.GET.get('sort', '-created_at'), '-created_at'
+    )
 
     # Пагинация
-    page = int(request.GET.get('page', 1))
-    per_page = int(request.GET.get('per_page', 20))
-    start = (page - 1) * per_page
-    end = start + per_page
+    try:
+        per_page = min(max(int(request.GET.get('per_page', 20)), 1), 100)
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        return Response({'error': 'Некорректные параметры пагинации'}, status=400)
+
+    cursor_mode = request.GET.get('pagination') == 'cursor' or 'cursor' in request.GET
+    if cursor_mode:
+        try:
+            orders_data, next_cursor = paginator.page(request.GET.get('cursor'), per_page)
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=400)
+        meta = {
+            'next_cursor': next_cursor,
+            'per_page': per_page,
+            'sort': paginator.sort
+        }
+        total_mode = request.GET.get('total', 'none')
+    else:
+        start = (page - 1) * per_page
+        end = start + per_page
+        orders_data = orders.order_by(*paginator.ordering)[start:end]
+        meta = {
+            'page': page,
+            'per_page': per_page
+        }
+        total_mode = request.GET.get('total', 'exact')
 
-    orders_data = orders[start:end]
+    if total_mode == 'estimate':
+        meta['total'] = estimate_count(orders)
+        meta['total_is_estimate'] = True
+    elif total_mode == 'exact':
+        meta['total'] = orders.count()
 
     return Response({
-        'orders': [
-            {
-                'id': order.id,
-                'user': {
-                    'id': order.user.id,
-                    'username': order.user.username,
-                    'first_name': order.user.first_name,
-                    'last_name': order.user.last_name
-                },
-                'status': order.status,
-                'total_price': float(order.total_price),
-                'delivery_address': order.delivery_address,
-                'delivery_date': order.delivery_date,
-                'created_at': order.created_at,
-                'items': [
-                    {
-                        'id': item.id,
-                        'product': {
-                            'id': item.product.id,
-                            'name': item.product.name
-                        },
-                        'quantity': item.quantity,
-                        'price': float(item.price)
-                    }
-                    for item in order.items.all()
-                ]
-            }
-            for order in orders_data
-        ],
-        'total': orders.count(),
-        'page': page,
-        'per_page': per_page
+        'orders': [serialize_order(order) for order in orders_data],
+        **meta
     })
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_orders(request):
+    """
+    Потоковая выгрузка заказов с позициями: ?output=csv|ndjson и те же
+    фильтры, что у списка заказов (status, since, until).
+    """
+    export_format = request.GET.get('output', 'csv')
+    if export_format not in export.EXPORT_FORMATS:
+        return Response({'error': f'output: одно из {", ".join(export.EXPORT_FORMATS)}'}, status=400)
+    try:
+        orders = export.filter_orders(Order.objects.all(), request.GET)
+    except export.InvalidFilter as e:
+        return Response({'error': str(e)}, status=400)
+
+    content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(export.stream(orders, export_format), content_type=content_type)
+    filename = f'orders-{timezone.localdate():%Y%m%d}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @api_view(['PUT'])
 @permission_classes([IsAdminUser])
 def update_order_status(request, order_id):
@@ -131,15 +223,16 @@ def update_order_status(request, order_id):
         if new_status in dict(Order.STATUS_CHOICES):
             old_status = order.status
             order.status = new_status
+            order._updated_by = request.user.username
             order.save()
 
-            # Отправляем уведомление в Telegram
+            # Ставим уведомление в очередь, отправка идёт в фоновом потоке
             from telegram.bot import notifier
-            asyncio.run(notifier.send_order_status_update(
+            notifier.notify_order_status(
                 order_id,
                 new_status,
-                order.user.username  # Предполагаем, что username содержит Telegram ID
-            ))
+                order.user.telegram_id
+            )
 
             return Response({
                 'success': True,
@@ -156,3 +249,108 @@ def update_order_status(request, order_id):
             'success': False,
             'message': 'Заказ не найден'
         }, status=404)
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def bulk_update_order_status(request):
+    """Массовая смена статуса: {"order_ids": [...], "status": "ready"}"""
+    order_ids = request.data.get('order_ids')
+    if not isinstance(order_ids, list):
+        return Response({
+            'success': False,
+            'message': 'order_ids должен быть списком'
+        }, status=400)
+    try:
+        order_ids = [int(order_id) for order_id in order_ids]
+        results = bulk_transition(order_ids, request.data.get('status'), request.user.username)
+    except (TypeError, ValueError) as e:
+        message = str(e) if isinstance(e, InvalidTransition) else 'Неверный id заказа'
+        return Response({'success': False, 'message': message}, status=400)
+
+    return Response({
+        'success': True,
+        'updated': sum(1 for result in results if result['success']),
+        'results': results
+    })
+
+TOP_PRODUCTS_ORDERING = ('sold', 'revenue', 'orders')
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def top_products(request):
+    """Топ товаров за период: ?since=ГГГГ-ММ-ДД&until=...&days=N&limit=10&by=sold"""
+    try:
+        start_date = date.fromisoformat(request.GET['since']) if request.GET.get('since') else None
+        end_date = date.fromisoformat(request.GET['until']) if request.GET.get('until') else None
+        if request.GET.get('days'):
+            start_date = timezone.localdate() - timedelta(days=int(request.GET['days']))
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 100)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Неверный период или limit'
+        }, status=400)
+
+    by = request.GET.get('by', 'sold')
+    if by not in TOP_PRODUCTS_ORDERING:
+        return Response({
+            'success': False,
+            'message': f'by: одно из {", ".join(TOP_PRODUCTS_ORDERING)}'
+        }, status=400)
+
+    return Response({
+        'since': start_date,
+        'until': end_date,
+        'products': AnalyticsService.get_top_products(limit, start_date, end_date, by)
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def customer_segments(request):
+    """RFM-сегменты клиентов: число клиентов, заказов и выручка по сегментам"""
+    return Response(dashboard_cache.get_or_build(
+        'customer_segments', AnalyticsService.get_customer_segments
+    ))
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def customer_list(request):
+    """Клиенты сегмента: ?segment=at_risk&page=1&per_page=50"""
+    segment = request.GET.get('segment')
+    if segment and segment not in customers.SEGMENT_NAMES:
+        return Response({
+            'success': False,
+            'message': f'segment: одно из {", ".join(customers.SEGMENT_NAMES)}'
+        }, status=400)
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        per_page = min(max(int(request.GET.get('per_page', 50)), 1), 200)
+    except ValueError:
+        return Response({'success': False, 'message': 'Неверная страница'}, status=400)
+
+    summaries = customers.scored(CustomerSummary.objects.select_related('user'))
+    if summaries is None:
+        return Response({'customers': [], 'page': page, 'per_page': per_page})
+    if segment:
+        summaries = summaries.filter(segment=segment)
+    summaries = summaries.order_by('-lifetime_value', 'user_id')
+    offset = (page - 1) * per_page
+
+    return Response({
+        'customers': [
+            {
+                'id': summary.user_id,
+                'username': summary.user.username,
+                'first_order_at': summary.first_order_at,
+                'last_order_at': summary.last_order_at,
+                'orders_count': summary.orders_count,
+                'lifetime_value': float(summary.lifetime_value),
+                'preferred_type': summary.preferred_type,
+                'rfm': f'{summary.r}{summary.f}{summary.m}',
+                'segment': summary.segment
+            }
+            for summary in summaries[offset:offset + per_page]
+        ],
+        'page': page,
+        'per_page': per_page
+    })
@@ -0,0 +1,321 @@
+# builder/pricing.py
+"""
+Матрица цен конструктора тортов для мгновенных расчётов.
+
+Цены всех доступных товаров хранятся в массивах NumPy (копейки, int64):
+
+- prices[товар, слот] — цена товара без начинок; слот 0 — без варианта
+  (base_price), слоты 1.. — варианты (base_price × price_multiplier с тем же
+  округлением, что в orders/pricing.py); -1 — пустой слот;
+- slot_variants[товар, слот] — id варианта в слоте (0 — без варианта);
+- filling_prices[начинка] и allowed[товар, начинка] — цены начинок и
+  какие начинки разрешены товару.
+
+Цена позиции = prices[товар, слот] + сумма filling_prices выбранных начинок,
+то есть полная матрица товар × вариант × начинка хранится в разложенном
+виде: это компактнее, а для нескольких начинок сумма всё равно нужна.
+Пачка расчётов считается целиком векторными операциями, без обращения
+к базе.
+
+Матрица привязана к версии каталога (products/cache.py). Если известен
+список изменений между версиями, меняются только строки затронутых
+товаров и начинок (копия массивов, несколько запросов по id); новые
+товары, начинки или варианты сверх ширины матрицы — полная пересборка
+из таблицы цен заказов (orders/pricing.py).
+"""
+import threading
+from decimal import Decimal
+
+import numpy as np
+
+from orders.pricing import get_price_table
+from products.cache import catalog_changes, get_catalog_version
+from products.models import Filling, Product, ProductFilling, ProductVariant
+
+# Коды ошибок расчёта
+OK = 0
+UNKNOWN_PRODUCT = 1
+UNKNOWN_VARIANT = 2
+UNAVAILABLE_FILLING = 3
+
+ERRORS = {
+    UNKNOWN_PRODUCT: 'Товар недоступен',
+    UNKNOWN_VARIANT: 'Вариант не относится к товару',
+    UNAVAILABLE_FILLING: 'Начинка недоступна для товара',
+}
+
+
+def to_kopecks(value):
+    return int(Decimal(value) * 100)
+
+
+def from_kopecks(value):
+    return Decimal(int(value)).scaleb(-2)
+
+
+def _variant_price(base_price, multiplier):
+    return to_kopecks((base_price * multiplier).quantize(base_price))
+
+
+class PriceMatrix:
+    """Неизменяемый снимок цен одной версии каталога"""
+
+    def __init__(self, version, product_ids, prices, slot_variants, filling_ids,
+                 filling_prices, allowed):
+        self.version = version
+        self.product_ids = product_ids
+        self.prices = prices
+        self.slot_variants = slot_variants
+        self.filling_ids = filling_ids
+        # Последний элемент — «нет начинки»: цена 0, разрешена всем
+        self.filling_prices = filling_prices
+        self.allowed = allowed
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (
+            self.product_ids, self.prices, self.slot_variants,
+            self.filling_ids, self.filling_prices, self.allowed,
+        ))
+
+    @classmethod
+    def from_table(cls, table):
+        product_ids = np.array(sorted(table['products']), dtype=np.int64)
+        filling_ids = np.array(sorted(table['fillings']), dtype=np.int64)
+        variants = {}
+        for variant_id, variant in sorted(table['variants'].items()):
+            variants.setdefault(variant['product_id'], []).append((variant_id, variant['multiplier']))
+        slots = 1 + max((len(rows) for rows in variants.values()), default=0)
+
+        prices = np.full((len(product_ids), slots), -1, dtype=np.int64)
+        slot_variants = np.full((len(product_ids), slots), -1, dtype=np.int64)
+        allowed = np.zeros((len(product_ids), len(filling_ids) + 1), dtype=bool)
+        allowed[:, -1] = True
+        for row, product_id in enumerate(product_ids.tolist()):
+            cls._fill_row(
+                prices[row], slot_variants[row], allowed[row], filling_ids,
+                table['products'][product_id]['base_price'],
+                variants.get(product_id, []),
+                table['allowed_fillings'].get(product_id, ()),
+            )
+
+        filling_prices = np.zeros(len(filling_ids) + 1, dtype=np.int64)
+        filling_prices[:-1] = [
+            to_kopecks(table['fillings'][filling_id]['price']) for filling_id in filling_ids.tolist()
+        ]
+        return cls(table['version'], product_ids, prices, slot_variants, filling_ids,
+                   filling_prices, allowed)
+
+    @staticmethod
+    def _fill_row(prices, slot_variants, allowed, filling_ids, base_price, variants, fillings):
+        prices[:] = -1
+        slot_variants[:] = -1
+        prices[0] = to_kopecks(base_price)
+        slot_variants[0] = 0
+        for slot, (variant_id, multiplier) in enumerate(variants, start=1):
+            prices[slot] = _variant_price(base_price, multiplier)
+            slot_variants[slot] = variant_id
+        allowed[:-1] = np.isin(filling_ids, list(fillings))
+
+    def patched(self, version, changes):
+        """
+        Новая матрица с обновлёнными строками изменённых товаров и начинок
+        или None, если изменение меняет форму матрицы.
+        """
+        product_ids = {pk for kind, pk in changes if kind == 'product'}
+        filling_ids = {pk for kind, pk in changes if kind == 'filling'}
+        prices = self.prices.copy()
+        slot_variants = self.slot_variants.copy()
+        allowed = self.allowed.copy()
+        filling_prices = self.filling_prices.copy()
+        known_fillings = set(self.filling_ids.tolist())
+
+        if filling_ids:
+            rows = {
+                pk: (price, available)
+                for pk, price, available in Filling.objects.filter(pk__in=filling_ids).values_list(
+                    'pk', 'price', 'is_available'
+                )
+            }
+            linked = {}
+            for filling_id, product_id in ProductFilling.objects.filter(
+                filling_id__in=filling_ids
+            ).values_list('filling_id', 'product_id'):
+                linked.setdefault(filling_id, []).append(product_id)
+            for pk in filling_ids:
+                price, available = rows.get(pk, (None, False))
+                if pk not in known_fillings:
+                    if available:
+                        return None
+                    continue
+                column = int(np.searchsorted(self.filling_ids, pk))
+                if available:
+                    filling_prices[column] = to_kopecks(price)
+                    allowed[:, column] = np.isin(self.product_ids, linked.get(pk, []))
+                else:
+                    # Недоступная начинка запрещена всем товарам
+                    allowed[:, column] = False
+
+        if product_ids:
+            products = {
+                pk: (base_price, available)
+                for pk, base_price, available in Product.objects.filter(pk__in=product_ids).values_list(
+                    'pk', 'base_price', 'is_available'
+                )
+            }
+            variants = {}
+            for variant_id, product_id, multiplier in ProductVariant.objects.filter(
+                product_id__in=product_ids
+            ).order_by('pk').values_list('pk', 'product_id', 'price_multiplier'):
+                variants.setdefault(product_id, []).append((variant_id, multiplier))
+            links = {}
+            for product_id, filling_id in ProductFilling.objects.filter(
+                product_id__in=product_ids, filling__is_available=True
+            ).values_list('product_id', 'filling_id'):
+                if filling_id not in known_fillings:
+                    return None
+                links.setdefault(product_id, set()).add(filling_id)
+
+            for pk in product_ids:
+                base_price, available = products.get(pk, (None, False))
+                row = int(np.searchsorted(self.product_ids, pk))
+                known = row < len(self.product_ids) and self.product_ids[row] == pk
+                if not known:
+                    if available:
+                        return None
+                    continue
+                if not available:
+                    prices[row] = -1
+                    continue
+                if len(variants.get(pk, [])) + 1 > prices.shape[1]:
+                    return None
+                self._fill_row(
+                    prices[row], slot_variants[row], allowed[row], self.filling_ids,
+                    base_price, variants.get(pk, []), links.get(pk, ()),
+                )
+
+        return PriceMatrix(version, self.product_ids, prices, slot_variants, self.filling_ids,
+                           filling_prices, allowed)
+
+    def quote(self, product_ids, variant_ids, filling_ids, quantities):
+        """
+        Векторный расчёт пачки позиций.
+        product_ids, variant_ids (0 — без варианта), quantities — массивы
+        длины n; filling_ids — матрица n × k (0 — пусто).
+        Возвращает (цена единицы, сумма, код ошибки) — массивы длины n.
+        """
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        variant_ids = np.asarray(variant_ids, dtype=np.int64)
+        filling_ids = np.asarray(filling_ids, dtype=np.int64).reshape(len(product_ids), -1)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        if not len(self.product_ids):
+            zeros = np.zeros(len(product_ids), dtype=np.int64)
+            return zeros, zeros, np.full(len(product_ids), UNKNOWN_PRODUCT)
+
+        rows, product_ok = _lookup(self.product_ids, product_ids)
+        slot_match = self.slot_variants[rows] == variant_ids[:, None]
+        variant_ok = slot_match.any(axis=1)
+        base = self.prices[rows, slot_match.argmax(axis=1)]
+        product_ok &= self.prices[rows, 0] >= 0
+
+        columns, found = _lookup(self.filling_ids, filling_ids)
+        empty = filling_ids == 0
+        # Пустые ячейки указывают на столбец «нет начинки»
+        columns = np.where(found & ~empty, columns, len(self.filling_ids))
+        fillings_ok = (found | empty).all(axis=1) & self.allowed[rows[:, None], columns].all(axis=1)
+
+        unit = base + self.filling_prices[columns].sum(axis=1)
+        errors = np.select(
+            [~product_ok, ~variant_ok, ~fillings_ok],
+            [UNKNOWN_PRODUCT, UNKNOWN_VARIANT, UNAVAILABLE_FILLING],
+            OK
+        )
+        unit = np.where(errors == OK, unit, 0)
+        return unit, unit * quantities, errors
+
+
+def _lookup(ids, values):
+    """Позиции values в отсортированном массиве ids и маска найденных"""
+    if not len(ids):
+        return np.zeros(values.shape, dtype=np.int64), np.zeros(values.shape, dtype=bool)
+    positions = np.minimum(np.searchsorted(ids, values), len(ids) - 1)
+    return positions, ids[positions] == values
+
+
+class QuoteEngine:
+    """Матрица текущей версии каталога (одна на процесс)"""
+
+    def __init__(self):
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.full_builds = 0
+        self.patches = 0
+
+    def matrix(self):
+        version = get_catalog_version()
+        matrix = self._matrix
+        if matrix is not None and matrix.version == version:
+            return matrix
+        with self._lock:
+            if self._matrix is None or self._matrix.version != version:
+                self._matrix = self._refresh(self._matrix, version)
+            return self._matrix
+
+    def _refresh(self, current, version):
+        if current is not None:
+            changes = catalog_changes(current.version, version)
+            if changes is not None:
+                patched = current.patched(version, changes)
+                if patched is not None:
+                    self.patches += 1
+                    return patched
+        self.full_builds += 1
+        return PriceMatrix.from_table(get_price_table(version))
+
+    def quote(self, items):
+        """
+        Расчёт позиций [{'product_id', 'variant_id', 'filling_ids', 'quantity'}].
+        Возвращает (версия каталога, список результатов).
+        """
+        matrix = self.matrix()
+        width = max((len(item.get('filling_ids') or ()) for item in items), default=0) or 1
+        fillings = np.zeros((len(items), width), dtype=np.int64)
+        for n, item in enumerate(items):
+            selected = list(dict.fromkeys(item.get('filling_ids') or ()))
+            fillings[n, :len(selected)] = selected
+        unit, total, errors = matrix.quote(
+            [item['product_id'] for item in items],
+            [item.get('variant_id') or 0 for item in items],
+            fillings,
+            [item.get('quantity', 1) for item in items],
+        )
+
+        results = []
+        for item, unit_price, line_total, error in zip(items, unit.tolist(), total.tolist(), errors.tolist()):
+            result = {
+                'product_id': item['product_id'],
+                'variant_id': item.get('variant_id'),
+                'quantity': item.get('quantity', 1),
+            }
+            if error == OK:
+                result['unit_price'] = from_kopecks(unit_price)
+                result['total'] = from_kopecks(line_total)
+            else:
+                result['error'] = ERRORS[error]
+            results.append(result)
+        return matrix.version, results
+
+    def stats(self):
+        matrix = self._matrix
+        return {
+            'version': matrix.version if matrix else None,
+            'products': len(matrix.product_ids) if matrix else 0,
+            'fillings': len(matrix.filling_ids) if matrix else 0,
+            'bytes': matrix.nbytes if matrix else 0,
+            'full_builds': self.full_builds,
+            'patches': self.patches,
+        }
+
+
+# Глобальный экземпляр (один на процесс)
+engine = QuoteEngine()
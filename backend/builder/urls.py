@@ -1,5 +1,6 @@
 from django.urls import path
+from . import views
 
 urlpatterns = [
-    # Добавьте маршруты для orders, если это необходимо
+    path('quote/', views.quote, name='builder_quote'),
 ]
@@ -0,0 +1,34 @@
+# builder/views.py
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from orders.serializers import OrderItemInputSerializer
+from .pricing import engine
+
+MAX_QUOTE_ITEMS = 1000
+
+class QuoteBatchSerializer(serializers.Serializer):
+    items = OrderItemInputSerializer(many=True, allow_empty=False, max_length=MAX_QUOTE_ITEMS)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def quote(request):
+    """
+    Мгновенный расчёт цены из конструктора без обращения к базе.
+    Одна позиция: {"product_id", "variant_id", "filling_ids", "quantity"};
+    пачка: {"items": [...]}.
+    """
+    batch = 'items' in request.data
+    serializer = (QuoteBatchSerializer if batch else OrderItemInputSerializer)(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    items = serializer.validated_data['items'] if batch else [serializer.validated_data]
+    version, results = engine.quote(items)
+    if batch:
+        return Response({'version': version, 'quotes': results})
+    result = results[0]
+    if 'error' in result:
+        return Response({'version': version, **result}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'version': version, **result})
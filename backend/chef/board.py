@@ -0,0 +1,127 @@
+# chef/board.py
+"""
+Снимок доски кондитеров, который OrderConsumer отправляет сразу после
+подключения (и вместо докачки, если клиент слишком отстал).
+
+В снимок входят все заказы, кроме доставленных и отменённых, с позициями и
+товарами — фиксированное число запросов независимо от числа заказов.
+Готовый JSON-текст строится один раз на версию доски и хранится в памяти
+процесса и в общем кэше, поэтому массовое переподключение планшетов после
+деплоя не нагружает базу. Версия — последний seq журнала событий и счётчик
+изменений данных: правки, не порождающие событий (позиции, адрес, дата
+доставки, клиент, товар), увеличивают счётчик (см. orders/signals.py).
+"""
+import asyncio
+import json
+import threading
+
+from channels.db import database_sync_to_async
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from orders.models import Order, OrderItem
+from .events import ACTIVE_EXCLUDED_STATUSES, latest_seq
+
+BOARD_TIMEOUT = 300
+DATA_VERSION_KEY = 'chef:board:data'
+
+
+def data_version():
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, 1, timeout=None)
+        version = cache.get(DATA_VERSION_KEY, 1)
+    return version
+
+
+def bump_data_version():
+    """Данные заказов доски изменились без события в журнале"""
+    try:
+        return cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        # Ключа ещё нет (или он вытеснен) — создаём счётчик
+        cache.add(DATA_VERSION_KEY, 1, timeout=None)
+        return cache.incr(DATA_VERSION_KEY)
+
+
+def active_orders():
+    return Order.objects.exclude(status__in=ACTIVE_EXCLUDED_STATUSES).select_related(
+        'user'
+    ).prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('pk'))
+    ).order_by('delivery_date', 'pk')
+
+
+def serialize_order(order):
+    return {
+        'id': order.id,
+        'status': order.status,
+        'source': order.source,
+        'total_price': order.total_price,
+        'delivery_date': order.delivery_date,
+        'delivery_address': order.delivery_address,
+        'comment': order.comment,
+        'customer': order.user.get_full_name() or order.user.username,
+        'items': [
+            {
+                'product_id': item.product_id,
+                'product': item.product.name,
+                'quantity': item.quantity,
+                'price': item.price,
+                'filling_details': item.filling_details,
+            }
+            for item in order.items.all()
+        ],
+    }
+
+
+def build_board_text(seq):
+    """JSON-кадр снимка (два запроса: заказы с клиентами и позиции с товарами)"""
+    return json.dumps({
+        'type': 'snapshot',
+        'seq': seq,
+        'orders': [serialize_order(order) for order in active_orders()],
+    }, cls=DjangoJSONEncoder)
+
+
+class BoardSnapshotCache:
+    def __init__(self):
+        self.builds = 0
+        self._local = None  # (seq, версия данных, text)
+        self._local_lock = threading.Lock()
+        self._lock = None
+        self._lock_loop = None
+
+    def get_sync(self):
+        """(seq, текст снимка) для текущей версии доски"""
+        seq = latest_seq()
+        version = data_version()
+        local = self._local
+        if local is not None and local[:2] == (seq, version):
+            return seq, local[2]
+
+        key = f'chef:board:v{seq}:d{version}'
+        text = cache.get(key)
+        if text is None:
+            text = build_board_text(seq)
+            cache.set(key, text, BOARD_TIMEOUT)
+            self.builds += 1
+
+        with self._local_lock:
+            self._local = (seq, version, text)
+        return seq, text
+
+    async def get(self):
+        # Одновременные подключения в процессе ждут один и тот же снимок,
+        # а не строят его каждое заново
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            return await database_sync_to_async(self.get_sync)()
+
+
+# Глобальный экземпляр (один на процесс)
+board_cache = BoardSnapshotCache()
@@ -0,0 +1,135 @@
+# chef/broadcast.py
+"""
+Пакетная рассылка событий доски кондитеров.
+
+При CHEF_BROADCAST_WINDOW_MS > 0 события не отправляются группе по одному:
+они копятся в течение окна, несколько изменений одного заказа сливаются в
+последнее, и по окончании окна группе уходит одно сообщение order_batch с
+заранее сериализованным кадром. Каждый консьюмер отправляет этот текст
+клиенту как есть, без собственного json.dumps. В сообщении перечислены все
+seq окна (seqs), включая слитые: консьюмер отмечает их доставленными и не
+докачивает из журнала.
+
+Окно у каждого процесса своё, поэтому пакеты разных процессов приходят
+вперемешку; консьюмер фильтрует их по отдельным событиям (chef/delivery.py).
+
+Сброс пакета планируется в event loop ASGI-сервера (к нему брокер
+привязывается при подключении консьюмера). В процессах без консьюмеров
+(WSGI-админка, бот) сброс выполняет таймер в отдельном потоке.
+"""
+import json
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+GROUP_NAME = 'chefs'
+
+
+def merge_messages(previous, message):
+    """Сливает два кадра одного заказа в один"""
+    if previous is None:
+        return message
+    if previous['type'] == 'new_order' and message['type'] == 'status_updated':
+        # Новый заказ, статус которого успели сменить в том же окне
+        order_data = dict(previous['order_data'], status=message['status'])
+        return dict(previous, seq=message['seq'], order_data=order_data)
+    return message
+
+
+def build_batch(pending, seqs=None):
+    events = sorted(pending.values(), key=lambda message: message['seq'])
+    frame = {'type': 'batch', 'seq': events[-1]['seq'], 'events': events}
+    return {
+        'type': 'order_batch',
+        'seq': frame['seq'],
+        'seqs': sorted(seqs) if seqs else [message['seq'] for message in events],
+        'events': events,
+        'text': json.dumps(frame),
+    }
+
+
+class CoalescingBroadcaster:
+    def __init__(self, window_ms=None, group=GROUP_NAME):
+        self.window_ms = window_ms
+        self.group = group
+        self._pending = {}
+        self._seqs = []
+        self._scheduled = False
+        self._lock = threading.Lock()
+        self._loop = None
+
+        self.published = 0
+        self.merged = 0
+        self.batches = 0
+
+    @property
+    def window(self):
+        window_ms = self.window_ms
+        if window_ms is None:
+            window_ms = getattr(settings, 'CHEF_BROADCAST_WINDOW_MS', 0)
+        return window_ms / 1000
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def bind(self, loop):
+        """Планировать сбросы в указанном event loop"""
+        self._loop = loop
+
+    def publish(self, message):
+        """Добавляет кадр в текущее окно (можно вызывать из любого потока)"""
+        with self._lock:
+            self.published += 1
+            order_id = message['order_id']
+            if order_id in self._pending:
+                self.merged += 1
+            self._pending[order_id] = merge_messages(self._pending.get(order_id), message)
+            self._seqs.append(message['seq'])
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(loop.call_later, self.window, self._flush_in_loop)
+        else:
+            timer = threading.Timer(self.window, self._flush_in_thread)
+            timer.daemon = True
+            timer.start()
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            seqs, self._seqs = self._seqs, []
+            self._scheduled = False
+        if not pending:
+            return None
+        self.batches += 1
+        return build_batch(pending, seqs)
+
+    def _flush_in_loop(self):
+        batch = self._take()
+        channel_layer = get_channel_layer()
+        if batch is not None and channel_layer is not None:
+            self._loop.create_task(channel_layer.group_send(self.group, batch))
+
+    def _flush_in_thread(self):
+        batch = self._take()
+        channel_layer = get_channel_layer()
+        if batch is not None and channel_layer is not None:
+            async_to_sync(channel_layer.group_send)(self.group, batch)
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'published': self.published,
+            'merged': self.merged,
+            'batches': self.batches,
+        }
+
+
+# Глобальный экземпляр (один на процесс)
+broadcaster = CoalescingBroadcaster()
@@ -1,20 +1,52 @@
 # chef/consumers.py
+import asyncio
 import json
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from admin.metrics import WS_CONNECTIONS, WS_MESSAGES
 from orders.models import Order
+from orders.transitions import InvalidTransition, bulk_transition
+from . import events
+from .board import board_cache
+from .broadcast import broadcaster
+from .delivery import DeliveryTracker
+
+# Сколько ждать опоздавшие события, прежде чем докачивать разрыв из журнала (с)
+GAP_WAIT = 0.5
 
 class OrderConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # Проверяем, что пользователь является кондитером
         if self.scope["user"].is_authenticated and self.scope["user"].role == 'chef':
-            await self.channel_layer.group_add("chefs", self.channel_name)
+            # Какие seq уже доставлены клиенту этим соединением
+            self.tracker = DeliveryTracker()
+            self.gap_task = None
+            await self.channel_layer.group_add(events.GROUP_NAME, self.channel_name)
             await self.accept()
+            self.counted = True
+            WS_CONNECTIONS.inc()
+            if broadcaster.enabled:
+                # Пакеты из этого процесса сбрасываются в цикле сервера
+                broadcaster.bind(asyncio.get_running_loop())
+
+            # Клиент после переподключения передаёт ?last_seq=N
+            query = parse_qs(self.scope.get("query_string", b"").decode())
+            last_seq = self.parse_seq(query.get("last_seq", [None])[0])
+            if last_seq is not None:
+                await self.resume(last_seq)
+            else:
+                await self.send_snapshot()
         else:
             await self.close()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard("chefs", self.channel_name)
+        if getattr(self, 'counted', False):
+            self.counted = False
+            WS_CONNECTIONS.dec()
+        if getattr(self, 'gap_task', None) is not None:
+            self.gap_task.cancel()
+        await self.channel_layer.group_discard(events.GROUP_NAME, self.channel_name)
 
     async def receive(self, text_data):
         data = json.loads(text_data)
@@ -22,46 +54,126 @@ class OrderConsumer(AsyncWebsocketConsumer):
 
         if message_type == 'status_update':
             await self.update_order_status(data)
+        elif message_type == 'bulk_status_update':
+            await self.bulk_update_order_status(data)
+        elif message_type == 'resume':
+            last_seq = self.parse_seq(data.get('last_seq'))
+            if last_seq is not None:
+                await self.resume(last_seq)
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        if text_data is not None or bytes_data is not None:
+            WS_MESSAGES.inc()
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+
+    @staticmethod
+    def parse_seq(value):
+        try:
+            return max(int(value), 0)
+        except (TypeError, ValueError):
+            return None
+
+    async def resume(self, last_seq):
+        """Досылает пропущенные события или снимок доски, если отставание слишком велико"""
+        # Подписка на группу уже оформлена, поэтому события, пришедшие во
+        # время докачки, не теряются; повторы отсекаются по seq
+        backlog = await database_sync_to_async(events.events_since)(last_seq)
+        if backlog is None:
+            await self.send_snapshot()
+            return
+        self.tracker.reset(last_seq)
+        for message in backlog:
+            await self.send_event(message)
+
+    async def send_snapshot(self):
+        """Активные заказы доски одним кадром (общий текст для всех клиентов)"""
+        seq, text = await board_cache.get()
+        self.tracker.reset(seq)
+        await self.send(text_data=text)
 
     async def update_order_status(self, data):
         order_id = data.get('order_id')
         status = data.get('status')
 
-        # Обновляем статус заказа в базе данных
+        # Обновляем статус заказа в базе данных; рассылку кондитерам
+        # делает сигнал заказа через журнал событий (chef/events.py)
         await self.update_order_status_in_db(order_id, status)
 
-        # Отправляем обновление всем кондитерам
-        await self.channel_layer.group_send(
-            "chefs",
-            {
-                "type": "order_status_updated",
-                "order_id": order_id,
-                "status": status,
-                "updated_by": self.scope["user"].username
-            }
-        )
-
     @database_sync_to_async
     def update_order_status_in_db(self, order_id, status):
         try:
             order = Order.objects.get(id=order_id)
             order.status = status
+            order._updated_by = self.scope["user"].username
             order.save()
             return order
         except Order.DoesNotExist:
             return None
 
+    async def bulk_update_order_status(self, data):
+        # Результат по каждому заказу — только отправителю; доске изменения
+        # придут одним кадром batch через журнал событий
+        try:
+            results = await self.bulk_update_in_db(data.get('order_ids') or [], data.get('status'))
+        except (TypeError, ValueError) as e:
+            message = str(e) if isinstance(e, InvalidTransition) else 'Неверный id заказа'
+            await self.send(text_data=json.dumps({'type': 'bulk_status_result', 'error': message}))
+            return
+        await self.send(text_data=json.dumps({'type': 'bulk_status_result', 'results': results}))
+
+    @database_sync_to_async
+    def bulk_update_in_db(self, order_ids, status):
+        order_ids = [int(order_id) for order_id in order_ids]
+        return bulk_transition(order_ids, status, self.scope["user"].username)
+
+    async def send_event(self, message):
+        frame = self.tracker.prepare(message)
+        self.tracker.mark([message['seq']])
+        if frame is not None:
+            self.tracker.remember(frame)
+            await self.send(text_data=json.dumps(frame))
+        self.watch_gap()
+
+    def watch_gap(self):
+        if self.tracker.has_gap and self.gap_task is None:
+            self.gap_task = asyncio.create_task(self.fill_gap())
+
+    async def fill_gap(self):
+        """Докачивает из журнала события, пропущенные между доставленными"""
+        try:
+            await asyncio.sleep(GAP_WAIT)
+            if not self.tracker.has_gap:
+                return
+            backlog = await database_sync_to_async(events.events_since)(self.tracker.last_seq)
+            if backlog is None:
+                await self.send_snapshot()
+                return
+            for message in backlog:
+                await self.send_event(message)
+            self.tracker.skip_gap()
+        finally:
+            self.gap_task = None
+
     async def order_status_updated(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'status_updated',
-            'order_id': event['order_id'],
-            'status': event['status'],
-            'updated_by': event['updated_by']
-        }))
+        await self.send_event(event['message'])
 
     async def new_order_created(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'new_order',
-            'order_id': event['order_id'],
-            'order_data': event['order_data']
-        }))
+        await self.send_event(event['message'])
+
+    async def order_batch(self, event):
+        # Пакеты разных процессов приходят вперемешку — фильтруем по событиям
+        frames = [
+            frame for frame in map(self.tracker.prepare, event['events']) if frame is not None
+        ]
+        self.tracker.mark(event['seqs'])
+        if frames:
+            for frame in frames:
+                self.tracker.remember(frame)
+            if frames == event['events']:
+                # Обычный случай: готовый текст кадра общий для всех клиентов
+                await self.send(text_data=event['text'])
+            else:
+                await self.send(text_data=json.dumps({
+                    'type': 'batch', 'seq': max(frame['seq'] for frame in frames), 'events': frames
+                }))
+        self.watch_gap()
@@ -0,0 +1,95 @@
+# chef/delivery.py
+"""
+Учёт событий доски, доставленных одному клиенту (один экземпляр на соединение).
+
+seq назначаются при вставке в журнал после коммита, а рассылают их разные
+воркеры, поэтому событие с меньшим seq может прийти позже большего. Вместо
+отсечения по максимальному seq хранится непрерывная граница last_seq (все
+seq до неё доставлены) и множество доставленных seq выше неё. Повтор
+отбрасывается только если этот seq уже доставлен.
+
+Пока выше границы есть доставленные seq, в потоке есть разрыв: консьюмер
+ждёт опоздавшие события и затем докачивает недостающие из журнала
+(events_since). seq, которых в журнале нет (вставка откатилась), граница
+перешагивает, но запоминает — если событие всё же придёт, оно будет
+доставлено.
+
+Опоздавшее изменение заказа, для которого клиент уже получил более новый
+кадр, не отправляется (состояние устарело), а опоздавший new_order
+сливается с последним статусом заказа (merge_messages).
+"""
+from collections import OrderedDict
+
+from .broadcast import merge_messages
+
+RECENT_ORDERS = 500
+SKIPPED_LIMIT = 1000
+
+
+class DeliveryTracker:
+    def __init__(self):
+        # Все seq <= last_seq доставлены клиенту или вошли в снимок доски
+        self.last_seq = 0
+        self.ahead = set()
+        self.skipped = set()
+        # order_id -> последний отправленный кадр заказа
+        self.recent = OrderedDict()
+
+    @property
+    def has_gap(self):
+        return bool(self.ahead)
+
+    def delivered(self, seq):
+        if seq in self.skipped:
+            return False
+        return seq <= self.last_seq or seq in self.ahead
+
+    def prepare(self, message):
+        """Кадр для отправки или None (повтор или устаревшее изменение заказа)"""
+        if self.delivered(message['seq']):
+            return None
+        latest = self.recent.get(message['order_id'])
+        if latest is not None and latest['seq'] > message['seq']:
+            merged = merge_messages(message, latest)
+            return None if merged is latest else merged
+        return message
+
+    def remember(self, message):
+        latest = self.recent.get(message['order_id'])
+        if latest is None or latest['seq'] <= message['seq']:
+            self.recent[message['order_id']] = message
+            self.recent.move_to_end(message['order_id'])
+            while len(self.recent) > RECENT_ORDERS:
+                self.recent.popitem(last=False)
+
+    def mark(self, seqs):
+        """Отмечает seq доставленными и сдвигает границу"""
+        for seq in seqs:
+            self.skipped.discard(seq)
+            if seq > self.last_seq:
+                self.ahead.add(seq)
+        while self.last_seq + 1 in self.ahead:
+            self.last_seq += 1
+            self.ahead.discard(self.last_seq)
+
+    def reset(self, seq):
+        """Клиент получил состояние доски на момент seq (снимок или своя докачка)"""
+        self.last_seq = max(self.last_seq, seq)
+        self.ahead = {value for value in self.ahead if value > self.last_seq}
+        self.skipped = {value for value in self.skipped if value > self.last_seq}
+        for order_id in [key for key, message in self.recent.items() if message['seq'] <= self.last_seq]:
+            del self.recent[order_id]
+        self.mark(())
+
+    def skip_gap(self):
+        """После докачки: недостающих seq в журнале нет — перешагнуть разрыв"""
+        if not self.ahead:
+            return
+        top = max(self.ahead)
+        self.skipped.update(
+            seq for seq in range(self.last_seq + 1, top) if seq not in self.ahead
+        )
+        if len(self.skipped) > SKIPPED_LIMIT:
+            self.skipped = set(sorted(self.skipped)[-SKIPPED_LIMIT:])
+        self.last_seq = top
+        self.ahead.clear()
@@ -0,0 +1,130 @@
+# chef/events.py
+"""
+Нумерованный поток событий доски кондитеров.
+
+Каждое событие (новый заказ, смена статуса) сначала записывается в
+OrderEvent и получает seq, затем рассылается группе "chefs". Клиент
+запоминает последний полученный seq и при переподключении передаёт его
+(?last_seq=N или сообщение {"type": "resume", "last_seq": N}) — ему
+досылаются только пропущенные события. Если клиент отстал больше чем на
+CHEF_EVENT_REPLAY_LIMIT событий или нужные события уже удалены из
+журнала, вместо докачки отправляется снимок доски (chef/board.py).
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from .broadcast import GROUP_NAME, broadcaster, build_batch
+from .models import OrderEvent
+
+ACTIVE_EXCLUDED_STATUSES = ('delivered', 'cancelled')
+PRUNE_EVERY = 100
+
+# Тип сообщения channel layer -> обработчик в OrderConsumer
+HANDLERS = {
+    'new_order': 'new_order_created',
+    'status_updated': 'order_status_updated',
+}
+
+
+def _retention():
+    return getattr(settings, 'CHEF_EVENT_RETENTION', 1000)
+
+
+def _replay_limit():
+    return getattr(settings, 'CHEF_EVENT_REPLAY_LIMIT', 200)
+
+
+def latest_seq():
+    return OrderEvent.objects.order_by('-seq').values_list('seq', flat=True).first() or 0
+
+
+def prune(keep=None):
+    """Оставляет в журнале последние keep событий"""
+    keep = _retention() if keep is None else keep
+    boundary = latest_seq() - keep
+    if boundary <= 0:
+        return 0
+    deleted, _ = OrderEvent.objects.filter(seq__lte=boundary).delete()
+    return deleted
+
+
+def broadcast(message):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(
+        GROUP_NAME, {'type': HANDLERS[message['type']], 'message': message}
+    )
+
+
+def publish_event(kind, order_id, payload):
+    """Записывает событие в журнал и рассылает его кондитерам"""
+    event = OrderEvent.objects.create(kind=kind, order_id=order_id, payload=payload)
+    if event.seq % PRUNE_EVERY == 0:
+        prune()
+    # Значения payload после записи в JSONField: Decimal/datetime -> строки
+    event.refresh_from_db(fields=['payload'])
+    message = event.as_message()
+    if broadcaster.enabled:
+        # Пакетная рассылка с окном CHEF_BROADCAST_WINDOW_MS (chef/broadcast.py)
+        broadcaster.publish(message)
+    else:
+        broadcast(message)
+    return message
+
+
+def publish_on_commit(kind, order_id, payload):
+    # Событие получает номер только после коммита заказа, иначе seq мог бы
+    # опередить данные, которые клиент увидит при повторном чтении
+    transaction.on_commit(lambda: publish_event(kind, order_id, payload))
+
+
+def publish_batch(events):
+    """
+    Записывает пачку событий [(kind, order_id, payload)] одной вставкой и
+    рассылает их кондитерам одним кадром batch (массовая смена статуса).
+    """
+    if not events:
+        return []
+    created = OrderEvent.objects.bulk_create([
+        OrderEvent(kind=kind, order_id=order_id, payload=payload)
+        for kind, order_id, payload in events
+    ])
+    if created[-1].seq // PRUNE_EVERY != (created[0].seq - 1) // PRUNE_EVERY:
+        prune()
+    messages = [event.as_message() for event in created]
+    if broadcaster.enabled:
+        # Попадут в текущее окно пакетирования вместе с остальными событиями
+        for message in messages:
+            broadcaster.publish(message)
+        return messages
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        batch = build_batch({message['order_id']: message for message in messages})
+        async_to_sync(channel_layer.group_send)(GROUP_NAME, batch)
+    return messages
+
+
+def publish_batch_on_commit(events):
+    transaction.on_commit(lambda: publish_batch(events))
+
+
+def events_since(last_seq):
+    """
+    Список кадров с seq > last_seq или None, если докачка невозможна
+    (отставание больше лимита или события уже удалены из журнала).
+    """
+    latest = latest_seq()
+    if last_seq == latest:
+        return []
+    if last_seq > latest or latest - last_seq > _replay_limit():
+        return None
+    events = list(OrderEvent.objects.filter(seq__gt=last_seq).order_by('seq'))
+    if not events or events[0].seq != last_seq + 1:
+        oldest = OrderEvent.objects.order_by('seq').values_list('seq', flat=True).first()
+        if oldest is None or oldest > last_seq + 1:
+            return None
+    return [event.as_message() for event in events]
+
@@ -0,0 +1,322 @@
+# chef/loadtest.py
+"""
+Нагрузочный прогон веб-сокета кондитеров через channels.testing.
+
+N кондитеров с сессией входа подключаются через AuthMiddlewareStack и
+chef.routing.websocket_urlpatterns, затем пачкой меняются статусы заказов
+(через обычный Order.save, то есть сигнал -> журнал событий -> рассылка).
+Для каждого клиента фиксируется время получения каждого кадра; задержка
+события считается от OrderEvent.created_at до получения кадра.
+
+Отчёт: время установки соединения, перцентили задержки рассылки, кадры в
+секунду, память на одно соединение (tracemalloc, отдельным проходом,
+чтобы трассировка не искажала время). Слой каналов — in-memory или
+локальный Redis, если он доступен. Результаты сохраняются в JSON для
+сравнения между релизами.
+"""
+import asyncio
+import gc
+import json
+import platform
+import time
+import tracemalloc
+
+import channels
+import django
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from orders.models import Order
+from orders.seed import delete_bench_users
+from users.models import User
+from .broadcast import broadcaster
+from .consumers import OrderConsumer
+from .models import OrderEvent
+from .routing import websocket_urlpatterns
+
+BENCH_PREFIX = 'bench_chef_'
+STATUS_CYCLE = ('processing', 'baking', 'ready')
+WS_PATH = '/ws/chef/orders/'
+
+MEMORY_LAYER = {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+
+
+def prepare_board(chefs, orders):
+    """Создаёт кондитеров с сессиями входа и заказы для прогона"""
+    chef_users = User.objects.bulk_create([
+        User(username=f'{BENCH_PREFIX}{i}', role='chef') for i in range(chefs)
+    ])
+    customer = User.objects.create(username=f'{BENCH_PREFIX}customer', role='customer')
+    now = timezone.now()
+    order_list = Order.objects.bulk_create([
+        Order(
+            user=customer,
+            total_price=1000,
+            delivery_address='benchmark',
+            delivery_date=now
+        )
+        for _ in range(orders)
+    ])
+    sessions = [make_session(user) for user in chef_users]
+    return chef_users, sessions, [order.pk for order in order_list]
+
+
+def make_session(user):
+    """Сессия, как после входа через django.contrib.auth; возвращает ключ"""
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
+
+
+def cleanup_board():
+    order_ids = list(
+        Order.objects.filter(user__username__startswith=BENCH_PREFIX).values_list('pk', flat=True)
+    )
+    OrderEvent.objects.filter(order_id__in=order_ids).delete()
+    delete_bench_users(User.objects.filter(username__startswith=BENCH_PREFIX))
+
+
+def redis_available(url):
+    try:
+        import channels_redis  # noqa: F401
+        import redis
+        redis.Redis.from_url(url, socket_connect_timeout=0.5).ping()
+    except Exception:
+        return False
+    return True
+
+
+def layer_config(layer, redis_url=None):
+    """CHANNEL_LAYERS для прогона: 'memory', 'redis' или 'auto'"""
+    redis_url = redis_url or getattr(settings, 'REDIS_URL', 'redis://localhost:6379/0')
+    if layer == 'memory':
+        return 'memory', MEMORY_LAYER
+    if layer == 'redis' or (layer == 'auto' and redis_available(redis_url)):
+        return 'redis', {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [redis_url]},
+        }
+    return 'memory', MEMORY_LAYER
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(values, digits=2):
+    return {
+        'p50': round(percentile(values, 0.5) or 0, digits),
+        'p95': round(percentile(values, 0.95) or 0, digits),
+        'p99': round(percentile(values, 0.99) or 0, digits),
+        'max': round(max(values, default=0), digits),
+    }
+
+
+def _change_status(order_id, status):
+    order = Order.objects.get(pk=order_id)
+    order.status = status
+    order._updated_by = 'loadtest'
+    order.save()
+
+
+def _event_times(seqs):
+    return {
+        seq: created_at.timestamp()
+        for seq, created_at in OrderEvent.objects.filter(seq__in=seqs).values_list('seq', 'created_at')
+    }
+
+
+def _frame_seqs(text):
+    frame = json.loads(text)
+    if frame.get('type') == 'batch':
+        return [event['seq'] for event in frame['events']]
+    if 'seq' in frame and frame.get('type') != 'snapshot':
+        return [frame['seq']]
+    return []
+
+
+async def connect_chef(user, path=WS_PATH, session_key=None):
+    """
+    Подключает кондитера. С session_key — через cookie сессии и
+    AuthMiddlewareStack, как настоящий клиент; без него пользователь
+    подставляется в scope напрямую.
+    """
+    if session_key:
+        communicator = WebsocketCommunicator(
+            AuthMiddlewareStack(URLRouter(websocket_urlpatterns)),
+            path,
+            headers=[(b'cookie', f'{settings.SESSION_COOKIE_NAME}={session_key}'.encode())]
+        )
+    else:
+        communicator = WebsocketCommunicator(OrderConsumer.as_asgi(), path)
+        communicator.scope['user'] = user
+    connected, _ = await communicator.connect()
+    if not connected:
+        raise RuntimeError(f'Не удалось подключить {user.username}')
+    # Первый кадр — снимок доски (chef/board.py)
+    await communicator.receive_from()
+    return communicator
+
+
+async def _connect_all(chefs, sessions):
+    communicators = []
+    timings = []
+    for user, session_key in zip(chefs, sessions):
+        started = time.perf_counter()
+        communicators.append(await connect_chef(user, session_key=session_key))
+        timings.append((time.perf_counter() - started) * 1000)
+    return communicators, timings
+
+
+async def _disconnect_all(communicators):
+    for communicator in communicators:
+        await communicator.disconnect()
+
+
+async def _measure_memory(chefs, sessions):
+    """Прирост памяти Python на одно открытое соединение, байт"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        communicators, _ = await _connect_all(chefs, sessions)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    await _disconnect_all(communicators)
+    return (after - before) / max(len(chefs), 1)
+
+
+async def _read_frames(communicator, frames, driver_done, idle):
+    # receive_from() при таймауте отменяет консьюмер, поэтому читаем очередь напрямую
+    while True:
+        try:
+            message = await asyncio.wait_for(communicator.output_queue.get(), idle)
+        except asyncio.TimeoutError:
+            if driver_done.is_set():
+                return
+            continue
+        if message.get('type') == 'websocket.send':
+            frames.append((time.time(), message['text']))
+
+
+async def _run(chefs, sessions, order_ids, updates, rate, measure_memory):
+    memory_per_connection = None
+    if measure_memory:
+        memory_per_connection = await _measure_memory(chefs, sessions)
+
+    started = time.perf_counter()
+    communicators, connect_timings = await _connect_all(chefs, sessions)
+    connect_seconds = time.perf_counter() - started
+
+    driver_done = asyncio.Event()
+    idle = broadcaster.window + 0.5
+    received = [[] for _ in communicators]
+    readers = [
+        asyncio.create_task(_read_frames(communicator, frames, driver_done, idle))
+        for communicator, frames in zip(communicators, received)
+    ]
+
+    started = time.time()
+    for n in range(updates):
+        order_id = order_ids[n % len(order_ids)]
+        status = STATUS_CYCLE[(n // len(order_ids)) % len(STATUS_CYCLE)]
+        await database_sync_to_async(_change_status)(order_id, status)
+        if rate:
+            await asyncio.sleep(1 / rate)
+    driver_done.set()
+    await asyncio.gather(*readers)
+
+    # Длительность — от первого изменения до последнего полученного кадра
+    last_frame = max((frames[-1][0] for frames in received if frames), default=time.time())
+    duration = last_frame - started
+    await _disconnect_all(communicators)
+    return {
+        'connect_seconds': connect_seconds,
+        'connect_timings': connect_timings,
+        'memory_per_connection': memory_per_connection,
+        'duration': max(duration, 1e-9),
+        'received': received,
+    }
+
+
+def run_broadcast_benchmark(clients=20, updates=200, orders=20, window_ms=0, rate=None,
+                            layer='memory', redis_url=None, measure_memory=True):
+    """Прогон с заданным окном пакетирования, возвращает dict с метриками"""
+    layer_name, layer_settings = layer_config(layer, redis_url)
+    chefs, sessions, order_ids = prepare_board(clients, orders)
+    previous_window = broadcaster.window_ms
+    broadcaster.window_ms = window_ms
+    before = broadcaster.stats()
+    try:
+        with override_settings(CHANNEL_LAYERS={'default': layer_settings}):
+            layer_backend = type(get_channel_layer()).__name__
+            run = asyncio.run(_run(chefs, sessions, order_ids, updates, rate, measure_memory))
+    finally:
+        broadcaster.window_ms = previous_window
+    after = broadcaster.stats()
+
+    received = run['received']
+    deliveries = [
+        (received_at, seq)
+        for frames in received
+        for received_at, text in frames
+        for seq in _frame_seqs(text)
+    ]
+    created = _event_times({seq for _, seq in deliveries})
+    latencies = [
+        (received_at - created[seq]) * 1000
+        for received_at, seq in deliveries if seq in created
+    ]
+    frames = sum(len(frames) for frames in received)
+    duration = run['duration']
+    memory = run['memory_per_connection']
+    return {
+        'clients': clients,
+        'updates': updates,
+        'window_ms': window_ms,
+        'layer': layer_name,
+        'layer_backend': layer_backend,
+        'connect_seconds': round(run['connect_seconds'], 4),
+        'connect_ms': summarize(run['connect_timings']),
+        'memory_per_connection_kb': round(memory / 1024, 1) if memory is not None else None,
+        'duration_seconds': round(duration, 4),
+        'frames': frames,
+        'frames_per_client': round(frames / max(clients, 1), 2),
+        'frames_per_second': round(frames / duration, 1),
+        'events_delivered': len(deliveries),
+        'batches': after['batches'] - before['batches'],
+        'merged': after['merged'] - before['merged'],
+        'latency_ms': summarize(latencies),
+    }
+
+
+def environment():
+    return {
+        'started_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'channels': channels.__version__,
+        'database': connection.vendor,
+    }
+
+
+def save_results(path, runs):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump({'environment': environment(), 'runs': runs}, output, ensure_ascii=False, indent=2)
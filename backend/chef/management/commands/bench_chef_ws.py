@@ -0,0 +1,54 @@
+# chef/management/commands/bench_chef_ws.py
+import json
+
+from django.core.management.base import BaseCommand
+
+from chef.loadtest import cleanup_board, environment, run_broadcast_benchmark, save_results
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон веб-сокета кондитеров: время подключения, задержка '
+        'рассылки, кадры в секунду и память на соединение'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=20, help='Подключённых кондитеров')
+        parser.add_argument('--updates', type=int, default=200, help='Изменений статуса')
+        parser.add_argument('--orders', type=int, default=20, help='Заказов на доске')
+        parser.add_argument(
+            '--window-ms', type=int, nargs='+', default=[0, 50],
+            help='Окна пакетирования для сравнения (0 — без пакетирования)'
+        )
+        parser.add_argument('--rate', type=float, help='Изменений в секунду (по умолчанию — без пауз)')
+        parser.add_argument(
+            '--layer', choices=['memory', 'redis', 'auto'], default='auto',
+            help='Слой каналов: in-memory, Redis или Redis при наличии (по умолчанию)'
+        )
+        parser.add_argument('--redis-url', help='Адрес Redis (по умолчанию REDIS_URL)')
+        parser.add_argument('--no-memory', action='store_true', help='Не измерять память на соединение')
+        parser.add_argument('--output', help='Сохранить результаты в JSON-файл')
+
+    def handle(self, *args, **options):
+        runs = []
+        for window_ms in options['window_ms']:
+            try:
+                runs.append(run_broadcast_benchmark(
+                    clients=options['clients'],
+                    updates=options['updates'],
+                    orders=options['orders'],
+                    window_ms=window_ms,
+                    rate=options['rate'],
+                    layer=options['layer'],
+                    redis_url=options['redis_url'],
+                    measure_memory=not options['no_memory'],
+                ))
+            finally:
+                cleanup_board()
+
+        if options['output']:
+            save_results(options['output'], runs)
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+        self.stdout.write(json.dumps(
+            {'environment': environment(), 'runs': runs}, ensure_ascii=False, indent=2
+        ))
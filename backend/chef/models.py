@@ -0,0 +1,29 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+class OrderEvent(models.Model):
+    """
+    Журнал событий доски кондитеров. Номер seq растёт монотонно, клиент
+    после переподключения запрашивает события после last_seq (см. chef/events.py).
+    Хранятся последние CHEF_EVENT_RETENTION событий.
+    """
+    KIND_CHOICES = [
+        ('new_order', 'Новый заказ'),
+        ('status_updated', 'Статус изменён'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    order_id = models.BigIntegerField()  # без FK: событие переживает удаление заказа
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
+
+    def __str__(self):
+        return f"#{self.seq} {self.kind} заказа #{self.order_id}"
+
+    def as_message(self):
+        """Кадр для клиента в прежнем формате, дополненный номером seq"""
+        return {'type': self.kind, 'seq': self.seq, 'order_id': self.order_id, **self.payload}
@@ -1,7 +1,8 @@
 # chef/routing.py
 from django.urls import re_path
+from admin.middleware import instrument_consumer
 from . import consumers
 
 websocket_urlpatterns = [
-    re_path(r'ws/chef/orders/$', consumers.OrderConsumer.as_asgi()),
+    re_path(r'ws/chef/orders/$', instrument_consumer(consumers.OrderConsumer).as_asgi()),
 ]
@@ -0,0 +1,103 @@
+import json
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from products.models import Product
+from users.models import User
+from .board import BoardSnapshotCache
+from .delivery import DeliveryTracker
+
+
+def status(seq, order_id, value='ready'):
+    return {'type': 'status_updated', 'seq': seq, 'order_id': order_id, 'status': value}
+
+
+class DeliveryTrackerTests(SimpleTestCase):
+    def deliver(self, tracker, message):
+        frame = tracker.prepare(message)
+        tracker.mark([message['seq']])
+        if frame is not None:
+            tracker.remember(frame)
+        return frame
+
+    def test_late_lower_seq_is_delivered(self):
+        tracker = DeliveryTracker()
+        self.assertIsNotNone(self.deliver(tracker, status(1, 10)))
+        self.assertIsNotNone(self.deliver(tracker, status(3, 30)))
+        self.assertTrue(tracker.has_gap)
+        # seq 2 пришёл от другого воркера позже seq 3
+        self.assertIsNotNone(self.deliver(tracker, status(2, 20)))
+        self.assertFalse(tracker.has_gap)
+        self.assertEqual(tracker.last_seq, 3)
+
+    def test_duplicate_is_dropped(self):
+        tracker = DeliveryTracker()
+        self.deliver(tracker, status(1, 10))
+        self.deliver(tracker, status(3, 30))
+        self.assertIsNone(self.deliver(tracker, status(3, 30)))
+        self.assertIsNone(self.deliver(tracker, status(1, 10)))
+
+    def test_superseded_change_of_same_order_is_dropped(self):
+        tracker = DeliveryTracker()
+        self.deliver(tracker, status(2, 10, 'ready'))
+        self.assertIsNone(self.deliver(tracker, status(1, 10, 'baking')))
+        self.assertEqual(tracker.last_seq, 2)
+
+    def test_late_new_order_gets_latest_status(self):
+        tracker = DeliveryTracker()
+        self.deliver(tracker, status(2, 10, 'baking'))
+        frame = self.deliver(tracker, {
+            'type': 'new_order', 'seq': 1, 'order_id': 10, 'order_data': {'id': 10, 'status': 'new'}
+        })
+        self.assertEqual(frame['order_data']['status'], 'baking')
+
+    def test_skipped_gap_still_accepts_late_event(self):
+        tracker = DeliveryTracker()
+        self.deliver(tracker, status(1, 10))
+        self.deliver(tracker, status(3, 30))
+        # Докачка не нашла seq 2 в журнале
+        tracker.skip_gap()
+        self.assertEqual(tracker.last_seq, 3)
+        self.assertIsNotNone(self.deliver(tracker, status(2, 20)))
+        self.assertIsNone(self.deliver(tracker, status(2, 20)))
+
+    def test_snapshot_covers_older_events(self):
+        tracker = DeliveryTracker()
+        tracker.reset(5)
+        self.assertIsNone(self.deliver(tracker, status(4, 10)))
+        self.assertIsNotNone(self.deliver(tracker, status(6, 10)))
+
+
+class BoardSnapshotCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username='customer')
+        product = Product.objects.create(
+            name='Торт', description='d', type='bento', base_price=Decimal('100'), image='x'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order = Order.objects.create(
+                user=user, total_price=Decimal('100'), delivery_address='a', delivery_date=timezone.now()
+            )
+            self.item = OrderItem.objects.create(
+                order=self.order, product=product, quantity=1, price=Decimal('100')
+            )
+
+    def board(self):
+        seq, text = BoardSnapshotCache().get_sync()
+        return json.loads(text)['orders'][0]
+
+    def test_edit_without_event_refreshes_snapshot(self):
+        self.assertEqual(self.board()['items'][0]['quantity'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.quantity = 3
+            self.item.save()
+            self.order.delivery_address = 'b'
+            self.order.save(update_fields=['delivery_address'])
+        board = self.board()
+        self.assertEqual(board['items'][0]['quantity'], 3)
+        self.assertEqual(board['delivery_address'], 'b')
@@ -26,6 +26,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'admin.metrics.MetricsMiddleware',
+    # Выключен, пока не задан QUERY_INSTRUMENTATION
+    'admin.middleware.QueryInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -58,6 +61,58 @@ CACHES = {
     }
 }
 
+# Кэш дашборда: общий Redis, если задан DASHBOARD_CACHE_URL, иначе кэш процесса
+DASHBOARD_CACHE_URL = config('DASHBOARD_CACHE_URL', default='')
+if DASHBOARD_CACHE_URL:
+    CACHES['dashboard'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': DASHBOARD_CACHE_URL,
+    }
+else:
+    CACHES['dashboard'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard',
+    }
+DASHBOARD_CACHE_ALIAS = 'dashboard'
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=300, cast=int)
+
+# Telegram: очередь фоновой отправки уведомлений (telegram/dispatcher.py)
+TELEGRAM_API_BASE_URL = config('TELEGRAM_API_BASE_URL', default='https://api.telegram.org/bot')
+TELEGRAM_NOTIFY_QUEUE_SIZE = config('TELEGRAM_NOTIFY_QUEUE_SIZE', default=1000, cast=int)
+TELEGRAM_NOTIFY_WORKERS = config('TELEGRAM_NOTIFY_WORKERS', default=4, cast=int)
+TELEGRAM_IDENTITY_CACHE_SIZE = config('TELEGRAM_IDENTITY_CACHE_SIZE', default=10000, cast=int)
+TELEGRAM_BOT_DB_THREADS = config('TELEGRAM_BOT_DB_THREADS', default=8, cast=int)
+TELEGRAM_BOT_CONCURRENT_UPDATES = config('TELEGRAM_BOT_CONCURRENT_UPDATES', default=64, cast=int)
+TELEGRAM_CATALOG_CHECK_INTERVAL = config('TELEGRAM_CATALOG_CHECK_INTERVAL', default=1.0, cast=float)
+
+# Telegram: режим вебхука (telegram/webhook.py)
+TELEGRAM_WEBHOOK_URL = config('TELEGRAM_WEBHOOK_URL', default='')
+TELEGRAM_WEBHOOK_SECRET = config('TELEGRAM_WEBHOOK_SECRET', default='')
+TELEGRAM_WEBHOOK_WORKERS = config('TELEGRAM_WEBHOOK_WORKERS', default=8, cast=int)
+TELEGRAM_WEBHOOK_QUEUE_SIZE = config('TELEGRAM_WEBHOOK_QUEUE_SIZE', default=1000, cast=int)
+TELEGRAM_WEBHOOK_DEDUP_SIZE = config('TELEGRAM_WEBHOOK_DEDUP_SIZE', default=10000, cast=int)
+# Общий для всех процессов учёт update_id через кэш (Redis); включается явно
+TELEGRAM_WEBHOOK_SHARED_DEDUP = config('TELEGRAM_WEBHOOK_SHARED_DEDUP', default=False, cast=bool)
+
+# Доска кондитеров: журнал событий для докачки после переподключения (chef/events.py)
+CHEF_EVENT_RETENTION = config('CHEF_EVENT_RETENTION', default=1000, cast=int)
+CHEF_EVENT_REPLAY_LIMIT = config('CHEF_EVENT_REPLAY_LIMIT', default=200, cast=int)
+# Окно пакетной рассылки кондитерам в мс, 0 — отправлять каждое событие сразу
+CHEF_BROADCAST_WINDOW_MS = config('CHEF_BROADCAST_WINDOW_MS', default=0, cast=int)
+
+# Архив завершённых заказов: возраст в днях для archive_orders (orders/archive.py)
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+
+# Учёт SQL-запросов на запрос: Server-Timing, бюджет, поиск N+1 (admin/middleware.py)
+QUERY_INSTRUMENTATION = config('QUERY_INSTRUMENTATION', default=False, cast=bool)
+QUERY_BUDGET = config('QUERY_BUDGET', default=50, cast=int)
+QUERY_N1_THRESHOLD = config('QUERY_N1_THRESHOLD', default=5, cast=int)
+
+# Метрики Prometheus (admin/metrics.py); при нескольких воркерах задайте PROMETHEUS_MULTIPROC_DIR
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# Без токена /metrics/ отвечает 403, если DEBUG выключен
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
@@ -92,3 +147,5 @@ USE_I18N = True
 USE_TZ = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+AUTH_USER_MODEL = 'users.User'
@@ -1,10 +1,22 @@
 # backend/management/commands/check_db.py
+import json
+
 from django.core.management.base import BaseCommand
 from django.db import connection
 from django.db.utils import OperationalError
 
 class Command(BaseCommand):
-    help = 'Проверяет подключение к базе данных'
+    help = 'Проверяет подключение к базе данных и планы горячих запросов (--explain)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--explain', action='store_true',
+                            help='EXPLAIN и замер задержки горячих запросов')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Сколько раз выполнять каждый запрос для замера')
+        parser.add_argument('--only', nargs='+', metavar='NAME',
+                            help='Только указанные запросы')
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести отчёт в JSON')
 
     def handle(self, *args, **options):
         try:
@@ -17,3 +29,33 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR('Ошибка подключения к базе данных!')
             )
+            return
+
+        if options['explain']:
+            self.explain(options)
+
+    def explain(self, options):
+        from admin import diagnostics
+
+        report = diagnostics.run(names=options['only'], repeat=max(1, options['repeat']))
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f'База: {connection.vendor}')
+        for result in report:
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{result['name']} — {result['description']}"))
+            for line in result['plan']:
+                self.stdout.write(f'  {line}')
+            cost = f", стоимость {result['cost']}, строк ~{result['rows']}" if result['cost'] is not None else ''
+            self.stdout.write(
+                f"  медиана {result['median_ms']} мс, p95 {result['p95_ms']} мс{cost}"
+            )
+            for warning in result['warnings']:
+                self.stdout.write(self.style.WARNING(f'  ! {warning}'))
+
+        problems = sum(1 for result in report if result['warnings'])
+        style = self.style.WARNING if problems else self.style.SUCCESS
+        self.stdout.write('')
+        self.stdout.write(style(f'Запросов: {len(report)}, с замечаниями: {problems}'))
@@ -0,0 +1,100 @@
+# orders/archive.py
+"""
+Перенос старых завершённых заказов в архив (ArchivedOrder / ArchivedOrderItem).
+
+Доставленные и отменённые заказы старше ORDER_ARCHIVE_AFTER_DAYS дней
+(по дате создания) переносятся небольшими пачками: каждая пачка — одна
+транзакция (блокировка заказов, повторная проверка статуса, bulk_create в
+архив, удаление из Order). Прерванный перенос продолжается с того же
+места: перенесённые заказы из Order уже удалены, а незавершённая пачка
+откатывается целиком.
+
+Сводки продаж и клиентов при переносе не меняются (сигналы удаления
+отключены через signals.archiving()), а их пересчёт учитывает архив —
+статистика за прошлые периоды остаётся прежней. Клиент видит архивные
+заказы через /api/orders/archive/ и в боте («Мой заказ»). Статусы
+доставленных и отменённых заказов конечные, поэтому архивный заказ
+больше не меняется.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from admin.cache import dashboard_cache
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .signals import archiving
+
+ARCHIVE_STATUSES = ('delivered', 'cancelled')
+
+ORDER_FIELDS = [
+    'id', 'user_id', 'status', 'source', 'total_price', 'delivery_address',
+    'delivery_date', 'comment', 'created_at', 'updated_at',
+]
+ITEM_FIELDS = ['id', 'order_id', 'product_id', 'variant_id', 'quantity', 'price', 'filling_details']
+
+
+def archive_after_days():
+    return getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+
+
+def cutoff_for(days=None):
+    return timezone.now() - timedelta(days=archive_after_days() if days is None else days)
+
+
+def candidates(cutoff):
+    """Заказы, которые можно перенести в архив"""
+    return Order.objects.filter(status__in=ARCHIVE_STATUSES, created_at__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=500, after_id=0):
+    """
+    Переносит до batch_size заказов с id > after_id одной транзакцией.
+    Возвращает (перенесено заказов, перенесено позиций, последний id пачки
+    или None, если кандидатов больше нет).
+    """
+    order_ids = list(
+        candidates(cutoff).filter(pk__gt=after_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not order_ids:
+        return 0, 0, None
+
+    with transaction.atomic():
+        # Статус мог измениться после выборки — проверяем под блокировкой
+        orders = list(
+            candidates(cutoff).select_for_update().filter(pk__in=order_ids).values(*ORDER_FIELDS)
+        )
+        moved_ids = [order['id'] for order in orders]
+        items = list(OrderItem.objects.filter(order_id__in=moved_ids).values(*ITEM_FIELDS))
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+        ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**item) for item in items])
+        with archiving():
+            Order.objects.filter(pk__in=moved_ids).delete()
+        if moved_ids:
+            transaction.on_commit(dashboard_cache.bump)
+
+    return len(moved_ids), len(items), order_ids[-1]
+
+
+def archive(cutoff, batch_size=500, pause=0.0, max_batches=None, progress=None):
+    """
+    Переносит все подходящие заказы пачками; между пачками — пауза pause
+    секунд, чтобы не мешать рабочей нагрузке. Возвращает (заказов, позиций).
+    """
+    total_orders = total_items = batches = 0
+    after_id = 0
+    while max_batches is None or batches < max_batches:
+        moved, items, after_id = archive_batch(cutoff, batch_size, after_id)
+        if after_id is None:
+            break
+        batches += 1
+        total_orders += moved
+        total_items += items
+        if progress:
+            progress(total_orders, total_items)
+        if pause:
+            time.sleep(pause)
+    return total_orders, total_items
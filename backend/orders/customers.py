@@ -0,0 +1,241 @@
+# orders/customers.py
+"""
+Сводка по клиентам (CustomerSummary) и RFM-сегментация.
+
+Для каждого клиента с неотменёнными заказами хранятся время первого и
+последнего заказа, число заказов, сумма (LTV) и любимый тип товара (по
+числу купленных штук). Сигналы заказов и позиций отмечают затронутых
+клиентов, и после коммита сводка каждого из них пересчитывается по его
+собственным заказам (два запроса по индексу user_id на пачку клиентов) —
+так минимум/максимум корректны и при отмене или удалении заказа.
+Архивные заказы (ArchivedOrder) учитываются наравне с живыми.
+
+RFM: давность последнего заказа (R), число заказов (F) и LTV (M)
+получают оценку 1–5 по квинтилям сводки; сегмент определяется по R и F.
+Пороги квинтилей кэшируются до следующего изменения заказов.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import (
+    Case, CharField, Count, IntegerField, Max, Min, Q, Sum, Value, When,
+)
+
+from admin.cache import dashboard_cache
+from .models import ArchivedOrder, ArchivedOrderItem, CustomerSummary, Order, OrderItem
+
+# Живые и архивные заказы с позициями
+SOURCES = ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem))
+
+SUMMARY_FIELDS = [
+    'first_order_at', 'last_order_at', 'orders_count', 'lifetime_value', 'preferred_type'
+]
+QUINTILES = (0.2, 0.4, 0.6, 0.8)
+
+# Сегменты по оценкам (R, F): первое подходящее правило
+SEGMENTS = [
+    ('champions', Q(r__gte=4, f__gte=4)),
+    ('loyal', Q(r__gte=3, f__gte=3)),
+    ('new', Q(r__gte=4, f__lte=1)),
+    ('promising', Q(r__gte=3, f__lte=2)),
+    ('at_risk', Q(r__lte=2, f__gte=3)),
+    ('hibernating', Q(r__lte=2, f__lte=2)),
+]
+SEGMENT_NAMES = [name for name, _ in SEGMENTS]
+
+_pending = threading.local()
+
+
+def _pending_users():
+    if not hasattr(_pending, 'users'):
+        _pending.users = set()
+    return _pending.users
+
+
+def _flush():
+    pending = _pending_users()
+    if not pending:
+        return
+    user_ids = list(pending)
+    pending.clear()
+    refresh(user_ids)
+
+
+def schedule_refresh(user_ids):
+    """
+    Пересчитать сводку клиентов после коммита текущей транзакции.
+    Клиент пересчитывается один раз, сколько бы записей в нём ни изменилось.
+    """
+    _pending_users().update(user_ids)
+    transaction.on_commit(_flush)
+
+
+def _stats(user_ids):
+    """{user_id: [первый, последний, число, сумма]} по живым и архивным заказам"""
+    stats = {}
+    for order_model, _ in SOURCES:
+        for row in order_model.objects.filter(user_id__in=user_ids).exclude(
+            status='cancelled'
+        ).values('user_id').annotate(
+            first=Min('created_at'),
+            last=Max('created_at'),
+            count=Count('id'),
+            value=Sum('total_price'),
+        ).order_by():
+            values = [row['first'], row['last'], row['count'], row['value'] or 0]
+            current = stats.get(row['user_id'])
+            if current is not None:
+                values = [
+                    min(current[0], values[0]), max(current[1], values[1]),
+                    current[2] + values[2], current[3] + values[3],
+                ]
+            stats[row['user_id']] = values
+    return stats
+
+
+def _preferred_types(user_ids):
+    """{user_id: тип товара с наибольшим числом купленных штук}"""
+    units = {}
+    for _, item_model in SOURCES:
+        for user_id, product_type, count in item_model.objects.filter(
+            order__user_id__in=user_ids
+        ).exclude(order__status='cancelled').values('order__user_id', 'product__type').annotate(
+            units=Sum('quantity')
+        ).order_by().values_list('order__user_id', 'product__type', 'units'):
+            key = (user_id, product_type)
+            units[key] = units.get(key, 0) + count
+    preferred = {}
+    # Больше штук — выше; при равенстве — тип по алфавиту
+    for (user_id, product_type), count in sorted(units.items(), key=lambda row: (row[0][0], -row[1], row[0][1])):
+        preferred.setdefault(user_id, product_type)
+    return preferred
+
+
+def refresh(user_ids):
+    """Пересчитывает сводку указанных клиентов по их заказам"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    stats = _stats(user_ids)
+    preferred = _preferred_types(user_ids)
+
+    summaries = [
+        CustomerSummary(
+            user_id=user_id,
+            first_order_at=first,
+            last_order_at=last,
+            orders_count=count,
+            lifetime_value=value,
+            preferred_type=preferred.get(user_id, ''),
+        )
+        for user_id, (first, last, count, value) in stats.items()
+    ]
+    with transaction.atomic():
+        found = {summary.user_id for summary in summaries}
+        CustomerSummary.objects.filter(user_id__in=set(user_ids) - found).delete()
+        CustomerSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=SUMMARY_FIELDS,
+        )
+    return len(summaries)
+
+
+def rebuild(batch_size=1000, progress=None):
+    """Пересчитывает сводку всех клиентов пачками по user_id"""
+    summaries = CustomerSummary.objects.all()
+    for order_model, _ in SOURCES:
+        summaries = summaries.exclude(
+            user_id__in=order_model.objects.exclude(status='cancelled').values('user_id')
+        )
+    summaries.delete()
+    refreshed = 0
+    last_id = 0
+    while True:
+        live, archived = (
+            order_model.objects.filter(user_id__gt=last_id).values_list('user_id', flat=True)
+            for order_model, _ in SOURCES
+        )
+        # UNION убирает повторы
+        user_ids = list(live.union(archived).order_by('user_id')[:batch_size])
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+        refreshed += refresh(user_ids)
+        if progress:
+            progress(refreshed)
+    return refreshed
+
+
+def _quintiles(field, total):
+    values = CustomerSummary.objects.order_by(field).values_list(field, flat=True)
+    return [values[min(int(total * q), total - 1)] for q in QUINTILES]
+
+
+def build_thresholds():
+    total = CustomerSummary.objects.count()
+    if not total:
+        return None
+    return {
+        'recency': _quintiles('last_order_at', total),
+        'frequency': _quintiles('orders_count', total),
+        'monetary': _quintiles('lifetime_value', total),
+    }
+
+
+def rfm_thresholds():
+    """Пороги квинтилей R, F, M (кэшируются вместе с данными дашборда)"""
+    return dashboard_cache.get_or_build('rfm_thresholds', build_thresholds)
+
+
+def _score(field, thresholds):
+    # Значение выше 4-го порога — 5 баллов, ниже 1-го — 1
+    return Case(
+        *[When(**{f'{field}__gt': value}, then=Value(score))
+          for score, value in zip((5, 4, 3, 2), reversed(thresholds))],
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+
+
+def scored(queryset=None):
+    """Сводки с оценками r, f, m и сегментом (или None, если заказов нет)"""
+    thresholds = rfm_thresholds()
+    if thresholds is None:
+        return None
+    queryset = CustomerSummary.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        r=_score('last_order_at', thresholds['recency']),
+        f=_score('orders_count', thresholds['frequency']),
+        m=_score('lifetime_value', thresholds['monetary']),
+    ).annotate(
+        segment=Case(
+            *[When(condition, then=Value(name)) for name, condition in SEGMENTS],
+            default=Value('hibernating'),
+            output_field=CharField(),
+        )
+    )
+
+
+def segment_stats():
+    """Число клиентов, заказов и выручка по сегментам (один запрос)"""
+    summaries = scored()
+    if summaries is None:
+        return []
+    rows = {
+        row['segment']: row for row in summaries.values('segment').annotate(
+            customers=Count('user_id'),
+            revenue=Sum('lifetime_value'),
+            orders=Sum('orders_count'),
+        ).order_by()
+    }
+    return [
+        {
+            'segment': name,
+            'customers': rows[name]['customers'] if name in rows else 0,
+            'orders': rows[name]['orders'] if name in rows else 0,
+            'revenue': float(rows[name]['revenue'] or 0) if name in rows else 0.0,
+        }
+        for name in SEGMENT_NAMES
+    ]
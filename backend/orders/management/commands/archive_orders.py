@@ -0,0 +1,47 @@
+# orders/management/commands/archive_orders.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит доставленные и отменённые заказы старше N дней в архив пачками. '
+        'Прерванный запуск можно повторить — перенос продолжится'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int,
+            help='Возраст заказа в днях (по умолчанию ORDER_ARCHIVE_AFTER_DAYS, 180)'
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Заказов в одной транзакции')
+        parser.add_argument('--pause', type=float, default=0.2, help='Пауза между пачками, секунд')
+        parser.add_argument('--max-batches', type=int, help='Остановиться после N пачек')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать кандидатов')
+
+    def handle(self, *args, **options):
+        cutoff = archive.cutoff_for(options['older_than_days'])
+        pending = archive.candidates(cutoff).count()
+        self.stdout.write(f'Заказов к переносу (созданы до {cutoff:%d.%m.%Y}): {pending}')
+        if options['dry_run'] or not pending:
+            return
+
+        started = time.perf_counter()
+
+        def progress(orders, items):
+            self.stdout.write(f'  перенесено заказов: {orders}, позиций: {items}')
+
+        orders, items = archive.archive(
+            cutoff,
+            batch_size=max(1, options['batch_size']),
+            pause=max(0.0, options['pause']),
+            max_batches=options['max_batches'],
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'В архив перенесено {orders} заказов и {items} позиций за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,27 @@
+# orders/management/commands/rebuild_customer_summaries.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin.cache import dashboard_cache
+from orders import customers
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводку по клиентам (CustomerSummary) пачками по таблице заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Клиентов за один проход')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(refreshed):
+            self.stdout.write(f'  клиентов: {refreshed}')
+
+        refreshed = customers.rebuild(options['batch_size'], progress)
+        dashboard_cache.bump()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Сводка клиентов пересчитана: {refreshed} за {elapsed:.1f} с')
+        )
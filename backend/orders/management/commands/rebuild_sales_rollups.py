@@ -0,0 +1,31 @@
+# orders/management/commands/rebuild_sales_rollups.py
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from orders import rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает дневные и почасовые сводки продаж по таблице заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Пересчитать только последние N дней')
+        parser.add_argument('--since', help='Начальная дата (ГГГГ-ММ-ДД)')
+        parser.add_argument('--until', help='Конечная дата включительно (ГГГГ-ММ-ДД)')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options['since']) if options['since'] else None
+            end_date = date.fromisoformat(options['until']) if options['until'] else None
+        except ValueError:
+            raise CommandError('Даты нужно указывать в формате ГГГГ-ММ-ДД')
+
+        if options['days']:
+            start_date = timezone.localdate() - timedelta(days=options['days'])
+
+        days = rollups.rebuild(start_date, end_date)
+        self.stdout.write(
+            self.style.SUCCESS(f'Сводки продаж пересчитаны: {days} дн.')
+        )
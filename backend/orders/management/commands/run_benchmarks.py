@@ -0,0 +1,63 @@
+# orders/management/commands/run_benchmarks.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin.benchmarks import BENCHMARKS, compare, run_suite
+
+
+class Command(BaseCommand):
+    help = 'Запускает бенчмарки горячих путей и сравнивает результат с базовым отчётом'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Какие бенчмарки запустить (по умолчанию все)')
+        parser.add_argument('--list', action='store_true', help='Показать список бенчмарков')
+        parser.add_argument('--repeat', type=int, help='Повторов на бенчмарк')
+        parser.add_argument('--output', help='Сохранить отчёт в JSON-файл')
+        parser.add_argument('--baseline', help='Базовый JSON-отчёт для сравнения')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост медианы времени (0.2 = +20%%)'
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name in BENCHMARKS:
+                self.stdout.write(name)
+            return
+
+        unknown = set(options['names']) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Неизвестные бенчмарки: {', '.join(sorted(unknown))}")
+
+        def progress(name, result, error):
+            if error:
+                self.stdout.write(self.style.ERROR(f'{name}: {error}'))
+            else:
+                memory = f"  пик памяти: {result['peak_kib']} КиБ" if 'peak_kib' in result else ''
+                self.stdout.write(
+                    f"{name:32} {result['median_ms']:>10.2f} мс  запросов: {result['queries']}{memory}"
+                )
+
+        report = run_suite(options['names'], options['repeat'], progress)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Отчёт сохранён в {options['output']}"))
+
+        if report['errors']:
+            # Упавший бенчмарк — не результат: прогон считается неудачным
+            raise CommandError(
+                f"Бенчмарки завершились с ошибкой: {', '.join(sorted(report['errors']))}"
+            )
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare(report, baseline, options['threshold'])
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(line))
+                raise CommandError(f'Регрессий: {len(regressions)}')
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
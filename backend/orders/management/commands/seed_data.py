@@ -0,0 +1,49 @@
+# orders/management/commands/seed_data.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.seed import SCALES, clear_seed_data, seed
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими пользователями, товарами и заказами для прогонов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=sorted(SCALES), default='small',
+            help='small — 10 тыс., medium — 100 тыс., large — 1 млн заказов'
+        )
+        parser.add_argument('--orders', type=int, help='Точное число заказов (вместо --scale)')
+        parser.add_argument('--users', type=int, help='Клиентов (по умолчанию заказов / 10)')
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--fillings', type=int, default=30)
+        parser.add_argument('--days', type=int, default=365, help='За сколько дней распределить заказы')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора')
+        parser.add_argument('--clear', action='store_true', help='Сначала удалить ранее созданные данные')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_seed_data()
+            self.stdout.write('Прежние синтетические данные удалены')
+
+        orders = options['orders'] or SCALES[options['scale']]
+        started = time.perf_counter()
+
+        def progress(created):
+            self.stdout.write(f'  заказов: {created}/{orders}')
+
+        counts = seed(
+            orders=orders,
+            users=options['users'],
+            products=options['products'],
+            fillings=options['fillings'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            seed_value=options['seed'],
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f'{name}: {count}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Готово за {elapsed:.1f} с — {summary}'))
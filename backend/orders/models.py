@@ -1,6 +1,7 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
-from products.models import Product
+from products.models import Product, ProductVariant
 
 User = get_user_model()
 
@@ -20,6 +21,16 @@ class Order(models.Model):
         ('phone', 'По телефону'),
     ]
 
+    # Разрешённые переходы статусов (используются при массовой смене статуса)
+    ALLOWED_TRANSITIONS = {
+        'new': ('processing', 'baking', 'ready', 'cancelled'),
+        'processing': ('baking', 'ready', 'cancelled'),
+        'baking': ('ready', 'cancelled'),
+        'ready': ('delivered', 'cancelled'),
+        'delivered': (),
+        'cancelled': (),
+    }
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new')
     source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='website')
@@ -30,15 +41,154 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Горячие запросы — см. admin/diagnostics.py (check_db --explain)
+        indexes = [
+            # Список заказов в админке с фильтром по статусу
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+            # Сортировка и курсорная пагинация по дате, сводки за период
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+            # Последние заказы клиента (бот: «Мой заказ»)
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            # Доска кондитеров: только активные заказы
+            models.Index(
+                fields=['delivery_date', 'id'], name='order_active_delivery_idx',
+                condition=~Q(status__in=['delivered', 'cancelled'])
+            ),
+        ]
+
     def __str__(self):
         return f"Заказ #{self.id} от {self.user.username}"
 
+    @classmethod
+    def statuses_allowing(cls, status):
+        """Статусы, из которых можно перейти в status"""
+        return [source for source, targets in cls.ALLOWED_TRANSITIONS.items() if status in targets]
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.SET_NULL, null=True, blank=True)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     filling_details = models.TextField(blank=True)  # Описание выбранных начинок
 
     def __str__(self):
         return f"{self.product.name} x{self.quantity}"
+
+class IdempotencyKey(models.Model):
+    """Ключ Idempotency-Key запроса на создание заказа (см. orders/placement.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
+
+class ArchivedOrder(models.Model):
+    """
+    Заказ, перенесённый в архив (см. orders/archive.py). id совпадает с id
+    исходного заказа; в сводках продаж и клиентов заказ остаётся.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    source = models.CharField(max_length=20, choices=Order.SOURCE_CHOICES)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    delivery_address = models.TextField()
+    delivery_date = models.DateTimeField()
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Архивные заказы клиента (бот, /api/orders/archive/)
+            models.Index(fields=['user', '-created_at'], name='archived_order_user_idx'),
+            # Пересчёт сводок за период
+            models.Index(fields=['created_at', 'id'], name='archived_order_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Архивный заказ #{self.id}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.SET_NULL, null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    filling_details = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.product_id} x{self.quantity}"
+
+class DailySales(models.Model):
+    """Дневная сводка продаж, поддерживается сигналами заказов (см. orders/rollups.py)"""
+    date = models.DateField(unique=True)
+    orders_count = models.IntegerField(default=0)  # без отменённых
+    cancelled_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: {self.orders_count} заказов, {self.revenue} ₽"
+
+class HourlySales(models.Model):
+    """Почасовая сводка продаж (начало часа в локальном времени)"""
+    hour = models.DateTimeField(unique=True)
+    orders_count = models.IntegerField(default=0)
+    cancelled_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['hour']
+
+    def __str__(self):
+        return f"{self.hour:%d.%m.%Y %H:00}: {self.orders_count} заказов, {self.revenue} ₽"
+
+class ProductDailySales(models.Model):
+    """Продажи товара за день (без отменённых заказов), см. orders/rollups.py"""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ('date', 'product')
+
+    def __str__(self):
+        return f"{self.date} {self.product_id}: {self.units} шт., {self.revenue} ₽"
+
+class CustomerSummary(models.Model):
+    """Сводка по заказам клиента (без отменённых), см. orders/customers.py"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='order_summary'
+    )
+    first_order_at = models.DateTimeField()
+    last_order_at = models.DateTimeField()
+    orders_count = models.IntegerField(default=0)
+    lifetime_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    preferred_type = models.CharField(max_length=20, choices=Product.TYPE_CHOICES, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_order_at']),
+            models.Index(fields=['orders_count']),
+            models.Index(fields=['lifetime_value']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.orders_count} заказов, {self.lifetime_value} ₽"
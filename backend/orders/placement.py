@@ -0,0 +1,131 @@
+# orders/placement.py
+"""
+Создание заказа: сайт, бот и телефонные заказы используют одну функцию.
+
+Сумма считается на сервере (orders/pricing.py), заказ создаётся одним
+INSERT, позиции — одним bulk_create в той же транзакции. Сигналы заказа
+(сводки продаж, событие для кондитеров, кэш дашборда) срабатывают от
+Order.objects.create; сумма к этому моменту уже известна. bulk_create
+сигналов позиций не вызывает, поэтому сводка по товарам обновляется явно.
+
+Ключ идемпотентности (заголовок Idempotency-Key) записывается в той же
+транзакции, что и заказ, с уникальностью (user, key). Повторный запрос с
+тем же ключом — двойное нажатие в боте, повтор фронтенда после таймаута —
+получает уже созданный заказ. Параллельный дубликат ждёт на уникальном
+индексе, пока первая транзакция не завершится, и тоже получает её заказ.
+Тот же ключ с другим телом запроса — ошибка.
+"""
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+
+from . import rollups
+from .models import IdempotencyKey, Order, OrderItem
+from .pricing import get_price_table, price_items
+
+
+class IdempotencyConflict(ValueError):
+    pass
+
+
+def request_fingerprint(data):
+    """Хэш тела запроса: тот же ключ должен приходить с тем же телом"""
+    canonical = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _order_data(order, user, items, products):
+    # Формат TelegramNotifier.format_new_order
+    return {
+        'id': order.id,
+        'user': {'username': user.username},
+        'total_price': order.total_price,
+        'source': order.source,
+        'comment': order.comment or 'Нет',
+        'items': [
+            {
+                'product': {'name': products[item['product_id']]['name']},
+                'quantity': item['quantity'],
+                'price': item['price'],
+            }
+            for item in items
+        ],
+    }
+
+
+def _notify_admins(order_data):
+    from telegram.bot import notifier
+    notifier.notify_new_order_sync(order_data)
+
+
+def _replay(user, key, request_hash):
+    record = IdempotencyKey.objects.select_related('order').get(user=user, key=key)
+    if record.request_hash != request_hash:
+        raise IdempotencyConflict('Ключ идемпотентности уже использован с другим запросом')
+    return record.order
+
+
+def place_order(user, data, idempotency_key=None):
+    """
+    Создаёт заказ из проверенных данных (см. OrderCreateSerializer).
+    Возвращает (order, replayed): replayed=True, если заказ уже был создан
+    запросом с тем же ключом.
+    """
+    request_hash = request_fingerprint(data)
+    if idempotency_key:
+        try:
+            return _replay(user, idempotency_key, request_hash), True
+        except IdempotencyKey.DoesNotExist:
+            pass
+
+    table = get_price_table()
+    total_price, items = price_items(data['items'], table)
+
+    with transaction.atomic():
+        record = None
+        if idempotency_key:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=user, key=idempotency_key, request_hash=request_hash
+                    )
+            except IntegrityError:
+                pass
+        if idempotency_key and record is None:
+            duplicate = True
+        else:
+            duplicate = False
+            order = Order.objects.create(
+                user=user,
+                source=data.get('source', 'website'),
+                total_price=total_price,
+                delivery_address=data['delivery_address'],
+                delivery_date=data['delivery_date'],
+                comment=data.get('comment', ''),
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product_id=item['product_id'],
+                    variant_id=item.get('variant_id'),
+                    quantity=item['quantity'],
+                    price=item['price'],
+                    filling_details=item['filling_details'],
+                )
+                for item in items
+            ])
+            rollups.apply_product_sales(order.created_at, rollups.item_totals(
+                (item['product_id'], item['quantity'], item['price']) for item in items
+            ))
+            if record is not None:
+                record.order = order
+                record.save(update_fields=['order'])
+            order_data = _order_data(order, user, items, table['products'])
+            # Заказ уже зафиксирован: сбой уведомления не должен превращать ответ в 500
+            transaction.on_commit(lambda: _notify_admins(order_data), robust=True)
+
+    if duplicate:
+        # Параллельный запрос с тем же ключом успел первым
+        return _replay(user, idempotency_key, request_hash), True
+    return order, False
@@ -0,0 +1,129 @@
+# orders/pricing.py
+"""
+Расчёт цены заказа на сервере.
+
+Цена позиции = base_price товара × price_multiplier варианта (с
+округлением до копеек, как в документе каталога) + цены выбранных
+начинок. Клиентской цене не доверяем.
+
+Таблица цен (товары, варианты, начинки и разрешённые начинки каждого
+товара) строится четырьмя запросами один раз на версию каталога
+(products/cache.py) и хранится в памяти процесса и в общем кэше, поэтому
+при создании заказа цены считаются без обращения к базе.
+"""
+import threading
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from products.cache import get_catalog_version
+from products.models import Filling, Product, ProductFilling, ProductVariant
+
+TABLE_TIMEOUT = 60 * 60 * 24
+
+_local = {'version': None, 'table': None}
+_local_lock = threading.Lock()
+
+
+class PricingError(ValueError):
+    pass
+
+
+def build_price_table(version):
+    products = {
+        pk: {'name': name, 'base_price': base_price}
+        for pk, name, base_price in Product.objects.filter(is_available=True).values_list(
+            'pk', 'name', 'base_price'
+        )
+    }
+    variants = {
+        pk: {'product_id': product_id, 'weight': weight, 'multiplier': multiplier}
+        for pk, product_id, weight, multiplier in ProductVariant.objects.filter(
+            product_id__in=products
+        ).values_list('pk', 'product_id', 'weight', 'price_multiplier')
+    }
+    fillings = {
+        pk: {'name': name, 'price': price}
+        for pk, name, price in Filling.objects.filter(is_available=True).values_list(
+            'pk', 'name', 'price'
+        )
+    }
+    allowed = {}
+    for product_id, filling_id in ProductFilling.objects.filter(
+        product_id__in=products, filling_id__in=fillings
+    ).values_list('product_id', 'filling_id'):
+        allowed.setdefault(product_id, set()).add(filling_id)
+
+    return {
+        'version': version,
+        'products': products,
+        'variants': variants,
+        'fillings': fillings,
+        'allowed_fillings': allowed,
+    }
+
+
+def get_price_table(version=None):
+    """Таблица цен для текущей (или указанной) версии каталога"""
+    if version is None:
+        version = get_catalog_version()
+
+    if _local['version'] == version:
+        return _local['table']
+
+    key = f'orders:prices:v{version}'
+    table = cache.get(key)
+    if table is None:
+        table = build_price_table(version)
+        cache.set(key, table, TABLE_TIMEOUT)
+
+    with _local_lock:
+        _local['version'] = version
+        _local['table'] = table
+    return table
+
+
+def price_line(table, product_id, variant_id=None, filling_ids=()):
+    """
+    Цена единицы позиции и описание выбранных начинок.
+    Бросает PricingError, если товар, вариант или начинка недоступны.
+    """
+    product = table['products'].get(product_id)
+    if product is None:
+        raise PricingError(f'Товар {product_id} недоступен')
+
+    base_price = product['base_price']
+    unit_price = base_price
+    if variant_id is not None:
+        variant = table['variants'].get(variant_id)
+        if variant is None or variant['product_id'] != product_id:
+            raise PricingError(f'Вариант {variant_id} не относится к товару {product_id}')
+        unit_price = (base_price * variant['multiplier']).quantize(base_price)
+
+    names = []
+    allowed = table['allowed_fillings'].get(product_id, set())
+    for filling_id in dict.fromkeys(filling_ids):
+        if filling_id not in allowed:
+            raise PricingError(f'Начинка {filling_id} недоступна для товара {product_id}')
+        filling = table['fillings'][filling_id]
+        unit_price += filling['price']
+        names.append(filling['name'])
+
+    return unit_price, ', '.join(names)
+
+
+def price_items(items, table=None):
+    """
+    Позиции заказа [{'product_id', 'variant_id', 'filling_ids', 'quantity'}]
+    -> (итоговая сумма, [позиции с price и filling_details])
+    """
+    table = table or get_price_table()
+    total = Decimal('0')
+    priced = []
+    for item in items:
+        unit_price, details = price_line(
+            table, item['product_id'], item.get('variant_id'), item.get('filling_ids', ())
+        )
+        total += unit_price * item['quantity']
+        priced.append(dict(item, price=unit_price, filling_details=details))
+    return total, priced
@@ -0,0 +1,305 @@
+# orders/rollups.py
+"""
+Инкрементальные сводки продаж (DailySales / HourlySales / ProductDailySales).
+
+Каждый заказ вносит в сводку своего дня и часа вклад
+(заказов, отменённых, выручка). При создании, смене статуса, изменении
+суммы или удалении заказа применяется только разница между старым и новым
+вкладом, поэтому чтение статистики не требует сканирования таблицы Order.
+
+Позиции неотменённых заказов вносят в сводку товара за день заказа вклад
+(штук, выручка price × quantity, заказов). Вклад меняется при изменении и
+удалении позиции и целиком снимается или возвращается, когда заказ
+отменяют или удаляют.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, DailySales, HourlySales, Order, OrderItem, ProductDailySales,
+)
+
+ZERO = Decimal('0')
+
+
+def order_contribution(status, total_price):
+    """Вклад заказа в сводку: (заказов, отменённых, выручка)"""
+    if status is None:
+        return 0, 0, ZERO
+    if status == 'cancelled':
+        return 0, 1, ZERO
+    return 1, 0, Decimal(total_price or 0)
+
+
+def _buckets(created_at):
+    local = timezone.localtime(created_at)
+    return local.date(), local.replace(minute=0, second=0, microsecond=0)
+
+
+def _upsert(model, lookup, **deltas):
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    updated = model.objects.filter(**lookup).update(**changes)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**deltas, **lookup)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        model.objects.filter(**lookup).update(**changes)
+
+
+def apply_delta(created_at, orders=0, cancelled=0, revenue=ZERO):
+    """Прибавляет разницу к дневной и почасовой сводке"""
+    if not (orders or cancelled or revenue):
+        return
+    day, hour = _buckets(created_at)
+    deltas = {'orders_count': orders, 'cancelled_count': cancelled, 'revenue': revenue}
+    with transaction.atomic():
+        _upsert(DailySales, {'date': day}, **deltas)
+        _upsert(HourlySales, {'hour': hour}, **deltas)
+
+
+def _difference(old, new):
+    old_orders, old_cancelled, old_revenue = order_contribution(*(old or (None, None)))
+    new_orders, new_cancelled, new_revenue = order_contribution(*(new or (None, None)))
+    return new_orders - old_orders, new_cancelled - old_cancelled, new_revenue - old_revenue
+
+
+def apply_order_change(created_at, old, new):
+    """
+    Применяет изменение заказа.
+    old / new — пары (status, total_price) или None (заказа не было / нет).
+    """
+    orders, cancelled, revenue = _difference(old, new)
+    apply_delta(created_at, orders=orders, cancelled=cancelled, revenue=revenue)
+
+
+def apply_order_changes(changes):
+    """
+    То же для пачки изменений [(created_at, old, new)]: разницы суммируются
+    по дням и часам, и каждая строка сводки обновляется один раз.
+    """
+    daily = defaultdict(lambda: [0, 0, ZERO])
+    hourly = defaultdict(lambda: [0, 0, ZERO])
+    for created_at, old, new in changes:
+        delta = _difference(old, new)
+        if not any(delta):
+            continue
+        day, hour = _buckets(created_at)
+        for totals in (daily[day], hourly[hour]):
+            for i, value in enumerate(delta):
+                totals[i] += value
+    with transaction.atomic():
+        for model, field, buckets in ((DailySales, 'date', daily), (HourlySales, 'hour', hourly)):
+            for bucket, (orders, cancelled, revenue) in buckets.items():
+                if orders or cancelled or revenue:
+                    _upsert(model, {field: bucket}, orders_count=orders,
+                            cancelled_count=cancelled, revenue=revenue)
+
+
+def is_counted(status):
+    """Входят ли позиции заказа в сводку по товарам"""
+    return status is not None and status != 'cancelled'
+
+
+def item_totals(items):
+    """
+    Позиции одного заказа [(product_id, quantity, price)] ->
+    {product_id: (штук, выручка, заказов)}
+    """
+    totals = {}
+    for product_id, quantity, price in items:
+        units, revenue, _ = totals.get(product_id, (0, ZERO, 1))
+        totals[product_id] = (units + quantity, revenue + price * quantity, 1)
+    return totals
+
+
+def apply_product_deltas(deltas):
+    """Прибавляет {(дата, product_id): (штук, выручка, заказов)} к сводке по товарам"""
+    with transaction.atomic():
+        for (day, product_id), (units, revenue, orders) in deltas.items():
+            if units or revenue or orders:
+                _upsert(ProductDailySales, {'date': day, 'product_id': product_id},
+                        units=units, revenue=revenue, orders_count=orders)
+
+
+def apply_product_sales(created_at, totals, sign=1):
+    """Добавляет (sign=1) или снимает (sign=-1) вклад позиций одного заказа"""
+    day = _buckets(created_at)[0]
+    apply_product_deltas({
+        (day, product_id): (sign * units, sign * revenue, sign * orders)
+        for product_id, (units, revenue, orders) in totals.items()
+    })
+
+
+def apply_orders_products(orders, sign):
+    """
+    Добавляет или снимает вклад всех позиций заказов [(order_id, created_at)]
+    одним запросом позиций (отмена, удаление, массовая смена статуса).
+    """
+    created = dict(orders)
+    if not created:
+        return
+    lines = {}
+    for order_id, product_id, quantity, price in OrderItem.objects.filter(
+        order_id__in=created
+    ).values_list('order_id', 'product_id', 'quantity', 'price'):
+        lines.setdefault(order_id, []).append((product_id, quantity, price))
+
+    deltas = {}
+    for order_id, items in lines.items():
+        day = _buckets(created[order_id])[0]
+        for product_id, (units, revenue, count) in item_totals(items).items():
+            old_units, old_revenue, old_count = deltas.get((day, product_id), (0, ZERO, 0))
+            deltas[(day, product_id)] = (
+                old_units + sign * units, old_revenue + sign * revenue, old_count + sign * count
+            )
+    apply_product_deltas(deltas)
+
+
+def apply_item_change(order_id, created_at, item_pk, old, new):
+    """
+    Изменение одной позиции неотменённого заказа.
+    old / new — (product_id, quantity, price) или None (позиции не было / нет).
+    Заказ товара считается один раз, сколько бы строк товара в нём ни было.
+    """
+    day = _buckets(created_at)[0]
+    moved = old is None or new is None or old[0] != new[0]
+    others = set()
+    if moved:
+        others = set(
+            OrderItem.objects.filter(order_id=order_id).exclude(pk=item_pk).values_list(
+                'product_id', flat=True
+            )
+        )
+    deltas = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None:
+            continue
+        product_id, quantity, price = state
+        units, revenue, orders = deltas.get((day, product_id), (0, ZERO, 0))
+        first = moved and product_id not in others
+        deltas[(day, product_id)] = (
+            units + sign * quantity, revenue + sign * price * quantity, orders + (sign if first else 0)
+        )
+    apply_product_deltas(deltas)
+
+
+def _day_bounds(start_date, end_date):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+# Живые и архивные заказы с позициями
+SOURCES = ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem))
+
+
+def _first_order_at():
+    dates = [
+        model.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        for model, _ in SOURCES
+    ]
+    dates = [value for value in dates if value is not None]
+    return min(dates) if dates else None
+
+
+def _period_rows(order_model, item_model, start, end, tz):
+    """Агрегаты одной пары таблиц за период: (по дням, по часам, по товарам)"""
+    orders = order_model.objects.filter(created_at__gte=start, created_at__lt=end)
+    aggregates = {
+        'orders_count': Count('id', filter=~Q(status='cancelled')),
+        'cancelled_count': Count('id', filter=Q(status='cancelled')),
+        'revenue': Sum('total_price', filter=~Q(status='cancelled')),
+    }
+    daily = orders.annotate(
+        bucket=TruncDate('created_at', tzinfo=tz)
+    ).values('bucket').annotate(**aggregates).order_by('bucket')
+    hourly = orders.annotate(
+        bucket=TruncHour('created_at', tzinfo=tz)
+    ).values('bucket').annotate(**aggregates).order_by('bucket')
+    products = item_model.objects.filter(
+        order__created_at__gte=start, order__created_at__lt=end
+    ).exclude(order__status='cancelled').annotate(
+        bucket=TruncDate('order__created_at', tzinfo=tz)
+    ).values('bucket', 'product_id').annotate(
+        units=Sum('quantity'),
+        revenue=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        orders=Count('order_id', distinct=True),
+    ).order_by('bucket', 'product_id')
+    return daily, hourly, products
+
+
+def _merge(querysets, key, fields):
+    """Суммирует строки агрегатов по ключу (заказ лежит только в одной таблице)"""
+    merged = {}
+    for queryset in querysets:
+        for row in queryset.iterator(chunk_size=2000):
+            row_key = tuple(row[name] for name in key)
+            values = [row[field] or 0 for field in fields]
+            if row_key in merged:
+                values = [a + b for a, b in zip(merged[row_key], values)]
+            merged[row_key] = values
+    return sorted(merged.items())
+
+
+def rebuild(start_date=None, end_date=None):
+    """
+    Пересчитывает сводки по таблицам Order и ArchivedOrder за период
+    [start_date, end_date] (по умолчанию — за всю историю).
+    Возвращает число пересчитанных дней.
+    """
+    if start_date is None:
+        first = _first_order_at()
+        if first is None:
+            with transaction.atomic():
+                DailySales.objects.all().delete()
+                HourlySales.objects.all().delete()
+                ProductDailySales.objects.all().delete()
+            return 0
+        start_date = timezone.localtime(first).date()
+    if end_date is None:
+        end_date = timezone.localdate()
+
+    start, end = _day_bounds(start_date, end_date)
+    tz = timezone.get_current_timezone()
+    daily, hourly, products = zip(*(
+        _period_rows(order_model, item_model, start, end, tz) for order_model, item_model in SOURCES
+    ))
+    counters = ['orders_count', 'cancelled_count', 'revenue']
+    daily = _merge(daily, ['bucket'], counters)
+    hourly = _merge(hourly, ['bucket'], counters)
+    products = _merge(products, ['bucket', 'product_id'], ['units', 'revenue', 'orders'])
+
+    with transaction.atomic():
+        DailySales.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+        HourlySales.objects.filter(hour__gte=start, hour__lt=end).delete()
+        ProductDailySales.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+        DailySales.objects.bulk_create([
+            DailySales(date=day, orders_count=count, cancelled_count=cancelled, revenue=revenue or ZERO)
+            for (day,), (count, cancelled, revenue) in daily
+        ], batch_size=500)
+        HourlySales.objects.bulk_create([
+            HourlySales(hour=hour, orders_count=count, cancelled_count=cancelled, revenue=revenue or ZERO)
+            for (hour,), (count, cancelled, revenue) in hourly
+        ], batch_size=500)
+        ProductDailySales.objects.bulk_create((
+            ProductDailySales(
+                date=day,
+                product_id=product_id,
+                units=units,
+                revenue=revenue or ZERO,
+                orders_count=orders,
+            )
+            for (day, product_id), (units, revenue, orders) in products
+        ), batch_size=1000)
+
+    return (end_date - start_date).days + 1
@@ -0,0 +1,228 @@
+# orders/seed.py
+"""
+Генератор синтетических данных для нагрузочных прогонов.
+
+Заполняет пользователей, начинки, товары с вариантами и заказы с позициями
+пакетными вставками (bulk_create), детерминированно по seed. Масштаб — от
+10 тыс. до 1 млн заказов; память не растёт с масштабом, потому что заказы
+создаются пакетами. Сигналы при bulk_create не срабатывают, поэтому после
+генерации производные таблицы (сводки продаж и клиентов, версии кэшей,
+поисковые векторы) пересчитываются явно.
+
+Все созданные записи помечены (префикс seed_ у пользователей, SEED_IMAGE у
+товаров, SEED_FILLING_PREFIX у начинок) и удаляются clear_seed_data().
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from admin.cache import dashboard_cache
+from chef.board import bump_data_version
+from products.cache import bump_catalog_version
+from products.models import Filling, Product, ProductFilling, ProductVariant
+from products.search import update_search_vectors
+from users.models import User
+from . import customers, rollups
+from .models import Order, OrderItem
+from .signals import archiving
+
+SCALES = {
+    'small': 10_000,
+    'medium': 100_000,
+    'large': 1_000_000,
+}
+
+SEED_USER_PREFIX = 'seed_'
+SEED_IMAGE = 'products/seed.jpg'
+SEED_FILLING_PREFIX = 'Начинка '
+SEED_TELEGRAM_ID_BASE = 8_000_000_000
+
+PRODUCT_NAMES = [
+    'Медовик', 'Наполеон', 'Красный бархат', 'Прага', 'Эстерхази', 'Чизкейк',
+    'Птичье молоко', 'Морковный торт', 'Тирамису', 'Захер', 'Шоколадный трюфель',
+    'Сметанник', 'Клубничный бисквит', 'Фисташковый мусс', 'Карамельный орех',
+]
+DESCRIPTION_WORDS = [
+    'нежный', 'бисквит', 'крем', 'сливочный', 'шоколад', 'ягоды', 'мёд', 'орехи',
+    'карамель', 'ваниль', 'сметанный', 'заварной', 'слоёный', 'мусс', 'ганаш',
+]
+FILLING_NAMES = [
+    'клубника', 'малина', 'вишня', 'манго', 'маракуйя', 'банан', 'шоколад',
+    'карамель', 'фисташка', 'лимон', 'черника', 'груша',
+]
+WEIGHTS = [Decimal('1.00'), Decimal('1.50'), Decimal('2.00'), Decimal('3.00')]
+STATUS_WEIGHTS = {
+    'delivered': 70, 'cancelled': 8, 'new': 6, 'processing': 6, 'baking': 5, 'ready': 5,
+}
+SOURCE_WEIGHTS = {'website': 60, 'telegram': 30, 'phone': 10}
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Позволяет задать created_at при bulk_create (отключает auto_now_add)"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def clear_seed_data():
+    User.objects.filter(username__startswith=SEED_USER_PREFIX).delete()
+    Product.objects.filter(image=SEED_IMAGE).delete()
+    Filling.objects.filter(name__startswith=SEED_FILLING_PREFIX).delete()
+
+
+def delete_bench_users(users):
+    """
+    Удаляет пользователей нагрузочного прогона вместе с их заказами.
+    Заказы прогонов создаются через bulk_create и в сводки не попадают,
+    поэтому удаляются без сигналов сводок (signals.archiving()), а дни,
+    на которые пришлись заказы, пересчитываются по таблицам заказов —
+    так исправляются и изменения статусов во время прогона.
+    """
+    span = Order.objects.filter(user__in=users).aggregate(first=Min('created_at'), last=Max('created_at'))
+    with transaction.atomic():
+        with archiving():
+            users.delete()
+        if span['first'] is None:
+            return
+        rollups.rebuild(timezone.localtime(span['first']).date(), timezone.localtime(span['last']).date())
+        transaction.on_commit(dashboard_cache.bump)
+        transaction.on_commit(bump_data_version)
+
+
+def _seed_catalog(rnd, products, fillings):
+    filling_list = Filling.objects.bulk_create([
+        Filling(
+            name=f'{SEED_FILLING_PREFIX}{FILLING_NAMES[i % len(FILLING_NAMES)]} {i}',
+            price=Decimal(rnd.randrange(100, 600, 50))
+        )
+        for i in range(fillings)
+    ])
+    now = timezone.now()
+    with explicit_created_at(Product):
+        product_list = Product.objects.bulk_create([
+            Product(
+                name=f'{PRODUCT_NAMES[i % len(PRODUCT_NAMES)]} №{i + 1}',
+                description=' '.join(rnd.choices(DESCRIPTION_WORDS, k=12)),
+                type=rnd.choice(Product.TYPE_CHOICES)[0],
+                base_price=Decimal(rnd.randrange(800, 5000, 100)),
+                image=SEED_IMAGE,
+                is_available=rnd.random() > 0.1,
+                created_at=now - timedelta(days=rnd.randrange(0, 365)),
+            )
+            for i in range(products)
+        ])
+    variants = []
+    product_fillings = []
+    for product in product_list:
+        for weight in rnd.sample(WEIGHTS, 3):
+            variants.append(ProductVariant(
+                product=product, weight=weight, price_multiplier=weight
+            ))
+        for filling in rnd.sample(filling_list, min(3, len(filling_list))):
+            product_fillings.append(ProductFilling(product=product, filling=filling))
+    ProductVariant.objects.bulk_create(variants, batch_size=5000)
+    ProductFilling.objects.bulk_create(product_fillings, batch_size=5000)
+    return product_list
+
+
+def _seed_users(rnd, users, days, batch_size):
+    now = timezone.now()
+    user_list = User.objects.bulk_create([
+        User(
+            username=f'{SEED_USER_PREFIX}{i}',
+            password='!',  # вход по паролю невозможен
+            first_name=f'Клиент {i}',
+            role='customer',
+            # У части клиентов есть Telegram — для прогонов бота
+            telegram_id=SEED_TELEGRAM_ID_BASE + i if i % 3 == 0 else None,
+            date_joined=now - timedelta(days=rnd.randrange(0, days)),
+        )
+        for i in range(users)
+    ], batch_size=batch_size)
+    return [user.pk for user in user_list]
+
+
+def _seed_orders(rnd, orders, user_ids, products, days, batch_size, progress=None):
+    now = timezone.now()
+    statuses = list(STATUS_WEIGHTS)
+    status_weights = list(STATUS_WEIGHTS.values())
+    sources = list(SOURCE_WEIGHTS)
+    source_weights = list(SOURCE_WEIGHTS.values())
+    prices = [(product.pk, product.base_price) for product in products]
+    seconds = days * 86400
+
+    created = 0
+    while created < orders:
+        size = min(batch_size, orders - created)
+        order_batch = []
+        item_rows = []
+        for _ in range(size):
+            lines = []
+            for product_id, base_price in rnd.sample(prices, rnd.randint(1, 4)):
+                quantity = rnd.randint(1, 3)
+                price = base_price * rnd.choice(WEIGHTS)
+                lines.append((product_id, quantity, price))
+            created_at = now - timedelta(seconds=rnd.randrange(seconds))
+            order_batch.append(Order(
+                user_id=rnd.choice(user_ids),
+                status=rnd.choices(statuses, status_weights)[0],
+                source=rnd.choices(sources, source_weights)[0],
+                total_price=sum(quantity * price for _, quantity, price in lines),
+                delivery_address=f'ул. Тестовая, д. {rnd.randint(1, 200)}',
+                delivery_date=created_at + timedelta(days=rnd.randint(1, 5)),
+                created_at=created_at,
+            ))
+            item_rows.append(lines)
+
+        with transaction.atomic():
+            Order.objects.bulk_create(order_batch)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_id, quantity=quantity, price=price)
+                for order, lines in zip(order_batch, item_rows)
+                for product_id, quantity, price in lines
+            ], batch_size=batch_size)
+        created += size
+        if progress:
+            progress(created)
+    return created
+
+
+def rebuild_derived():
+    """Пересчитывает то, что обычно поддерживают сигналы"""
+    rollups.rebuild()
+    customers.rebuild()
+    update_search_vectors()
+    transaction.on_commit(bump_catalog_version)
+    transaction.on_commit(dashboard_cache.bump)
+
+
+def seed(orders=SCALES['small'], users=None, products=200, fillings=30, days=365,
+         batch_size=5000, seed_value=42, progress=None):
+    """Создаёт набор данных, возвращает словарь с количеством записей"""
+    rnd = random.Random(seed_value)
+    users = users or max(orders // 10, 1)
+    product_list = _seed_catalog(rnd, products, fillings)
+    user_ids = _seed_users(rnd, users, days, batch_size)
+    with explicit_created_at(Order):
+        created = _seed_orders(rnd, orders, user_ids, product_list, days, batch_size, progress)
+    rebuild_derived()
+    return {
+        'users': len(user_ids),
+        'products': len(product_list),
+        'fillings': fillings,
+        'orders': created,
+        'order_items': OrderItem.objects.filter(
+            order__user__username__startswith=SEED_USER_PREFIX
+        ).count(),
+    }
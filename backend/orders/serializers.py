@@ -0,0 +1,47 @@
+from rest_framework import serializers
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+class OrderItemInputSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    variant_id = serializers.IntegerField(required=False, allow_null=True, default=None)
+    filling_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list, max_length=10
+    )
+    quantity = serializers.IntegerField(min_value=1, max_value=100, default=1)
+
+class OrderCreateSerializer(serializers.Serializer):
+    items = OrderItemInputSerializer(many=True, allow_empty=False, max_length=50)
+    delivery_address = serializers.CharField()
+    delivery_date = serializers.DateTimeField()
+    comment = serializers.CharField(required=False, allow_blank=True, default='')
+    source = serializers.ChoiceField(choices=Order.SOURCE_CHOICES, default='website')
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product', 'variant', 'quantity', 'price', 'filling_details']
+
+class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'status', 'source', 'total_price', 'delivery_address',
+            'delivery_date', 'comment', 'created_at', 'items'
+        ]
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ['id', 'product', 'variant', 'quantity', 'price', 'filling_details']
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            'id', 'status', 'source', 'total_price', 'delivery_address',
+            'delivery_date', 'comment', 'created_at', 'archived_at', 'items'
+        ]
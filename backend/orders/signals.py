@@ -0,0 +1,223 @@
+# orders/signals.py
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from admin.cache import dashboard_cache
+from chef.board import bump_data_version
+from chef.events import publish_on_commit
+from products.models import Product
+from . import customers, rollups
+from .models import Order, OrderItem
+
+User = get_user_model()
+
+# Заказы, которые сейчас удаляются: их позиции снимаются из сводки по
+# товарам целиком в pre_delete заказа, а не по одной. Для удаляемых товаров
+# сводка не трогается: её строки удаляются каскадом вместе с товаром
+_deleting = threading.local()
+
+
+def _deleting_orders():
+    if not hasattr(_deleting, 'orders'):
+        _deleting.orders = set()
+    return _deleting.orders
+
+
+def _deleting_products():
+    if not hasattr(_deleting, 'products'):
+        _deleting.products = set()
+    return _deleting.products
+
+
+def _archiving():
+    return getattr(_deleting, 'archiving', False)
+
+
+@contextmanager
+def archiving():
+    """
+    Перенос заказов в архив (orders/archive.py): удаление из Order не меняет
+    сводки — архивные заказы в них остаются — и не сбрасывает кэш дашборда
+    на каждую строку.
+    """
+    _deleting.archiving = True
+    try:
+        yield
+    finally:
+        _deleting.archiving = False
+
+
+def _rollup_state(order):
+    # Берём значения из __dict__, чтобы не вызвать загрузку отложенных полей
+    return order.__dict__.get('status'), order.__dict__.get('total_price')
+
+
+@receiver(post_init, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    instance._rollup_state = _rollup_state(instance)
+    instance._published_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_state = _rollup_state(instance)
+    old_state = None if created else instance._rollup_state
+    if old_state is not None and old_state[0] is None:
+        # Заказ был загружен без статуса — разницу посчитать нельзя,
+        # сводку поправит rebuild_sales_rollups
+        instance._rollup_state = new_state
+        return
+    if old_state is not None and old_state[1] is None:
+        if new_state[1] is not None:
+            # Сумму задали, а прежняя неизвестна — как и без статуса
+            instance._rollup_state = new_state
+            return
+        # Сумма не загружалась и не сохранялась — в базе она прежняя
+        total_price = _stored_total_price(instance)
+        old_state = (old_state[0], total_price)
+        new_state = (new_state[0], total_price)
+    rollups.apply_order_change(instance.created_at, old_state, new_state)
+    if old_state != new_state:
+        customers.schedule_refresh([instance.user_id])
+    if old_state is not None:
+        was_counted = rollups.is_counted(old_state[0])
+        if was_counted != rollups.is_counted(new_state[0]):
+            # Отмена заказа (или её снятие) снимает или возвращает его позиции
+            rollups.apply_orders_products(
+                [(instance.pk, instance.created_at)], -1 if was_counted else 1
+            )
+    instance._rollup_state = new_state
+
+
+def _stored_total_price(order):
+    return Order.objects.filter(pk=order.pk).values_list('total_price', flat=True).first()
+
+
+@receiver(pre_delete, sender=Order)
+def remove_products_from_rollups(sender, instance, **kwargs):
+    if _archiving():
+        return
+    deferred = instance.get_deferred_fields()
+    if deferred:
+        # Заказ загружен не полностью: дочитываем поля, пока строка есть —
+        # в post_delete её уже не будет. Несохранённые изменения при удалении не важны
+        instance.refresh_from_db(fields=deferred)
+        instance._rollup_state = _rollup_state(instance)
+    _deleting_orders().add(instance.pk)
+    if rollups.is_counted(instance._rollup_state[0]):
+        rollups.apply_orders_products([(instance.pk, instance.created_at)], -1)
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_sales_rollups(sender, instance, **kwargs):
+    if _archiving():
+        return
+    _deleting_orders().discard(instance.pk)
+    rollups.apply_order_change(instance.created_at, instance._rollup_state, None)
+    customers.schedule_refresh([instance.user_id])
+
+
+def _item_state(item):
+    state = tuple(item.__dict__.get(field) for field in ('product_id', 'quantity', 'price'))
+    return None if None in state else state
+
+
+@receiver(post_init, sender=OrderItem)
+def remember_item_state(sender, instance, **kwargs):
+    instance._item_state = _item_state(instance)
+
+
+def _apply_item_change(item, old, new):
+    order = Order.objects.filter(pk=item.order_id).values('status', 'created_at', 'user_id').first()
+    if order is not None and rollups.is_counted(order['status']):
+        # Строки сводки удаляемого товара уже удалены каскадом — не создаём их заново
+        if item.product_id not in _deleting_products():
+            rollups.apply_item_change(item.order_id, order['created_at'], item.pk, old, new)
+        # Позиции влияют на любимый тип товара клиента
+        customers.schedule_refresh([order['user_id']])
+
+
+@receiver(post_save, sender=OrderItem)
+def update_product_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._item_state
+    new = _item_state(instance)
+    instance._item_state = new
+    if new is None or (not created and old is None):
+        # Позиция загружена не полностью — поправит rebuild_sales_rollups
+        return
+    if old != new:
+        _apply_item_change(instance, old, new)
+
+
+@receiver(post_delete, sender=OrderItem)
+def remove_item_from_product_rollups(sender, instance, **kwargs):
+    if _archiving() or instance.order_id in _deleting_orders() or instance._item_state is None:
+        return
+    _apply_item_change(instance, instance._item_state, None)
+
+
+@receiver(pre_delete, sender=Product)
+def remember_deleting_product(sender, instance, **kwargs):
+    _deleting_products().add(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def forget_deleting_product(sender, instance, **kwargs):
+    _deleting_products().discard(instance.pk)
+
+
+def _order_data(order):
+    return {
+        'id': order.id,
+        'status': order.status,
+        'source': order.source,
+        'total_price': order.total_price,
+        'delivery_date': order.delivery_date,
+        'comment': order.comment,
+    }
+
+
+@receiver(post_save, sender=Order)
+def publish_chef_event(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    status = instance.__dict__.get('status')
+    if created:
+        publish_on_commit('new_order', instance.pk, {'order_data': _order_data(instance)})
+    elif status is not None and status != instance._published_status:
+        publish_on_commit('status_updated', instance.pk, {
+            'status': status,
+            # Кто изменил статус, проставляет вызывающий код (консьюмер, админка)
+            'updated_by': getattr(instance, '_updated_by', ''),
+        })
+    instance._published_status = status
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_dashboard_cache(sender, raw=False, update_fields=None, **kwargs):
+    if raw or _archiving():
+        return
+    if update_fields and set(update_fields) <= {'last_login'}:
+        # Вход пользователя не влияет на статистику
+        return
+    # Версию меняем после коммита, иначе параллельный запрос может
+    # закэшировать ещё не зафиксированное состояние под новой версией
+    transaction.on_commit(dashboard_cache.bump)
+    # Снимок доски кондитеров строится из тех же таблиц
+    transaction.on_commit(bump_data_version)
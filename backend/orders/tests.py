@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from products.models import Product
+from users.models import User
+from . import rollups
+from .models import DailySales, Order, OrderItem, ProductDailySales
+
+
+class ProductRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='customer')
+        self.product = Product.objects.create(
+            name='Торт', description='d', type='bento', base_price=Decimal('100'), image='x'
+        )
+        self.order = Order.objects.create(
+            user=self.user, total_price=Decimal('200'), delivery_address='a',
+            delivery_date=timezone.now()
+        )
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=Decimal('100'))
+
+    def test_delete_product_with_sales(self):
+        self.assertEqual(ProductDailySales.objects.get(product=self.product).units, 2)
+
+        self.product.delete()
+
+        self.assertFalse(ProductDailySales.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        # Сводка заказов не зависит от позиций
+        self.assertEqual(DailySales.objects.get().orders_count, 1)
+
+
+class OrderRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='customer')
+        self.order = Order.objects.create(
+            user=self.user, total_price=Decimal('200'), delivery_address='a',
+            delivery_date=timezone.now()
+        )
+
+    def assertDaily(self, orders, cancelled, revenue):
+        daily = DailySales.objects.get()
+        self.assertEqual(
+            (daily.orders_count, daily.cancelled_count, daily.revenue), (orders, cancelled, Decimal(revenue))
+        )
+
+    def test_cancel_with_deferred_total_price(self):
+        order = Order.objects.only('status').get(pk=self.order.pk)
+        order.status = 'cancelled'
+        order.save()
+
+        self.assertDaily(0, 1, '0')
+        rollups.rebuild()
+        self.assertDaily(0, 1, '0')
+
+    def test_delete_deferred_order(self):
+        Order.objects.only('id').get(pk=self.order.pk).delete()
+
+        self.assertDaily(0, 0, '0')
@@ -0,0 +1,103 @@
+# orders/transitions.py
+"""
+Массовая смена статуса заказов (конец смены: «всё готово», «всё доставлено»).
+
+Вместо get + save() на каждый заказ: одно чтение текущих статусов,
+проверка по Order.ALLOWED_TRANSITIONS и один условный UPDATE по заказам,
+которые можно перевести. Условие на исходный статус в самом UPDATE
+защищает от гонки с параллельным изменением. Поскольку UPDATE не вызывает
+сигналы, их работа выполняется здесь же, пачкой:
+
+- сводки продаж — одной записью на день и час (rollups.apply_order_changes),
+  при отмене — снятие позиций из сводки по товарам одним запросом;
+- сводка клиентов — один пересчёт на клиента после коммита;
+- версия кэша дашборда — один сдвиг после коммита;
+- события кондитерам — одна вставка в журнал и один кадр batch;
+- уведомления клиентам — одной пачкой в очередь диспетчера.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from admin.cache import dashboard_cache
+from chef.events import publish_batch_on_commit
+from . import customers, rollups
+from .models import Order
+
+MAX_BULK_ORDERS = 500
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def _notify(changes):
+    from telegram.bot import notifier
+    notifier.notify_order_statuses(changes)
+
+
+def bulk_transition(order_ids, status, updated_by=''):
+    """
+    Переводит заказы order_ids в статус status.
+    Возвращает список результатов по каждому заказу в порядке order_ids.
+    """
+    if status not in dict(Order.STATUS_CHOICES):
+        raise InvalidTransition('Неверный статус')
+    order_ids = list(dict.fromkeys(order_ids))
+    if not order_ids:
+        raise InvalidTransition('Не переданы заказы')
+    if len(order_ids) > MAX_BULK_ORDERS:
+        raise InvalidTransition(f'Не больше {MAX_BULK_ORDERS} заказов за раз')
+
+    sources = Order.statuses_allowing(status)
+    with transaction.atomic():
+        current = {
+            row['pk']: row for row in
+            Order.objects.select_for_update(of=('self',)).filter(pk__in=order_ids).values(
+                'pk', 'status', 'total_price', 'created_at', 'user_id', 'user__telegram_id'
+            )
+        }
+        eligible = [pk for pk in order_ids if pk in current and current[pk]['status'] in sources]
+        updated = set()
+        if eligible:
+            Order.objects.filter(pk__in=eligible, status__in=sources).update(
+                status=status, updated_at=timezone.now()
+            )
+            # Строки заблокированы select_for_update, поэтому обновлены все eligible
+            updated = set(eligible)
+
+        rows = [current[pk] for pk in eligible]
+        rollups.apply_order_changes(
+            (row['created_at'], (row['status'], row['total_price']), (status, row['total_price']))
+            for row in rows
+        )
+        if not rollups.is_counted(status):
+            rollups.apply_orders_products(
+                [(row['pk'], row['created_at']) for row in rows if rollups.is_counted(row['status'])], -1
+            )
+        if rows:
+            customers.schedule_refresh({row['user_id'] for row in rows})
+            transaction.on_commit(dashboard_cache.bump)
+            publish_batch_on_commit([
+                ('status_updated', row['pk'], {'status': status, 'updated_by': updated_by})
+                for row in rows
+            ])
+            changes = [(row['pk'], status, row['user__telegram_id']) for row in rows]
+            transaction.on_commit(lambda: _notify(changes))
+
+    results = []
+    for pk in order_ids:
+        row = current.get(pk)
+        if row is None:
+            results.append({'order_id': pk, 'success': False, 'error': 'not_found'})
+        elif pk in updated:
+            results.append({
+                'order_id': pk, 'success': True,
+                'old_status': row['status'], 'status': status,
+            })
+        else:
+            results.append({
+                'order_id': pk, 'success': False,
+                'error': 'unchanged' if row['status'] == status else 'invalid_transition',
+                'status': row['status'],
+            })
+    return results
@@ -1,5 +1,8 @@
 from django.urls import path
+from . import views
 
 urlpatterns = [
-    # Добавьте маршруты для orders, если это необходимо
+    path('', views.create_order, name='create_order'),
+    path('archive/', views.archived_orders, name='archived_orders'),
+    path('archive/<int:order_id>/', views.archived_order_detail, name='archived_order_detail'),
 ]
@@ -0,0 +1,60 @@
+# orders/views.py
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from .models import ArchivedOrder, Order
+from .placement import IdempotencyConflict, place_order
+from .pricing import PricingError
+from .serializers import ArchivedOrderSerializer, OrderCreateSerializer, OrderSerializer
+
+@api_view(['POST'])
+def create_order(request):
+    """
+    Создание заказа. Сумма считается на сервере; заголовок Idempotency-Key
+    защищает от дублей при повторной отправке.
+    """
+    serializer = OrderCreateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    idempotency_key = request.headers.get('Idempotency-Key', '').strip()[:255] or None
+    try:
+        order, replayed = place_order(request.user, serializer.validated_data, idempotency_key)
+    except IdempotencyConflict as e:
+        return Response({'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    except PricingError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    order = Order.objects.prefetch_related('items').get(pk=order.pk)
+    response = Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+@api_view(['GET'])
+def archived_orders(request):
+    """Архивные заказы текущего пользователя: ?page=1&per_page=20"""
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        per_page = min(max(int(request.GET.get('per_page', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'Некорректные параметры пагинации'}, status=status.HTTP_400_BAD_REQUEST)
+
+    orders = ArchivedOrder.objects.filter(user=request.user).order_by('-created_at', '-id')
+    start = (page - 1) * per_page
+    return Response({
+        'orders': ArchivedOrderSerializer(
+            orders.prefetch_related('items')[start:start + per_page], many=True
+        ).data,
+        'page': page,
+        'per_page': per_page,
+        'total': orders.count(),
+    })
+
+@api_view(['GET'])
+def archived_order_detail(request, order_id):
+    """Архивный заказ текущего пользователя"""
+    order = ArchivedOrder.objects.prefetch_related('items').filter(pk=order_id, user=request.user).first()
+    if order is None:
+        return Response({'error': 'Заказ не найден'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(ArchivedOrderSerializer(order).data)
@@ -0,0 +1,56 @@
+# products/cache.py
+"""
+Версия каталога. Увеличивается после каждого изменения товаров, вариантов
+и начинок (products/signals.py). Производные данные каталога (снимок для
+бота, документ каталога для API) строятся один раз на версию. Версия
+хранится в кэше — при общем бэкенде (Redis) она общая для всех процессов.
+
+Вместе с новой версией записывается, что изменилось (товары, начинки):
+тем, кто умеет обновляться по частям (builder/pricing.py), не нужно
+перестраивать всё. Если записи о какой-то версии нет (массовые операции,
+вытеснение из кэша), catalog_changes возвращает None — нужна полная
+пересборка.
+"""
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CHANGES_TIMEOUT = 60 * 60
+MAX_CHANGE_SPAN = 100
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def _changes_key(version):
+    return f'catalog:changes:v{version}'
+
+
+def bump_catalog_version(changes=None):
+    """
+    Увеличивает версию каталога. changes — список пар (вид, id), вид
+    'product' или 'filling': что изменилось в этой версии.
+    """
+    try:
+        version = cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.incr(CATALOG_VERSION_KEY)
+    if changes:
+        cache.set(_changes_key(version), list(changes), CHANGES_TIMEOUT)
+    return version
+
+
+def catalog_changes(since, until):
+    """Изменения между версиями (since, until] или None, если они неизвестны"""
+    if until < since or until - since > MAX_CHANGE_SPAN:
+        return None
+    keys = [_changes_key(version) for version in range(since + 1, until + 1)]
+    found = cache.get_many(keys)
+    if len(found) != len(keys):
+        return None
+    return [change for key in keys for change in found[key]]
@@ -0,0 +1,97 @@
+# products/catalog.py
+"""
+Документ каталога: все доступные товары с вариантами, начинками и ценами,
+сериализованные один раз на версию каталога (products/cache.py).
+
+Документ строится тремя запросами (товары, варианты, начинки) и хранится
+в кэше; список и карточки товаров в API отдаются из него без обращения
+к базе, а ETag позволяет клиенту получить 304 без тела ответа.
+
+Документ общий для всех хостов, поэтому ссылки на изображения в нём
+относительные; абсолютными (как у ProductSerializer с request) их делает
+with_absolute_urls при отдаче ответа.
+"""
+import hashlib
+import threading
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .cache import get_catalog_version
+from .models import Filling, Product
+from .serializers import ProductSerializer
+
+DOCUMENT_TIMEOUT = 60 * 60 * 24
+
+_local = {'version': None, 'document': None}
+_local_lock = threading.Lock()
+
+
+def catalog_queryset():
+    return Product.objects.filter(is_available=True).order_by('-created_at', '-id').prefetch_related(
+        'variants',
+        Prefetch('fillings', queryset=Filling.objects.filter(is_available=True).order_by('id')),
+    )
+
+
+def build_catalog_document(version):
+    products = []
+    for product in catalog_queryset():
+        data = ProductSerializer(product).data
+        prices = [product.base_price]
+        for variant_data, variant in zip(data['variants'], product.variants.all()):
+            price = (product.base_price * variant.price_multiplier).quantize(product.base_price)
+            variant_data['price'] = str(price)
+            prices.append(price)
+        data['price_from'] = str(min(prices))
+        products.append(data)
+
+    return {
+        'version': version,
+        'products': products,
+        'by_id': {product['id']: product for product in products},
+    }
+
+
+def get_catalog_document(version=None):
+    """Документ каталога для текущей (или указанной) версии"""
+    if version is None:
+        version = get_catalog_version()
+
+    # Сначала память процесса — без десериализации из кэша
+    if _local['version'] == version:
+        return _local['document']
+
+    key = f'catalog:document:v{version}'
+    document = cache.get(key)
+    if document is None:
+        document = build_catalog_document(version)
+        cache.set(key, document, DOCUMENT_TIMEOUT)
+
+    with _local_lock:
+        _local['version'] = version
+        _local['document'] = document
+    return document
+
+
+def with_absolute_urls(products, request):
+    """Копии товаров документа с абсолютными ссылками на изображения"""
+    return [
+        {**product, 'image': request.build_absolute_uri(product['image'])} if product['image'] else product
+        for product in products
+    ]
+
+
+def make_etag(version, *parts):
+    """Сильный ETag: тело ответа однозначно определяется версией и параметрами"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+    return f'"catalog-{version}-{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    # Для If-None-Match допускается слабое сравнение
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
@@ -0,0 +1,22 @@
+# products/management/commands/setup_search.py
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products.models import Product
+from products.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    # Индексы поиска объявлены в Product.Meta, pg_trgm включает миграция
+    # products 0001_initial — здесь только заполнение search_vector
+    help = 'Заполняет search_vector у существующих товаров (PostgreSQL)'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(
+                self.style.WARNING('Не PostgreSQL: используется поиск без индексов, настройка не нужна')
+            )
+            return
+
+        updated = update_search_vectors(Product.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Обновлено товаров: {updated}'))
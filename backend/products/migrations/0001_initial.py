@@ -0,0 +1,92 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class PostgresAddIndex(migrations.AddIndex):
+    """GIN-индексы есть только в PostgreSQL; на других СУБД (SQLite в тестах) меняется только состояние"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Filling',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_available', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('type', models.CharField(choices=[('cake', 'Торт'), ('bento', 'Бенто'), ('dessert', 'Десерт'), ('cupcake', 'Капкейк')], max_length=20)),
+                ('base_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('image', models.ImageField(upload_to='products/')),
+                ('is_available', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('price_multiplier', models.DecimalField(decimal_places=2, default=1.0, max_digits=5)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductFilling',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filling', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.filling')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+            options={
+                'unique_together': {('product', 'filling')},
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='fillings',
+            field=models.ManyToManyField(blank=True, related_name='products', through='products.ProductFilling', to='products.filling'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', '-created_at', '-id'], name='product_available_created_idx'),
+        ),
+        # pg_trgm нужен триграммному индексу product_name_trgm (gin_trgm_ops)
+        TrigramExtension(),
+        PostgresAddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+        PostgresAddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='product_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
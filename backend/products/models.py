@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 class Filling(models.Model):
     name = models.CharField(max_length=100)
@@ -23,6 +25,21 @@ class Product(models.Model):
     image = models.ImageField(upload_to='products/')
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    fillings = models.ManyToManyField(
+        Filling, through='ProductFilling', blank=True, related_name='products'
+    )
+    # tsvector для полнотекстового поиска (заполняется только на PostgreSQL)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Каталог: доступные товары, новые первыми
+            models.Index(fields=['is_available', '-created_at', '-id'], name='product_available_created_idx'),
+            # Полнотекстовый и триграммный поиск (products/search.py); расширение
+            # pg_trgm включает миграция 0001_initial
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            GinIndex(fields=['name'], name='product_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,139 @@
+# products/search.py
+"""
+Полнотекстовый поиск по товарам с ранжированием.
+
+На PostgreSQL используется хранимый tsvector (Product.search_vector,
+конфигурация russian, название с весом A, описание — B) с GIN-индексом и
+триграммное сходство по названию (pg_trgm), поэтому находятся и слова
+с опечатками («медовек» → «Медовик»). Индексы объявлены в Product.Meta,
+расширение pg_trgm включает миграция; команда setup_search заполняет
+search_vector у существующих товаров.
+
+На остальных СУБД (SQLite в тестах) работает переносимый вариант:
+кандидаты ранжируются в Python по совпадению слов с допуском опечаток.
+"""
+import re
+from difflib import SequenceMatcher
+
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
+from rest_framework import filters
+
+from .models import Product
+
+SEARCH_CONFIG = 'russian'
+TRIGRAM_THRESHOLD = 0.3
+FUZZY_THRESHOLD = 0.75
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+
+def is_postgres(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def search_vector_expression():
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset=None):
+    """Пересчитывает хранимый tsvector (только PostgreSQL)"""
+    if queryset is None:
+        queryset = Product.objects.all()
+    if not is_postgres(queryset):
+        return 0
+    return queryset.update(search_vector=search_vector_expression())
+
+
+def _tokens(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def _token_score(query_token, tokens):
+    best = 0.0
+    for token in tokens:
+        if token.startswith(query_token):
+            return 1.0
+        ratio = SequenceMatcher(None, query_token, token).ratio()
+        if ratio > best:
+            best = ratio
+    return best if best >= FUZZY_THRESHOLD else 0.0
+
+
+def fallback_score(query, name, description):
+    query_tokens = _tokens(query)
+    if not query_tokens:
+        return 0.0
+    name_tokens = _tokens(name)
+    description_tokens = _tokens(description)
+    score = 0.0
+    for query_token in query_tokens:
+        score += max(
+            NAME_WEIGHT * _token_score(query_token, name_tokens),
+            DESCRIPTION_WEIGHT * _token_score(query_token, description_tokens),
+        )
+    return score / len(query_tokens)
+
+
+def _postgres_search(queryset, query):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.annotate(
+        rank=Coalesce(SearchRank(F('search_vector'), search_query), Value(0.0)),
+        similarity=TrigramWordSimilarity(query, 'name'),
+    ).filter(
+        Q(search_vector=search_query) | Q(similarity__gte=TRIGRAM_THRESHOLD)
+    ).annotate(
+        relevance=F('rank') + F('similarity')
+    ).order_by('-relevance', '-created_at')
+
+
+def _fallback_search(queryset, query):
+    scored = []
+    for pk, name, description in queryset.values_list('pk', 'name', 'description'):
+        score = fallback_score(query, name, description)
+        if score > 0:
+            scored.append((score, pk))
+    scored.sort(key=lambda item: (-item[0], -item[1]))
+    ids = [pk for score, pk in scored]
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(
+        Case(
+            *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+    )
+
+
+def search_products(queryset, query):
+    """Товары, подходящие под запрос, в порядке убывания релевантности"""
+    query = (query or '').strip()
+    if not query:
+        return queryset
+    if is_postgres(queryset):
+        return _postgres_search(queryset, query)
+    return _fallback_search(queryset, query)
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """?search=... с ранжированием по релевантности вместо icontains"""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search_products(queryset, query)
+
+
+class RelevanceOrderingFilter(filters.OrderingFilter):
+    """Без явного ?ordering= не перетирает порядок по релевантности"""
+
+    def get_default_ordering(self, view):
+        if view.request.query_params.get(filters.SearchFilter.search_param, '').strip():
+            return None
+        return super().get_default_ordering(view)
@@ -0,0 +1,51 @@
+# products/signals.py
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .models import Filling, Product, ProductFilling, ProductVariant
+from .search import update_search_vectors
+
+
+def _catalog_change(sender, instance):
+    if sender is Filling:
+        return 'filling', instance.pk
+    if sender is Product:
+        return 'product', instance.pk
+    # Вариант и связь с начинкой меняют цены своего товара
+    return 'product', instance.product_id
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=Filling)
+@receiver(post_delete, sender=Filling)
+@receiver(post_save, sender=ProductFilling)
+@receiver(post_delete, sender=ProductFilling)
+def invalidate_catalog(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changes = [_catalog_change(sender, instance)]
+    transaction.on_commit(lambda: bump_catalog_version(changes))
+
+
+@receiver(m2m_changed, sender=Product.fillings.through)
+def invalidate_catalog_fillings(sender, instance, action, reverse, pk_set, **kwargs):
+    # product.fillings.add()/remove() не вызывают post_save у ProductFilling
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            # filling.products.add(...): pk_set — товары (при clear не известен)
+            changes = [('product', pk) for pk in pk_set or ()] or None
+        else:
+            changes = [('product', instance.pk)]
+        transaction.on_commit(lambda: bump_catalog_version(changes))
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and set(update_fields) <= {'search_vector'}):
+        return
+    update_search_vectors(Product.objects.filter(pk=instance.pk))
@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from users.models import User
+from . import catalog
+from .models import Filling, Product, ProductFilling, ProductVariant
+from .views import ProductViewSet
+
+
+class CatalogDocumentTests(TestCase):
+    def setUp(self):
+        self.filling = Filling.objects.create(name='Ягодная', price=Decimal('50'))
+        self.user = User.objects.create(username='customer')
+        self.factory = APIRequestFactory()
+
+    def create_products(self, count):
+        for index in range(count):
+            product = Product.objects.create(
+                name=f'Торт {index}', description='d', type='cake', base_price=Decimal('100'), image='x'
+            )
+            ProductVariant.objects.create(product=product, weight=Decimal('1'), price_multiplier=Decimal('1.5'))
+            ProductVariant.objects.create(product=product, weight=Decimal('2'), price_multiplier=Decimal('2'))
+            ProductFilling.objects.create(product=product, filling=self.filling)
+
+    def reset_document(self):
+        cache.clear()
+        catalog._local.update(version=None, document=None)
+
+    def get(self, action, path, params=None, **headers):
+        request = self.factory.get(path, params or {}, **headers)
+        force_authenticate(request, user=self.user)
+        return ProductViewSet.as_view({'get': action})(request, **(
+            {'pk': path.rstrip('/').rsplit('/', 1)[-1]} if action == 'retrieve' else {}
+        ))
+
+    def count_queries(self, **params):
+        """Запросы холодного списка: документ каталога строится заново"""
+        self.reset_document()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('list', '/api/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_query_count_does_not_grow(self):
+        for params in ({}, {'type': 'cake'}, {'ordering': 'base_price'}):
+            self.create_products(1)
+            single = self.count_queries(**params)
+            self.create_products(9)
+            self.assertEqual(self.count_queries(**params), single, params)
+            Product.objects.all().delete()
+
+    def test_etag_and_not_modified(self):
+        self.create_products(2)
+        self.reset_document()
+        product = Product.objects.first()
+        for action, path in (('list', '/api/products/'), ('retrieve', f'/api/products/{product.pk}/')):
+            response = self.get(action, path)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+            self.assertTrue(etag.startswith('"catalog-'))
+
+            with self.assertNumQueries(0):
+                response = self.get(action, path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_image_urls_are_absolute(self):
+        self.create_products(1)
+        self.reset_document()
+        product = Product.objects.get()
+        expected = f'http://testserver{product.image.url}'
+        self.assertEqual(self.get('list', '/api/products/').data['results'][0]['image'], expected)
+        self.assertEqual(self.get('retrieve', f'/api/products/{product.pk}/').data['image'], expected)
+        # Тот же товар через queryset (сортировка) — та же ссылка
+        response = self.get('list', '/api/products/', {'ordering': 'base_price'})
+        self.assertEqual(response.data['results'][0]['image'], expected)
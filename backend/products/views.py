@@ -1,17 +1,85 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, status
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from .catalog import etag_matches, get_catalog_document, make_etag, with_absolute_urls
+from .cache import get_catalog_version
 from .models import Product, Filling
+from .search import ProductSearchFilter, RelevanceOrderingFilter
 from .serializers import ProductSerializer, FillingSerializer
 
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.filter(is_available=True)
+    queryset = Product.objects.filter(is_available=True).prefetch_related('variants', 'fillings')
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, RelevanceOrderingFilter]
     filterset_fields = ['type', 'fillings']
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'base_price']
     ordering = ['-created_at']
 
+    # Параметры списка, которые обслуживаются из документа каталога;
+    # поиск (ранжированный, см. search.py) и сортировка идут через queryset
+    DOCUMENT_PARAMS = {'page', 'type', 'fillings', 'format'}
+
+    def _not_modified(self, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = etag
+        return response
+
+    def _with_etag(self, response, etag):
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        fillings = params.getlist('fillings')
+        if not set(params) <= self.DOCUMENT_PARAMS or not all(f.isdigit() for f in fillings):
+            return super().list(request, *args, **kwargs)
+
+        version = get_catalog_version()
+        # Ссылки на изображения абсолютные — тело зависит и от хоста запроса
+        etag = make_etag(
+            version, 'list', request.accepted_renderer.format, request.build_absolute_uri('/'),
+            sorted(params.lists())
+        )
+        if etag_matches(request, etag):
+            return self._not_modified(etag)
+
+        products = get_catalog_document(version)['products']
+        if params.get('type'):
+            products = [p for p in products if p['type'] == params['type']]
+        if fillings:
+            wanted = {int(f) for f in fillings}
+            products = [
+                p for p in products
+                if wanted.intersection(filling['id'] for filling in p['fillings'])
+            ]
+
+        page = self.paginate_queryset(products)
+        if page is not None:
+            return self._with_etag(
+                self.get_paginated_response(with_absolute_urls(page, request)), etag
+            )
+        return self._with_etag(Response(with_absolute_urls(products, request)), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except (TypeError, ValueError):
+            return super().retrieve(request, *args, **kwargs)
+
+        version = get_catalog_version()
+        etag = make_etag(
+            version, 'detail', request.accepted_renderer.format, request.build_absolute_uri('/'), pk
+        )
+        if etag_matches(request, etag):
+            return self._not_modified(etag)
+
+        product = get_catalog_document(version)['by_id'].get(pk)
+        if product is None:
+            return Response({'detail': 'Товар не найден.'}, status=status.HTTP_404_NOT_FOUND)
+        return self._with_etag(Response(with_absolute_urls([product], request)[0]), etag)
+
 class FillingViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Filling.objects.filter(is_available=True)
     serializer_class = FillingSerializer
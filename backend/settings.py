@@ -41,6 +41,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'admin.metrics.MetricsMiddleware',
+    # Выключен, пока не задан QUERY_INSTRUMENTATION
+    'admin.middleware.QueryInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -78,6 +81,18 @@ DATABASES['default']['OPTIONS']['MAX_CONNS'] = 20
 # Redis configuration for caching and channels
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
+# Cache configuration
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    },
+}
+
+# Кэш дашборда админ-панели (версии и счётчики общие для всех воркеров)
+DASHBOARD_CACHE_ALIAS = 'default'
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', '300'))
+
 # Channels configuration
 CHANNEL_LAYERS = {
     'default': {
@@ -88,6 +103,43 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Telegram: очередь фоновой отправки уведомлений (telegram/dispatcher.py)
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+TELEGRAM_NOTIFY_QUEUE_SIZE = int(os.getenv('TELEGRAM_NOTIFY_QUEUE_SIZE', '1000'))
+TELEGRAM_NOTIFY_WORKERS = int(os.getenv('TELEGRAM_NOTIFY_WORKERS', '4'))
+TELEGRAM_IDENTITY_CACHE_SIZE = int(os.getenv('TELEGRAM_IDENTITY_CACHE_SIZE', '10000'))
+TELEGRAM_BOT_DB_THREADS = int(os.getenv('TELEGRAM_BOT_DB_THREADS', '8'))
+TELEGRAM_BOT_CONCURRENT_UPDATES = int(os.getenv('TELEGRAM_BOT_CONCURRENT_UPDATES', '64'))
+TELEGRAM_CATALOG_CHECK_INTERVAL = float(os.getenv('TELEGRAM_CATALOG_CHECK_INTERVAL', '1.0'))
+
+# Telegram: режим вебхука (telegram/webhook.py)
+TELEGRAM_WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL', '')
+TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET', '')
+TELEGRAM_WEBHOOK_WORKERS = int(os.getenv('TELEGRAM_WEBHOOK_WORKERS', '8'))
+TELEGRAM_WEBHOOK_QUEUE_SIZE = int(os.getenv('TELEGRAM_WEBHOOK_QUEUE_SIZE', '1000'))
+TELEGRAM_WEBHOOK_DEDUP_SIZE = int(os.getenv('TELEGRAM_WEBHOOK_DEDUP_SIZE', '10000'))
+# Общий для всех процессов учёт update_id через кэш (Redis); включается явно
+TELEGRAM_WEBHOOK_SHARED_DEDUP = os.getenv('TELEGRAM_WEBHOOK_SHARED_DEDUP', 'False').lower() == 'true'
+
+# Доска кондитеров: журнал событий для докачки после переподключения (chef/events.py)
+CHEF_EVENT_RETENTION = int(os.getenv('CHEF_EVENT_RETENTION', '1000'))
+CHEF_EVENT_REPLAY_LIMIT = int(os.getenv('CHEF_EVENT_REPLAY_LIMIT', '200'))
+# Окно пакетной рассылки кондитерам в мс, 0 — отправлять каждое событие сразу
+CHEF_BROADCAST_WINDOW_MS = int(os.getenv('CHEF_BROADCAST_WINDOW_MS', '0'))
+
+# Архив завершённых заказов: возраст в днях для archive_orders (orders/archive.py)
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', '180'))
+
+# Учёт SQL-запросов на запрос: Server-Timing, бюджет, поиск N+1 (admin/middleware.py)
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', 'False').lower() == 'true'
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', '50'))
+QUERY_N1_THRESHOLD = int(os.getenv('QUERY_N1_THRESHOLD', '5'))
+
+# Метрики Prometheus (admin/metrics.py); при нескольких воркерах задайте PROMETHEUS_MULTIPROC_DIR
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+# Без токена /metrics/ отвечает 403, если DEBUG выключен
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -143,6 +195,8 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+AUTH_USER_MODEL = 'users.User'
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,118 @@
+# telegram/benchmark.py
+"""
+Нагрузочный прогон клиентского бота: N чатов одновременно нажимают
+кнопку «📦 Мой заказ». Ответы уходят на локальный поддельный Bot API
+(telegram/fake_api.py), поэтому измеряется именно обработка обновлений:
+обработчики, слой repository и база данных.
+"""
+import asyncio
+import time
+
+from django.utils import timezone
+from telegram import Update
+
+from orders.models import Order
+from orders.seed import delete_bench_users
+from users.models import User
+from telegram.fake_api import FakeBotAPIServer
+from telegram.identity import identity_cache
+
+BENCH_TELEGRAM_ID_BASE = 9_000_000_000
+
+
+def prepare_chats(chats, orders_per_chat=3):
+    """Создаёт пользователей-участников прогона и их заказы, возвращает chat id"""
+    chat_ids = [BENCH_TELEGRAM_ID_BASE + i for i in range(chats)]
+    existing = set(
+        User.objects.filter(telegram_id__in=chat_ids).values_list('telegram_id', flat=True)
+    )
+    new_users = [
+        User(username=f'bench_{chat_id}', telegram_id=chat_id, role='customer')
+        for chat_id in chat_ids if chat_id not in existing
+    ]
+    User.objects.bulk_create(new_users, batch_size=500)
+    now = timezone.now()
+    Order.objects.bulk_create([
+        Order(
+            user=user,
+            total_price=1000,
+            delivery_address='benchmark',
+            delivery_date=now,
+            source='telegram'
+        )
+        for user in new_users
+        for _ in range(orders_per_chat)
+    ], batch_size=500)
+    return chat_ids
+
+
+def cleanup_chats():
+    delete_bench_users(User.objects.filter(
+        telegram_id__gte=BENCH_TELEGRAM_ID_BASE, username__startswith='bench_'
+    ))
+
+
+def make_update(update_id, chat_id, text):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+            'text': text,
+        }
+    }
+
+
+async def _run(application, server, updates, timeout):
+    await application.initialize()
+    await application.start()
+    try:
+        started = time.perf_counter()
+        for data in updates:
+            await application.update_queue.put(Update.de_json(data, application.bot))
+        deadline = started + timeout
+        while len(server.messages) < len(updates) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.005)
+        return time.perf_counter() - started
+    finally:
+        await application.stop()
+        await application.shutdown()
+
+
+def run_bot_benchmark(chats=100, updates_per_chat=5, concurrency=None,
+                      text='📦 Мой заказ', latency=0.0, timeout=120, warm_cache=False):
+    """Возвращает словарь с пропускной способностью обработки обновлений"""
+    from telegram.client_bot import build_application
+
+    chat_ids = prepare_chats(chats)
+    if not warm_cache:
+        identity_cache.clear()
+
+    server = FakeBotAPIServer(latency=latency).start()
+    try:
+        application = build_application(
+            token='123456:BENCHMARK', base_url=server.base_url,
+            concurrent_updates=concurrency
+        )
+        updates = [
+            make_update(n * len(chat_ids) + i + 1, chat_id, text)
+            for n in range(updates_per_chat)
+            for i, chat_id in enumerate(chat_ids)
+        ]
+        elapsed = asyncio.run(_run(application, server, updates, timeout))
+        processed = len(server.messages)
+    finally:
+        server.stop()
+
+    return {
+        'chats': chats,
+        'updates': len(updates),
+        'processed': processed,
+        'concurrency': concurrency or application.concurrent_updates,
+        'seconds': round(elapsed, 4),
+        'updates_per_second': round(processed / elapsed, 1) if elapsed else 0.0,
+        'identity_cache_hits': identity_cache.hits,
+        'identity_cache_misses': identity_cache.misses,
+    }
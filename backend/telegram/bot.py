@@ -1,16 +1,33 @@
 # telegram/bot.py
 import os
-import asyncio
+from functools import cached_property
+
 from telegram import Bot
 from django.conf import settings
+from .dispatcher import dispatcher
+
+STATUS_TEXT = {
+    'new': 'новый',
+    'processing': 'в обработке',
+    'baking': 'готовится',
+    'ready': 'готов',
+    'delivered': 'доставлен',
+    'cancelled': 'отменён'
+}
 
 class TelegramNotifier:
     def __init__(self):
-        self.bot = Bot(token=os.getenv('TELEGRAM_BOT_TOKEN'))
         self.admin_chat_id = os.getenv('TELEGRAM_ADMIN_CHAT_ID')
+        self.dispatcher = dispatcher
 
-    async def send_new_order_notification(self, order_data):
-        """Отправка уведомления о новом заказе администраторам"""
+    @cached_property
+    def bot(self):
+        # Создаётся при первой прямой отправке: уведомления из Django идут
+        # через dispatcher, а Bot без токена падает (InvalidToken) ещё при импорте
+        return Bot(token=os.getenv('TELEGRAM_BOT_TOKEN'))
+
+    @staticmethod
+    def format_new_order(order_data):
         message = f"""
 🔔 Новый заказ!
 
@@ -25,6 +42,15 @@ ID заказа: {order_data['id']}
             message += f"- {item['product']['name']} x{item['quantity']} ({item['price']} ₽)\n"
 
         message += f"\nКомментарий: {order_data.get('comment', 'Нет')}"
+        return message
+
+    @staticmethod
+    def format_status_update(order_id, status):
+        return f"📦 Статус вашего заказа #{order_id} изменён на: {STATUS_TEXT.get(status, status)}"
+
+    async def send_new_order_notification(self, order_data):
+        """Отправка уведомления о новом заказе администраторам"""
+        message = self.format_new_order(order_data)
 
         try:
             await self.bot.send_message(
@@ -36,16 +62,7 @@ ID заказа: {order_data['id']}
 
     async def send_order_status_update(self, order_id, status, user_telegram_id=None):
         """Отправка уведомления об изменении статуса заказа"""
-        status_text = {
-            'new': 'новый',
-            'processing': 'в обработке',
-            'baking': 'готовится',
-            'ready': 'готов',
-            'delivered': 'доставлен',
-            'cancelled': 'отменён'
-        }
-
-        message = f"📦 Статус вашего заказа #{order_id} изменён на: {status_text.get(status, status)}"
+        message = self.format_status_update(order_id, status)
 
         try:
             if user_telegram_id:
@@ -57,8 +74,24 @@ ID заказа: {order_data['id']}
             print(f"Ошибка отправки уведомления пользователю: {e}")
 
     def notify_new_order_sync(self, order_data):
-        """Синхронный метод для вызова из Django"""
-        asyncio.run(self.send_new_order_notification(order_data))
+        """Синхронный метод для вызова из Django: только ставит сообщение в очередь"""
+        return self.dispatcher.enqueue(self.admin_chat_id, self.format_new_order(order_data))
+
+    def notify_order_status(self, order_id, status, user_telegram_id=None):
+        """Ставит в очередь уведомление клиенту об изменении статуса"""
+        if not user_telegram_id:
+            return False
+        return self.dispatcher.enqueue(
+            user_telegram_id, self.format_status_update(order_id, status)
+        )
+
+    def notify_order_statuses(self, changes):
+        """Ставит в очередь пачку уведомлений [(order_id, status, telegram_id)]"""
+        return self.dispatcher.enqueue_many(
+            (telegram_id, self.format_status_update(order_id, status))
+            for order_id, status, telegram_id in changes
+            if telegram_id
+        )
 
 # Глобальный экземпляр
 notifier = TelegramNotifier()
@@ -0,0 +1,140 @@
+# telegram/catalog.py
+"""
+Снимок каталога для клиентского бота.
+
+Клавиатура каталога и тексты карточек товаров строятся один раз на версию
+каталога (products/cache.py) и дальше отдаются из памяти: нажатие
+«🍰 Каталог» и колбэки product_<id> не обращаются к базе. Версия
+сверяется с общим кэшем не чаще раза в TELEGRAM_CATALOG_CHECK_INTERVAL
+секунд, поэтому изменения из админки доходят до всех процессов бота.
+"""
+import asyncio
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from products.cache import get_catalog_version
+from products.models import Product, ProductVariant
+from telegram.repository import db_call
+
+CATALOG_SIZE = 6
+
+
+class CatalogSnapshot:
+    """Неизменяемый снимок каталога"""
+    __slots__ = ('version', 'keyboard', 'details', 'built_at')
+
+    def __init__(self, version, keyboard, details):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'keyboard', keyboard)
+        object.__setattr__(self, 'details', MappingProxyType(details))
+        object.__setattr__(self, 'built_at', time.time())
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CatalogSnapshot is immutable')
+
+    @property
+    def is_empty(self):
+        return self.keyboard is None
+
+    def product(self, product_id):
+        """(текст, клавиатура) карточки товара или None"""
+        return self.details.get(product_id)
+
+
+def format_product(product):
+    message = f"🍰 {product.name}\n\n"
+    message += f"Цена: {product.base_price} ₽\n"
+    variants = sorted(product.variants.all(), key=lambda variant: variant.weight)
+    if variants:
+        message += "Варианты:\n"
+        for variant in variants:
+            price = (product.base_price * variant.price_multiplier).quantize(product.base_price)
+            message += f"  • {variant.weight} кг — {price} ₽\n"
+    message += f"Описание: {product.description}\n\n"
+    message += "Хотите заказать этот торт?"
+    return message
+
+
+def build_snapshot(version):
+    """Строит снимок по базе (два запроса: товары и их варианты)"""
+    products = list(
+        Product.objects.filter(is_available=True).order_by('pk').prefetch_related('variants')
+    )
+
+    keyboard = None
+    if products:
+        keyboard = InlineKeyboardMarkup(tuple(
+            (InlineKeyboardButton(
+                f"{product.name} - {product.base_price} ₽",
+                callback_data=f"product_{product.id}"
+            ),)
+            for product in products[:CATALOG_SIZE]
+        ))
+
+    details = {}
+    for product in products:
+        details[product.id] = (
+            format_product(product),
+            InlineKeyboardMarkup((
+                (InlineKeyboardButton("Заказать", callback_data=f"order_{product.id}"),),
+                (InlineKeyboardButton("Назад к каталогу", callback_data="catalog"),),
+            ))
+        )
+    return CatalogSnapshot(version, keyboard, details)
+
+
+class CatalogStore:
+    def __init__(self, check_interval=None):
+        self.check_interval = check_interval
+        self.snapshot = None
+        self.rebuilds = 0
+        self._checked_at = 0.0
+        self._lock = None
+        self._lock_loop = None
+
+    def _interval(self):
+        if self.check_interval is not None:
+            return self.check_interval
+        return getattr(settings, 'TELEGRAM_CATALOG_CHECK_INTERVAL', 1.0)
+
+    def invalidate(self):
+        """Заставляет сверить версию при следующем обращении"""
+        self._checked_at = 0.0
+
+    async def get(self):
+        now = time.monotonic()
+        if self.snapshot is not None and now - self._checked_at < self._interval():
+            return self.snapshot
+
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            if self.snapshot is not None and time.monotonic() - self._checked_at < self._interval():
+                return self.snapshot
+            version = await db_call(get_catalog_version)()
+            if self.snapshot is None or self.snapshot.version != version:
+                self.snapshot = await db_call(build_snapshot)(version)
+                self.rebuilds += 1
+            self._checked_at = time.monotonic()
+            return self.snapshot
+
+
+# Глобальный экземпляр (один на процесс бота)
+catalog_store = CatalogStore()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def invalidate_catalog_snapshot(sender, **kwargs):
+    # Изменения, сделанные в этом же процессе, видны сразу после коммита
+    transaction.on_commit(catalog_store.invalidate)
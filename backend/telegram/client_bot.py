@@ -1,7 +1,9 @@
 # telegram/client_bot.py
 import os
+import asyncio
 import django
 import json
+from django.utils import timezone
 from telegram import Update, ReplyKeyboardMarkup, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 
@@ -9,9 +11,11 @@ from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQu
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
+from django.conf import settings
+from admin.metrics import timed_handler
 from orders.models import Order
-from users.models import User
-from products.models import Product
+from telegram import repository
+from telegram.catalog import catalog_store
 
 # Клавиатуры
 MAIN_KEYBOARD = [
@@ -23,16 +27,7 @@ MAIN_KEYBOARD = [
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Создаем или получаем пользователя
     telegram_id = str(update.effective_user.id)
-    username = update.effective_user.username or f"user_{telegram_id}"
-
-    user, created = User.objects.get_or_create(
-        username=username,
-        defaults={
-            'first_name': update.effective_user.first_name or '',
-            'last_name': update.effective_user.last_name or '',
-            'role': 'customer'
-        }
-    )
+    await repository.get_or_create_customer(update.effective_user)
 
     keyboard = ReplyKeyboardMarkup(MAIN_KEYBOARD, resize_keyboard=True)
     await update.message.reply_text(
@@ -43,66 +38,60 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 async def my_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    telegram_id = str(update.effective_user.id)
-    try:
-        user = User.objects.get(username__endswith=telegram_id)
-        orders = Order.objects.filter(user=user).order_by('-created_at')[:5]
-
-        if not orders:
-            await update.message.reply_text("У вас пока нет заказов.")
-            return
-
-        message = "Ваши последние заказы:\n\n"
-        for order in orders:
-            message += f"Заказ #{order.id}\n"
-            message += f"Статус: {dict(Order.STATUS_CHOICES)[order.status]}\n"
-            message += f"Сумма: {order.total_price} ₽\n"
-            message += f"Дата: {order.created_at.strftime('%d.%m.%Y %H:%M')}\n"
-            message += "─" * 20 + "\n"
-
-        await update.message.reply_text(message)
-    except User.DoesNotExist:
+    user_pk = await repository.resolve_user_pk(update.effective_user.id)
+    if user_pk is None:
         await update.message.reply_text("Пожалуйста, сначала зарегистрируйтесь через сайт.")
+        return
+
+    orders = await repository.get_recent_orders(user_pk, limit=5)
+
+    if not orders:
+        await update.message.reply_text("У вас пока нет заказов.")
+        return
+
+    message = "Ваши последние заказы:\n\n"
+    for order in orders:
+        message += f"Заказ #{order['id']}\n"
+        message += f"Статус: {dict(Order.STATUS_CHOICES)[order['status']]}\n"
+        message += f"Сумма: {order['total_price']} ₽\n"
+        message += f"Дата: {timezone.localtime(order['created_at']).strftime('%d.%m.%Y %H:%M')}\n"
+        message += "─" * 20 + "\n"
+
+    await update.message.reply_text(message)
 
 async def catalog(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    products = Product.objects.filter(is_available=True)[:6]
+    snapshot = await catalog_store.get()
 
-    if not products:
+    if snapshot.is_empty:
         await update.message.reply_text("Каталог временно пуст.")
         return
 
-    keyboard = []
-    for product in products:
-        keyboard.append([InlineKeyboardButton(
-            f"{product.name} - {product.base_price} ₽",
-            callback_data=f"product_{product.id}"
-        )])
+    await update.message.reply_text("Выберите торт из каталога:", reply_markup=snapshot.keyboard)
+
+async def catalog_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+
+    snapshot = await catalog_store.get()
+    if snapshot.is_empty:
+        await query.edit_message_text("Каталог временно пуст.")
+        return
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("Выберите торт из каталога:", reply_markup=reply_markup)
+    await query.edit_message_text("Выберите торт из каталога:", reply_markup=snapshot.keyboard)
 
 async def product_detail(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
     product_id = query.data.split('_')[1]
-    try:
-        product = Product.objects.get(id=product_id)
-
-        message = f"🍰 {product.name}\n\n"
-        message += f"Цена: {product.base_price} ₽\n"
-        message += f"Описание: {product.description}\n\n"
-        message += "Хотите заказать этот торт?"
-
-        keyboard = [
-            [InlineKeyboardButton("Заказать", callback_data=f"order_{product.id}")],
-            [InlineKeyboardButton("Назад к каталогу", callback_data="catalog")]
-        ]
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(message, reply_markup=reply_markup)
-    except Product.DoesNotExist:
+    snapshot = await catalog_store.get()
+    detail = snapshot.product(int(product_id)) if product_id.isdigit() else None
+    if detail is None:
         await query.edit_message_text("Торт не найден.")
+        return
+
+    message, reply_markup = detail
+    await query.edit_message_text(message, reply_markup=reply_markup)
 
 async def builder(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
@@ -132,21 +121,22 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(help_text)
 
 async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    telegram_id = str(update.effective_user.id)
-    try:
-        user = User.objects.get(username__endswith=telegram_id)
-        profile_text = f"""
+    user_pk = await repository.resolve_user_pk(update.effective_user.id)
+    user = await repository.get_user_profile(user_pk) if user_pk is not None else None
+    if user is None:
+        await update.message.reply_text("Пожалуйста, сначала зарегистрируйтесь через сайт.")
+        return
+
+    profile_text = f"""
 👤 Ваш профиль:
 
-Имя: {user.first_name} {user.last_name}
-Username: @{user.username}
-Бонусные баллы: {user.bonus_points}
+Имя: {user['first_name']} {user['last_name']}
+Username: @{user['username']}
+Бонусные баллы: {user['bonus_points']}
 
 Для изменения данных зарегистрируйтесь на сайте.
 """
-        await update.message.reply_text(profile_text)
-    except User.DoesNotExist:
-        await update.message.reply_text("Пожалуйста, сначала зарегистрируйтесь через сайт.")
+    await update.message.reply_text(profile_text)
 
 async def contacts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     contacts_text = """
@@ -161,18 +151,49 @@ async def contacts(update: Update, context: ContextTypes.DEFAULT_TYPE):
 """
     await update.message.reply_text(contacts_text)
 
+def build_application(token=None, base_url=None, concurrent_updates=None):
+    """Собирает Application со всеми обработчиками (без запуска)"""
+    builder_ = Application.builder().token(token or os.getenv('TELEGRAM_BOT_TOKEN'))
+    builder_ = builder_.base_url(
+        base_url or getattr(settings, 'TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+    )
+    # Обновления разных чатов обрабатываются параллельно
+    builder_ = builder_.concurrent_updates(
+        concurrent_updates or getattr(settings, 'TELEGRAM_BOT_CONCURRENT_UPDATES', 64)
+    )
+    app = builder_.build()
+
+    app.add_handler(CommandHandler("start", timed_handler('start', start)))
+    app.add_handler(CommandHandler("help", timed_handler('help_command', help_command)))
+    app.add_handler(MessageHandler(filters.Regex('📦 Мой заказ'), timed_handler('my_order', my_order)))
+    app.add_handler(MessageHandler(filters.Regex('🍰 Каталог'), timed_handler('catalog', catalog)))
+    app.add_handler(MessageHandler(filters.Regex('🎨 Конструктор'), timed_handler('builder', builder)))
+    app.add_handler(MessageHandler(filters.Regex('ℹ️ Помощь'), timed_handler('help_command', help_command)))
+    app.add_handler(MessageHandler(filters.Regex('👤 Профиль'), timed_handler('profile', profile)))
+    app.add_handler(MessageHandler(filters.Regex('📞 Контакты'), timed_handler('contacts', contacts)))
+    app.add_handler(CallbackQueryHandler(timed_handler('product_detail', product_detail), pattern='^product_'))
+    app.add_handler(CallbackQueryHandler(timed_handler('catalog_callback', catalog_callback), pattern='^catalog$'))
+
+    return app
+
 def main():
-    app = Application.builder().token(os.getenv('TELEGRAM_BOT_TOKEN')).build()
-
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("help", help_command))
-    app.add_handler(MessageHandler(filters.Regex('📦 Мой заказ'), my_order))
-    app.add_handler(MessageHandler(filters.Regex('🍰 Каталог'), catalog))
-    app.add_handler(MessageHandler(filters.Regex('🎨 Конструктор'), builder))
-    app.add_handler(MessageHandler(filters.Regex('ℹ️ Помощь'), help_command))
-    app.add_handler(MessageHandler(filters.Regex('👤 Профиль'), profile))
-    app.add_handler(MessageHandler(filters.Regex('📞 Контакты'), contacts))
-    app.add_handler(CallbackQueryHandler(product_detail, pattern='^product_'))
+    app = build_application()
+
+    webhook_url = getattr(settings, 'TELEGRAM_WEBHOOK_URL', '')
+    if webhook_url:
+        # Обновления принимает Django (telegram/views.py, нужен ASGI-сервер),
+        # здесь только регистрируем адрес вебхука
+        secret = getattr(settings, 'TELEGRAM_WEBHOOK_SECRET', '')
+        if not secret:
+            # Вебхук без секрета отклоняет все обновления
+            raise SystemExit('Для режима вебхука задайте TELEGRAM_WEBHOOK_SECRET')
+        asyncio.run(app.bot.set_webhook(
+            webhook_url,
+            secret_token=secret,
+            allowed_updates=Update.ALL_TYPES
+        ))
+        print(f"Вебхук установлен: {webhook_url}")
+        return
 
     app.run_polling()
 
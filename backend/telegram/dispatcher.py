@@ -0,0 +1,245 @@
+# telegram/dispatcher.py
+"""
+Фоновая отправка уведомлений в Telegram.
+
+Представления только кладут сообщение в очередь (enqueue) и сразу
+возвращают ответ. Отправкой занимается отдельный поток со своим
+event loop и одним долгоживущим экземпляром Bot (общая HTTP-сессия).
+Соблюдаются лимиты Telegram: не чаще одного сообщения в секунду в один чат
+и не более ~30 сообщений в секунду всего; RetryAfter и сетевые ошибки
+повторяются с экспоненциальной задержкой.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque, namedtuple
+
+from django.conf import settings
+from telegram import Bot
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+
+from admin.metrics import NOTIFICATIONS
+
+logger = logging.getLogger(__name__)
+
+OutgoingMessage = namedtuple('OutgoingMessage', ['chat_id', 'text', 'options', 'enqueued_at'])
+
+
+class NotificationDispatcher:
+    def __init__(self, token=None, base_url=None, max_queue=None, workers=None,
+                 per_chat_interval=1.0, global_rate=30, max_retries=5,
+                 backoff=1.0, max_backoff=60.0, bot=None):
+        self.token = token
+        self.base_url = base_url
+        self.max_queue = max_queue or getattr(settings, 'TELEGRAM_NOTIFY_QUEUE_SIZE', 1000)
+        self.workers = workers or getattr(settings, 'TELEGRAM_NOTIFY_WORKERS', 4)
+        self.per_chat_interval = per_chat_interval
+        self.global_interval = 1.0 / global_rate if global_rate else 0.0
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.bot = bot
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._pending = 0
+
+        # Время, раньше которого нельзя писать в чат / в API вообще
+        self._chat_slots = {}
+        self._global_slot = 0.0
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+        self._latencies = deque(maxlen=1000)
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+
+    # --- Публичный API (вызывается из потоков Django) ---
+
+    def enqueue(self, chat_id, text, **options):
+        """Ставит сообщение в очередь. Возвращает False, если очередь переполнена."""
+        if not chat_id:
+            return False
+        self.start()
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._count('dropped')
+                logger.warning('Очередь уведомлений переполнена, сообщение в чат %s отброшено', chat_id)
+                return False
+            self._pending += 1
+        message = OutgoingMessage(chat_id, text, options, time.monotonic())
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+        return True
+
+    def enqueue_many(self, messages):
+        """Ставит в очередь пачку пар (chat_id, text). Возвращает число принятых."""
+        return sum(1 for chat_id, text in messages if self.enqueue(chat_id, text))
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='telegram-dispatcher', daemon=True
+            )
+            self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout=10):
+        """Дожидается отправки очереди (не дольше timeout) и останавливает поток"""
+        if self._thread is None:
+            return
+        self.join(timeout)
+        self._loop.call_soon_threadsafe(self._stop_event.set)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def join(self, timeout=None):
+        """Ждёт, пока очередь опустеет. Возвращает True, если дождались."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue_depth:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    @property
+    def queue_depth(self):
+        return self._pending
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue': self.max_queue,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'retried': self.retried,
+            'latency_avg': self._latency_sum / self.sent if self.sent else 0.0,
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+            'latency_max': self._latency_max,
+        }
+
+    # --- Работа в фоновом потоке ---
+
+    def _make_bot(self):
+        if self.bot is not None:
+            return self.bot
+        token = self.token or os.getenv('TELEGRAM_BOT_TOKEN')
+        base_url = self.base_url or getattr(
+            settings, 'TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot'
+        )
+        return Bot(token=token, base_url=base_url)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._stop_event = asyncio.Event()
+        self._ready.set()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        self.bot = self._make_bot()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        await self._stop_event.wait()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        try:
+            await self.bot.shutdown()
+        except Exception as e:
+            logger.warning('Ошибка при закрытии сессии бота: %s', e)
+
+    async def _worker(self):
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._wait_for_slot(message.chat_id)
+                await self._send(message)
+            except Exception:
+                self._count('failed')
+                logger.exception('Не удалось отправить уведомление в чат %s', message.chat_id)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+    async def _wait_for_slot(self, chat_id):
+        # Резервируем ближайший свободный слот; в одном event loop это атомарно
+        now = time.monotonic()
+        slot = max(now, self._chat_slots.get(chat_id, 0.0), self._global_slot)
+        self._chat_slots[chat_id] = slot + self.per_chat_interval
+        self._global_slot = slot + self.global_interval
+        if len(self._chat_slots) > 10000:
+            self._chat_slots = {
+                chat: until for chat, until in self._chat_slots.items() if until > now
+            }
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _send(self, message):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.bot.send_message(
+                    chat_id=message.chat_id, text=message.text, **message.options
+                )
+                self._record_latency(time.monotonic() - message.enqueued_at)
+                return
+            except RetryAfter as e:
+                delay = float(e.retry_after)
+            except BadRequest as e:
+                # Ошибка в самом запросе — повтор не поможет
+                self._count('failed')
+                logger.error('Telegram отклонил сообщение в чат %s: %s', message.chat_id, e)
+                return
+            except NetworkError as e:
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                delay += random.uniform(0, delay / 2)
+                logger.warning('Сетевая ошибка при отправке в чат %s: %s', message.chat_id, e)
+            except TelegramError as e:
+                self._count('failed')
+                logger.error('Ошибка отправки уведомления в чат %s: %s', message.chat_id, e)
+                return
+
+            if attempt < self.max_retries:
+                self._count('retried')
+                await asyncio.sleep(delay)
+
+        self._count('failed')
+        logger.error('Сообщение в чат %s не отправлено после %s попыток', message.chat_id, self.max_retries + 1)
+
+    def _count(self, result):
+        setattr(self, result, getattr(self, result) + 1)
+        NOTIFICATIONS.labels(result).inc()
+
+    def _record_latency(self, latency):
+        self._count('sent')
+        self._latencies.append(latency)
+        self._latency_sum += latency
+        self._latency_max = max(self._latency_max, latency)
+
+
+# Глобальный экземпляр, поток запускается при первой постановке в очередь
+dispatcher = NotificationDispatcher()
@@ -0,0 +1,141 @@
+# telegram/identity.py
+"""
+Сопоставление Telegram chat id → pk пользователя для клиентского бота.
+
+Поиск идёт по уникальному индексу User.telegram_id, а результат хранится
+в ограниченном LRU-кэше процесса бота, поэтому повторные нажатия кнопок
+не обращаются к таблице пользователей вовсе. Отрицательные результаты
+не кэшируются: пользователь может зарегистрироваться в любой момент.
+
+Привязку может изменить другой процесс (админка, другой воркер), поэтому
+каждая запись LRU помечена версией привязок из общего кэша (как версия
+каталога в products/cache.py). Смена telegram_id или удаление привязанного
+пользователя увеличивает версию, и записи всех процессов с прежней версией
+перестают читаться.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from users.models import User
+
+IDENTITY_VERSION_KEY = 'telegram:identity:version'
+
+
+def get_identity_version():
+    version = cache.get(IDENTITY_VERSION_KEY)
+    if version is None:
+        cache.add(IDENTITY_VERSION_KEY, 1, timeout=None)
+        version = cache.get(IDENTITY_VERSION_KEY, 1)
+    return version
+
+
+def bump_identity_version():
+    try:
+        return cache.incr(IDENTITY_VERSION_KEY)
+    except ValueError:
+        cache.add(IDENTITY_VERSION_KEY, 1, timeout=None)
+        return cache.incr(IDENTITY_VERSION_KEY)
+
+
+class TelegramIdentityCache:
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize or getattr(settings, 'TELEGRAM_IDENTITY_CACHE_SIZE', 10000)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chat_id):
+        version = get_identity_version()
+        with self._lock:
+            entry = self._data.get(chat_id)
+            if entry is None or entry[0] != version:
+                # Запись другой версии: привязки могли измениться в другом процессе
+                self._data.pop(chat_id, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(chat_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, chat_id, user_pk, version=None):
+        if version is None:
+            version = get_identity_version()
+        with self._lock:
+            self._data[chat_id] = (version, user_pk)
+            self._data.move_to_end(chat_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, chat_id):
+        with self._lock:
+            self._data.pop(chat_id, None)
+
+    def discard_user(self, user_pk):
+        with self._lock:
+            for chat_id in [chat for chat, (_, pk) in self._data.items() if pk == user_pk]:
+                del self._data[chat_id]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def resolve(self, chat_id):
+        """Возвращает pk пользователя по chat id или None, если он не привязан"""
+        chat_id = int(chat_id)
+        user_pk = self.get(chat_id)
+        if user_pk is not None:
+            return user_pk
+        return self.load(chat_id)
+
+    def load(self, chat_id):
+        """Читает привязку из базы (по индексу telegram_id) и кладёт в кэш"""
+        chat_id = int(chat_id)
+        # Версия до чтения: если привязка изменится во время запроса,
+        # запись сразу окажется устаревшей
+        version = get_identity_version()
+        user_pk = User.objects.filter(
+            telegram_id=chat_id
+        ).values_list('pk', flat=True).first()
+        if user_pk is not None:
+            self.put(chat_id, user_pk, version)
+        return user_pk
+
+
+# Глобальный экземпляр (один на процесс бота)
+identity_cache = TelegramIdentityCache()
+
+
+@receiver(post_init, sender=User)
+def remember_telegram_id(sender, instance, **kwargs):
+    instance._identity_telegram_id = instance.__dict__.get('telegram_id')
+
+
+@receiver(post_save, sender=User)
+def refresh_identity_cache(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'telegram_id' not in update_fields):
+        return
+    previous = instance._identity_telegram_id
+    current = instance.__dict__.get('telegram_id')
+    instance._identity_telegram_id = current
+    if created or previous == current:
+        return
+    # telegram_id сменился — убираем старую привязку здесь и во всех процессах
+    identity_cache.discard_user(instance.pk)
+    transaction.on_commit(bump_identity_version)
+
+
+@receiver(post_delete, sender=User)
+def forget_identity(sender, instance, **kwargs):
+    identity_cache.discard_user(instance.pk)
+    if instance.__dict__.get('telegram_id') is not None:
+        transaction.on_commit(bump_identity_version)
@@ -0,0 +1,30 @@
+# telegram/management/commands/bench_bot.py
+import json
+
+from django.core.management.base import BaseCommand
+
+from telegram.benchmark import cleanup_chats, run_bot_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Измеряет, сколько обновлений в секунду обрабатывает клиентский бот при N чатах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chats', type=int, default=100)
+        parser.add_argument('--updates', type=int, default=5, help='Обновлений на чат')
+        parser.add_argument('--concurrency', type=int, help='Параллельно обрабатываемых обновлений')
+        parser.add_argument('--latency', type=float, default=0.0, help='Задержка поддельного Bot API, с')
+        parser.add_argument('--keep', action='store_true', help='Не удалять тестовых пользователей')
+
+    def handle(self, *args, **options):
+        try:
+            result = run_bot_benchmark(
+                chats=options['chats'],
+                updates_per_chat=options['updates'],
+                concurrency=options['concurrency'],
+                latency=options['latency'],
+            )
+        finally:
+            if not options['keep']:
+                cleanup_chats()
+        self.stdout.write(json.dumps(result, ensure_ascii=False, indent=2))
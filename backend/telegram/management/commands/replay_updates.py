@@ -0,0 +1,107 @@
+# telegram/management/commands/replay_updates.py
+import asyncio
+import json
+import secrets
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from telegram.fake_api import FakeBotAPIServer
+from telegram.webhook import ingestor
+
+
+def load_updates(path):
+    """Читает записанные обновления: JSON-массив или по одному JSON в строке"""
+    with open(path, encoding='utf-8') as f:
+        content = f.read().strip()
+    if content.startswith('['):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+class Command(BaseCommand):
+    help = 'Отправляет записанные обновления Telegram во вебхук бота'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с обновлениями (JSON или JSON Lines)')
+        parser.add_argument('--url', help='Адрес вебхука; без него обновления идут в процесс напрямую')
+        parser.add_argument(
+            '--fake-api', action='store_true',
+            help='Отвечать через локальный поддельный Bot API вместо api.telegram.org'
+        )
+
+    def handle(self, *args, **options):
+        updates = load_updates(options['path'])
+        if not updates:
+            raise CommandError('Файл не содержит обновлений')
+
+        headers = {'Content-Type': 'application/json'}
+        secret = getattr(settings, 'TELEGRAM_WEBHOOK_SECRET', '')
+        if not secret and not options['url']:
+            # Вебхук без секрета закрыт — для локального прогона задаём временный
+            secret = secrets.token_urlsafe(32)
+        if secret:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = secret
+
+        started = time.perf_counter()
+        if options['url']:
+            results = [self._post(options['url'], data, headers) for data in updates]
+            stats = None
+        else:
+            with override_settings(TELEGRAM_WEBHOOK_SECRET=secret):
+                results, stats = asyncio.run(self._replay_locally(updates, headers, options['fake_api']))
+        elapsed = time.perf_counter() - started
+
+        summary = {}
+        for result in results:
+            summary[result] = summary.get(result, 0) + 1
+        self.stdout.write(json.dumps({
+            'updates': len(updates),
+            'results': summary,
+            'seconds': round(elapsed, 4),
+            'ingestor': stats,
+        }, ensure_ascii=False, indent=2))
+
+    def _post(self, url, data, headers):
+        request = urllib.request.Request(
+            url, data=json.dumps(data).encode(), headers=headers, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read()).get('result', str(response.status))
+        except urllib.error.HTTPError as e:
+            return f'http_{e.code}'
+
+    async def _replay_locally(self, updates, headers, fake_api):
+        server = None
+        if fake_api:
+            from telegram.client_bot import build_application
+            server = FakeBotAPIServer().start()
+            ingestor.application_factory = lambda: build_application(
+                token='123456:REPLAY', base_url=server.base_url
+            )
+
+        client = AsyncClient()
+        url = reverse('telegram_webhook')
+        extra = {
+            f'HTTP_{key.upper().replace("-", "_")}': value
+            for key, value in headers.items() if key != 'Content-Type'
+        }
+        results = []
+        try:
+            for data in updates:
+                response = await client.post(
+                    url, data=json.dumps(data), content_type='application/json', **extra
+                )
+                results.append(json.loads(response.content).get('result', str(response.status_code)))
+            await ingestor.drain()
+            stats = ingestor.stats()
+            await ingestor.stop()
+        finally:
+            if server is not None:
+                server.stop()
+        return results, stats
@@ -0,0 +1,115 @@
+# telegram/repository.py
+"""
+Асинхронный слой доступа к данным для клиентского бота.
+
+Обработчики бота работают в event loop, а ORM Django синхронный. Каждая
+функция здесь выполняет запрос в отдельном ограниченном пуле потоков
+(не в общем потоке sync_to_async), поэтому медленный запрос одного чата
+не останавливает обработку остальных. Наружу отдаются только готовые
+значения (dict / list), ленивые QuerySet из потоков не выходят.
+"""
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from orders.models import ArchivedOrder, Order
+from users.models import User
+from telegram.identity import identity_cache
+
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'TELEGRAM_BOT_DB_THREADS', 8),
+    thread_name_prefix='bot-db'
+)
+
+
+def db_call(func):
+    """Декоратор: выполнить синхронную функцию в пуле потоков бота"""
+    return database_sync_to_async(func, thread_sensitive=False, executor=executor)
+
+
+def _create_customer(telegram_id, usernames, first_name, last_name):
+    for username in usernames:
+        if User.objects.filter(username=username).exists():
+            continue
+        try:
+            with transaction.atomic():
+                return User.objects.create(
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    role='customer',
+                    telegram_id=telegram_id
+                ).pk
+        except IntegrityError:
+            # Username заняли только что или этот же чат зарегистрировался параллельно
+            user_pk = User.objects.filter(telegram_id=telegram_id).values_list('pk', flat=True).first()
+            if user_pk is not None:
+                return user_pk
+    return None
+
+
+@db_call
+def _get_or_create_customer(telegram_id, username, first_name, last_name):
+    """
+    Клиент ищется только по telegram_id. Чужой аккаунт с тем же username не
+    привязывается: если имя занято, создаётся новый аккаунт user_<chat id>.
+    """
+    user_pk = User.objects.filter(telegram_id=telegram_id).values_list('pk', flat=True).first()
+    if user_pk is not None:
+        return user_pk
+    fallback = f"user_{telegram_id}"
+    usernames = list(dict.fromkeys([username, fallback]))
+    user_pk = _create_customer(telegram_id, usernames, first_name, last_name)
+    if user_pk is None:
+        user_pk = _create_customer(
+            telegram_id, [f"{fallback}_{uuid.uuid4().hex[:8]}"], first_name, last_name
+        )
+    return user_pk
+
+
+async def get_or_create_customer(tg_user):
+    """Создаёт или находит клиента по пользователю Telegram, возвращает pk"""
+    user_pk = await _get_or_create_customer(
+        tg_user.id,
+        tg_user.username or f"user_{tg_user.id}",
+        tg_user.first_name or '',
+        tg_user.last_name or ''
+    )
+    identity_cache.put(tg_user.id, user_pk)
+    return user_pk
+
+
+async def resolve_user_pk(telegram_id):
+    """pk пользователя по chat id; при попадании в кэш обходится без потока"""
+    user_pk = identity_cache.get(int(telegram_id))
+    if user_pk is not None:
+        return user_pk
+    return await db_call(identity_cache.load)(telegram_id)
+
+
+@db_call
+def get_recent_orders(user_pk, limit=5):
+    orders = list(
+        Order.objects.filter(user_id=user_pk).order_by('-created_at').values(
+            'id', 'status', 'total_price', 'created_at'
+        )[:limit]
+    )
+    if len(orders) < limit:
+        # Живых заказов мало — дополняем список архивными (в архиве только
+        # старые завершённые заказы, поэтому при полном списке он не нужен)
+        orders += ArchivedOrder.objects.filter(user_id=user_pk).order_by('-created_at').values(
+            'id', 'status', 'total_price', 'created_at'
+        )[:limit]
+        orders.sort(key=lambda order: order['created_at'], reverse=True)
+    return orders[:limit]
+
+
+@db_call
+def get_user_profile(user_pk):
+    return User.objects.filter(pk=user_pk).values(
+        'first_name', 'last_name', 'username', 'bonus_points'
+    ).first()
+
@@ -0,0 +1,65 @@
+# telegram/views.py
+import hmac
+import json
+
+from django.conf import settings
+from django.http import HttpResponseForbidden, HttpResponseNotAllowed, JsonResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .dispatcher import dispatcher
+from .webhook import InvalidUpdate, ingestor, update_id_of
+
+
+async def telegram_webhook(request):
+    """Приём обновлений от Telegram (режим вебхука клиентского бота)"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    # Без секрета вебхук закрыт: иначе обновления мог бы прислать кто угодно
+    secret = getattr(settings, 'TELEGRAM_WEBHOOK_SECRET', '')
+    token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    if not secret or not hmac.compare_digest(token.encode(), secret.encode()):
+        return HttpResponseForbidden()
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'Некорректный JSON'}, status=400)
+    try:
+        update_id_of(data)
+    except InvalidUpdate as e:
+        return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+
+    try:
+        result = await ingestor.submit(data)
+    except InvalidUpdate as e:
+        return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+    if result == 'overloaded':
+        # Telegram повторит доставку позже
+        return JsonResponse({'ok': False, 'result': result}, status=503)
+    return JsonResponse({'ok': True, 'result': result})
+
+# csrf_exempt и require_POST в Django 4.2 не поддерживают async-представления
+telegram_webhook.csrf_exempt = True
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def send_notification(request):
+    """Ставит в очередь произвольное сообщение в чат Telegram"""
+    chat_id = request.data.get('chat_id')
+    text = request.data.get('text')
+    if not chat_id or not text:
+        return Response({
+            'success': False,
+            'message': 'Нужно указать chat_id и text'
+        }, status=400)
+
+    if not dispatcher.enqueue(chat_id, text):
+        return Response({
+            'success': False,
+            'message': 'Очередь уведомлений переполнена'
+        }, status=503)
+    return Response({'success': True})
@@ -0,0 +1,254 @@
+# telegram/webhook.py
+"""
+Приём обновлений Telegram через вебхук.
+
+Обновление проходит три шага:
+1. отбрасываются повторы по update_id (ограниченное множество последних id,
+   при TELEGRAM_WEBHOOK_SHARED_DEDUP — ещё и через общий кэш между процессами);
+2. по chat id выбирается один из N воркеров — обновления одного чата всегда
+   попадают в одну очередь и обрабатываются по порядку, разные чаты —
+   параллельно;
+3. воркер передаёт обновление в Application.process_update.
+
+Приложение бота и воркеры живут в отдельном потоке со своим event loop
+(как у telegram/dispatcher.py): один экземпляр Application на процесс
+при любом сервере — ASGI или runserver, где у каждого запроса свой цикл.
+Представление только передаёт обновление в этот поток.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidUpdate(ValueError):
+    pass
+
+
+def update_id_of(data):
+    """update_id обновления или InvalidUpdate, если тело не объект с целым update_id"""
+    update_id = data.get('update_id') if isinstance(data, dict) else None
+    if not isinstance(update_id, int) or isinstance(update_id, bool):
+        raise InvalidUpdate('Ожидается объект обновления с целым update_id')
+    return update_id
+
+
+class UpdateDeduplicator:
+    """Запоминает последние maxsize значений update_id"""
+
+    def __init__(self, maxsize=10000, shared=False, timeout=3600):
+        self.maxsize = maxsize
+        self.shared = shared
+        self.timeout = timeout
+        self._order = deque()
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def check_and_add(self, update_id):
+        """True, если update_id встречается впервые"""
+        with self._lock:
+            if update_id in self._seen:
+                return False
+            self._seen.add(update_id)
+            self._order.append(update_id)
+            while len(self._order) > self.maxsize:
+                self._seen.discard(self._order.popleft())
+        if self.shared and not cache.add(f'telegram:update:{update_id}', 1, self.timeout):
+            return False
+        return True
+
+    def forget(self, update_id):
+        """Снимает отметку, чтобы повторная доставка была принята"""
+        with self._lock:
+            self._seen.discard(update_id)
+        if self.shared:
+            cache.delete(f'telegram:update:{update_id}')
+
+
+class WebhookIngestor:
+    def __init__(self, application_factory, workers=None, queue_size=None, dedup=None):
+        self.application_factory = application_factory
+        self.workers = workers or getattr(settings, 'TELEGRAM_WEBHOOK_WORKERS', 8)
+        self.queue_size = queue_size or getattr(settings, 'TELEGRAM_WEBHOOK_QUEUE_SIZE', 1000)
+        self.dedup = dedup or UpdateDeduplicator(
+            maxsize=getattr(settings, 'TELEGRAM_WEBHOOK_DEDUP_SIZE', 10000),
+            shared=getattr(settings, 'TELEGRAM_WEBHOOK_SHARED_DEDUP', False),
+        )
+        self.application = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+        self._loop = None
+        self._stop_event = None
+        self._queues = []
+
+        self.received = 0
+        self.duplicates = 0
+        self.overloaded = 0
+        self.processed = 0
+        self.failed = 0
+
+    # --- Публичный API (вызывается из event loop запроса) ---
+
+    def start(self):
+        """
+        Запускает поток со своим event loop, приложением бота и воркерами.
+        Приложение (HTTP-сессия, getMe) создаётся один раз на процесс.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._error = None
+            self._thread = threading.Thread(target=self._run, name='telegram-webhook', daemon=True)
+            self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            # Приложение не инициализировалось — следующий запрос попробует снова
+            raise self._error
+
+    async def submit(self, data):
+        """
+        Принимает JSON обновления. Возвращает 'accepted', 'duplicate'
+        или 'overloaded' (очередь воркера заполнена — Telegram повторит доставку).
+        InvalidUpdate — тело не является корректным обновлением.
+        """
+        update_id_of(data)
+        return await self._call(self._submit, data)
+
+    async def drain(self):
+        """Ждёт, пока все очереди будут обработаны"""
+        if self._thread is not None and self._thread.is_alive():
+            await self._call(self._drain)
+
+    async def stop(self):
+        if self._thread is None or not self._thread.is_alive():
+            return
+        await self.drain()
+        self._loop.call_soon_threadsafe(self._stop_event.set)
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    @staticmethod
+    def routing_key(update):
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return update.effective_user.id
+        return update.update_id
+
+    def stats(self):
+        return {
+            'workers': len(self._queues),
+            'queue_depths': [queue.qsize() for queue in self._queues],
+            'received': self.received,
+            'duplicates': self.duplicates,
+            'overloaded': self.overloaded,
+            'processed': self.processed,
+            'failed': self.failed,
+        }
+
+    # --- Работа в потоке ингестора ---
+
+    async def _call(self, func, *args):
+        """Выполняет корутину func(*args) в цикле ингестора и ждёт её результат"""
+        if self._thread is None or not self._thread.is_alive():
+            await asyncio.to_thread(self.start)
+        future = asyncio.run_coroutine_threadsafe(func(*args), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        try:
+            application = self.application_factory()
+            await application.initialize()
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self.application = application
+        self._stop_event = asyncio.Event()
+        self._queues = [asyncio.Queue(self.queue_size) for _ in range(self.workers)]
+        tasks = [
+            asyncio.create_task(self._worker(queue), name=f'telegram-webhook-{n}')
+            for n, queue in enumerate(self._queues)
+        ]
+        self._ready.set()
+
+        await self._stop_event.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queues = []
+        try:
+            await application.shutdown()
+        except Exception as e:
+            logger.warning('Ошибка при закрытии приложения бота: %s', e)
+        self.application = None
+
+    async def _submit(self, data):
+        update_id = update_id_of(data)
+        self.received += 1
+        # Разбираем до отметки update_id: иначе повтор после ошибки разбора
+        # был бы отброшен как дубликат
+        try:
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            raise InvalidUpdate(f'Некорректное обновление: {e}') from e
+        if not self.dedup.check_and_add(update_id):
+            self.duplicates += 1
+            return 'duplicate'
+
+        queue = self._queues[hash(self.routing_key(update)) % len(self._queues)]
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.overloaded += 1
+            self.dedup.forget(update_id)
+            return 'overloaded'
+        return 'accepted'
+
+    async def _drain(self):
+        for queue in self._queues:
+            await queue.join()
+
+    async def _worker(self, queue):
+        while True:
+            update = await queue.get()
+            try:
+                await self._process(update)
+            finally:
+                queue.task_done()
+
+    async def _process(self, update):
+        try:
+            await self.application.process_update(update)
+            self.processed += 1
+        except Exception:
+            self.failed += 1
+            logger.exception('Ошибка обработки обновления %s', update.update_id)
+
+
+def _build_bot_application():
+    from telegram.client_bot import build_application
+    return build_application()
+
+
+# Глобальный экземпляр для telegram/views.py
+ingestor = WebhookIngestor(_build_bot_application)
@@ -0,0 +1,62 @@
+# users/management/commands/backfill_telegram_ids.py
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Заполняет User.telegram_id по именам пользователей, созданных ботом (user_<id>)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pattern', default=r'^user_(\d+)$',
+            help='Регулярное выражение с группой, содержащей Telegram ID'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        pattern = re.compile(options['pattern'])
+        batch_size = options['batch_size']
+        taken = set(
+            User.objects.filter(telegram_id__isnull=False).values_list('telegram_id', flat=True)
+        )
+
+        updated = skipped = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                User.objects.filter(telegram_id__isnull=True, pk__gt=last_pk)
+                .order_by('pk').only('pk', 'username')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            changed = []
+            for user in batch:
+                match = pattern.search(user.username)
+                if not match:
+                    continue
+                telegram_id = int(match.group(1))
+                if telegram_id in taken:
+                    skipped += 1
+                    self.stdout.write(
+                        self.style.WARNING(f'{user.username}: Telegram ID {telegram_id} уже занят')
+                    )
+                    continue
+                taken.add(telegram_id)
+                user.telegram_id = telegram_id
+                changed.append(user)
+
+            if changed and not options['dry_run']:
+                with transaction.atomic():
+                    User.objects.bulk_update(changed, ['telegram_id'])
+            updated += len(changed)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Привязано Telegram ID: {updated}, пропущено: {skipped}')
+        )
@@ -11,6 +11,7 @@ class User(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='customer')
     phone = models.CharField(max_length=20, blank=True)
     bonus_points = models.IntegerField(default=0)
+    telegram_id = models.BigIntegerField(null=True, blank=True, unique=True)  # chat id клиента в Telegram
 
     def __str__(self):
         return f"{self.username} ({self.role})"